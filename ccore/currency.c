@@ -7,19 +7,26 @@
 #include <stdbool.h>
 #include <sqlite3.h>
 #include <time.h>
+#include <glib.h>
 #include "currency.h"
 
 #define CURRENCY_REGISTRY_BLOCK 100
 #define DATE_LEN 8
-#define MAX_SQL_LEN 512
-#define SQL_RES_LEN 512
 
 static sqlite3 *g_db = NULL;
+// Prepared statements are compiled on first use and live as long as g_db.
+static sqlite3_stmt *g_select_rates_stmt = NULL;
+static sqlite3_stmt *g_replace_rate_stmt = NULL;
 // Currencies are allocated in block. Whether a "slot" is registered is
 // determined by whether its code starts with '\0'
 static Currency *g_currencies = NULL;
 static unsigned int g_currencies_count = 0;
 static unsigned int g_currencies_max = 0;
+// Rates are read, without the GIL, from threads computing balances. This
+// protects our in-memory rates and our DB statements in getrate(),
+// set_CAD_values() and daterange(). Global init and deinit aren't protected:
+// they must not run while rates are being read.
+static GMutex g_rates_mutex;
 
 // Private
 
@@ -39,66 +46,104 @@ str2date(const char *s)
     return mktime(&date);
 }
 
-static bool
-sqlite_getsingle_double(const char *sql, double *result)
+static int
+date2key(const time_t date)
 {
-    sqlite3_stmt *stmt;
-    int rc;
+    struct tm *tm = gmtime(&date);
+    return (tm->tm_year + 1900) * 10000 + (tm->tm_mon + 1) * 100 + tm->tm_mday;
+}
 
-    rc = sqlite3_prepare_v2(g_db, sql, -1, &stmt, NULL);
-    if (rc != SQLITE_OK) {
-        return false;
-    }
-    rc = sqlite3_step(stmt);
-    if (rc != SQLITE_ROW) {
-        sqlite3_finalize(stmt);
-        return false;
+static time_t
+key2date(int key)
+{
+    char s[DATE_LEN + 1];
+    snprintf(s, DATE_LEN + 1, "%08d", key);
+    return str2date(s);
+}
+
+static sqlite3_stmt*
+prepare_stmt(sqlite3_stmt **stmt, const char *sql)
+{
+    if (*stmt == NULL) {
+        if (sqlite3_prepare_v2(g_db, sql, -1, stmt, NULL) != SQLITE_OK) {
+            *stmt = NULL;
+        }
+    } else {
+        sqlite3_reset(*stmt);
+        sqlite3_clear_bindings(*stmt);
     }
-    if (sqlite3_column_type(stmt, 0) != SQLITE_FLOAT) {
-        sqlite3_finalize(stmt);
-        return false;
+    return *stmt;
+}
+
+static void
+finalize_stmts(void)
+{
+    sqlite3_finalize(g_select_rates_stmt);
+    g_select_rates_stmt = NULL;
+    sqlite3_finalize(g_replace_rate_stmt);
+    g_replace_rate_stmt = NULL;
+}
+
+static void
+invalidate_rates(Currency *currency)
+{
+    free(currency->rates);
+    currency->rates = NULL;
+    currency->rates_count = 0;
+    currency->rates_loaded = false;
+}
+
+static void
+invalidate_all_rates(void)
+{
+    for (unsigned int i=0; i<g_currencies_count; i++) {
+        invalidate_rates(&g_currencies[i]);
     }
-    *result = sqlite3_column_double(stmt, 0);
-    sqlite3_finalize(stmt);
-    return true;
 }
 
+/* Loads all rates for `currency` from the DB in memory if they aren't already.
+ *
+ * Returns false if the DB couldn't be read.
+ */
 static bool
-sqlite_getsingle_text(const char *sql, char *result)
+load_rates(Currency *currency)
 {
     sqlite3_stmt *stmt;
-    int rc;
-    const unsigned char *buf;
+    unsigned int capacity = 0;
 
-    rc = sqlite3_prepare_v2(g_db, sql, -1, &stmt, NULL);
-    if (rc != SQLITE_OK) {
-        return false;
+    if (currency->rates_loaded) {
+        return true;
     }
-    rc = sqlite3_step(stmt);
-    if (rc != SQLITE_ROW) {
-        sqlite3_finalize(stmt);
+    stmt = prepare_stmt(
+        &g_select_rates_stmt,
+        "select date, rate from rates where currency = ? order by date");
+    if (stmt == NULL) {
         return false;
     }
-    buf = sqlite3_column_text(stmt, 0);
-    if (buf == NULL) {
-        sqlite3_finalize(stmt);
-        return false;
+    sqlite3_bind_text(stmt, 1, currency->code, -1, SQLITE_STATIC);
+    while (sqlite3_step(stmt) == SQLITE_ROW) {
+        const unsigned char *date = sqlite3_column_text(stmt, 0);
+        if (date == NULL || sqlite3_column_type(stmt, 1) != SQLITE_FLOAT) {
+            continue;
+        }
+        if (currency->rates_count == capacity) {
+            capacity = capacity ? capacity * 2 : 64;
+            currency->rates = realloc(
+                currency->rates, sizeof(CurrencyRate) * capacity);
+        }
+        CurrencyRate *rate = &currency->rates[currency->rates_count];
+        rate->date = atoi((const char *)date);
+        rate->rate = sqlite3_column_double(stmt, 1);
+        currency->rates_count++;
     }
-    strncpy(result, (const char *)buf, SQL_RES_LEN);
-    sqlite3_finalize(stmt);
+    sqlite3_reset(stmt);
+    currency->rates_loaded = true;
     return true;
 }
 
 static CurrencyResult
 seek_value_in_CAD(time_t date, Currency *currency, double *result)
 {
-    char strdate[DATE_LEN + 1];
-    char sql[MAX_SQL_LEN + 1];
-    char *sqlfmt = "select rate from rates "
-        "where date %s '%s' and currency = '%s' "
-        "order by date %s limit 1";
-    double rate;
-
     if (strncmp(currency->code, "CAD", CURRENCY_CODE_MAXLEN) == 0) {
         *result = 1;
         return CURRENCY_OK;
@@ -111,19 +156,23 @@ seek_value_in_CAD(time_t date, Currency *currency, double *result)
         *result = currency->latest_rate;
         return CURRENCY_OK;
     }
-    date2str(strdate, date);
-    snprintf(
-        sql, MAX_SQL_LEN, sqlfmt,
-        "<=", strdate, currency->code, "desc");
-    if (!sqlite_getsingle_double(sql, &rate)) {
-        snprintf(
-            sql, MAX_SQL_LEN, sqlfmt,
-            ">=", strdate, currency->code, "");
-        if (!sqlite_getsingle_double(sql, &rate)) {
-            return CURRENCY_NORESULT;
+    if (!load_rates(currency) || currency->rates_count == 0) {
+        return CURRENCY_NORESULT;
+    }
+    // We're looking for the last rate at or before `date`. If there's none,
+    // we take the first rate after it.
+    int key = date2key(date);
+    int low = 0;
+    int high = currency->rates_count - 1;
+    while (low <= high) {
+        int mid = ((high - low) / 2) + low;
+        if (currency->rates[mid].date <= key) {
+            low = mid + 1;
+        } else {
+            high = mid - 1;
         }
     }
-    *result = rate;
+    *result = currency->rates[high >= 0 ? high : 0].rate;
     return CURRENCY_OK;
 }
 
@@ -141,9 +190,11 @@ currency_global_init(char *dbpath)
     }
     if (g_db != NULL) {
         // We already have an opened DB. close it first.
+        finalize_stmts();
         sqlite3_close(g_db);
         g_db = NULL;
     }
+    invalidate_all_rates();
     res = sqlite3_open(dbpath, &g_db);
     if (res) {
         sqlite3_close(g_db);
@@ -173,6 +224,7 @@ currency_global_reset_currencies(void)
         // list
         for (unsigned int i=3; i<g_currencies_count; i++) {
             g_currencies[i].code[0] = '\0';
+            invalidate_rates(&g_currencies[i]);
         }
         g_currencies_count = 3;
         return CURRENCY_OK;
@@ -211,11 +263,16 @@ void
 currency_global_deinit(void)
 {
     if (g_db != NULL) {
+        finalize_stmts();
         sqlite3_close(g_db);
         g_db = NULL;
     }
     if (g_currencies != NULL) {
+        invalidate_all_rates();
         free(g_currencies);
+        g_currencies = NULL;
+        g_currencies_count = 0;
+        g_currencies_max = 0;
     }
 }
 
@@ -256,6 +313,9 @@ currency_register(
     cur->start_rate = start_rate;
     cur->stop_date = stop_date;
     cur->latest_rate = latest_rate;
+    cur->rates_loaded = false;
+    cur->rates_count = 0;
+    cur->rates = NULL;
     g_currencies_count++;
     return cur;
 }
@@ -290,6 +350,7 @@ currency_getrate(time_t date, Currency *c1, Currency *c2, double *result)
         *result = 1;
         return CURRENCY_OK;
     }
+    g_mutex_lock(&g_rates_mutex);
     res = seek_value_in_CAD(date, c1, &value1);
     if (res == CURRENCY_NORESULT) {
         value1 = c1->latest_rate;
@@ -298,6 +359,7 @@ currency_getrate(time_t date, Currency *c1, Currency *c2, double *result)
     if (res == CURRENCY_NORESULT) {
         value2 = c2->latest_rate;
     }
+    g_mutex_unlock(&g_rates_mutex);
     if (value2 != 0) {
         *result = value1 / value2;
     } else {
@@ -309,45 +371,55 @@ currency_getrate(time_t date, Currency *c1, Currency *c2, double *result)
 void
 currency_set_CAD_value(time_t date, Currency *currency, double value)
 {
+    currency_set_CAD_values(&date, &currency, &value, 1);
+}
+
+void
+currency_set_CAD_values(
+    const time_t *dates,
+    Currency **currencies,
+    const double *values,
+    unsigned int count)
+{
+    sqlite3_stmt *stmt;
     char strdate[DATE_LEN + 1];
-    char sql[MAX_SQL_LEN + 1];
+    char strvalue[32];
 
-    date2str(strdate, date);
-    snprintf(
-        sql, MAX_SQL_LEN,
-        "replace into rates(date, currency, rate) values('%s', '%s', %0.6f)",
-        strdate, currency->code, value);
-    sqlite3_exec(g_db, sql, NULL, NULL, NULL);
+    g_mutex_lock(&g_rates_mutex);
+    stmt = prepare_stmt(
+        &g_replace_rate_stmt,
+        "replace into rates(date, currency, rate) values(?, ?, ?)");
+    if (stmt == NULL) {
+        g_mutex_unlock(&g_rates_mutex);
+        return;
+    }
+    sqlite3_exec(g_db, "begin", NULL, NULL, NULL);
+    for (unsigned int i=0; i<count; i++) {
+        date2str(strdate, dates[i]);
+        // We store our rates with a 6 digits precision.
+        snprintf(strvalue, sizeof(strvalue), "%0.6f", values[i]);
+        sqlite3_bind_text(stmt, 1, strdate, -1, SQLITE_STATIC);
+        sqlite3_bind_text(stmt, 2, currencies[i]->code, -1, SQLITE_STATIC);
+        sqlite3_bind_text(stmt, 3, strvalue, -1, SQLITE_STATIC);
+        sqlite3_step(stmt);
+        sqlite3_reset(stmt);
+        invalidate_rates(currencies[i]);
+    }
     sqlite3_exec(g_db, "commit", NULL, NULL, NULL);
+    g_mutex_unlock(&g_rates_mutex);
 }
 
 bool
 currency_daterange(Currency *currency, time_t *start, time_t *stop)
 {
-    char sql[MAX_SQL_LEN + 1];
-    char buf[SQL_RES_LEN + 1] = {0};
+    bool res = false;
 
-    snprintf(
-        sql, MAX_SQL_LEN,
-        "select min(date) from rates where currency = '%s'",
-        currency->code);
-    if (!sqlite_getsingle_text(sql, buf)) {
-        return false;
-    }
-    *start = str2date(buf);
-    if (!*start) {
-        return false;
-    }
-    snprintf(
-        sql, MAX_SQL_LEN,
-        "select max(date) from rates where currency = '%s'",
-        currency->code);
-    if (!sqlite_getsingle_text(sql, buf)) {
-        return false;
-    }
-    *stop = str2date(buf);
-    if (!*stop) {
-        return false;
-    }
-    return true;
+    g_mutex_lock(&g_rates_mutex);
+    if (load_rates(currency) && currency->rates_count > 0) {
+        *start = key2date(currency->rates[0].date);
+        *stop = key2date(currency->rates[currency->rates_count-1].date);
+        res = *start && *stop;
+    }
+    g_mutex_unlock(&g_rates_mutex);
+    return res;
 }
@@ -5,6 +5,13 @@
 #define CURRENCY_CODE_MAXLEN 4
 #define CURRENCY_MAX_EXPONENT 10
 
+typedef struct {
+    // Date in YYYYMMDD form, so that it's directly comparable.
+    int date;
+    // Value of the currency in CAD at that date
+    double rate;
+} CurrencyRate;
+
 typedef struct {
     char code[CURRENCY_CODE_MAXLEN+1];
     unsigned int exponent;
@@ -12,6 +19,11 @@ typedef struct {
     double start_rate;
     time_t stop_date;
     double latest_rate;
+    // In-memory copy of this currency's rates in the DB, sorted by date. It's
+    // loaded on first use and dropped whenever rates change in the DB.
+    bool rates_loaded;
+    unsigned int rates_count;
+    CurrencyRate *rates;
 } Currency;
 
 typedef enum {
@@ -47,5 +59,17 @@ currency_getrate(time_t date, Currency *c1, Currency *c2, double *result);
 void
 currency_set_CAD_value(time_t date, Currency *currency, double value);
 
+/* Sets `count` CAD values at once, in a single DB transaction.
+ *
+ * `dates`, `currencies` and `values` are parallel arrays: the value of
+ * `currencies[i]` at `dates[i]` is `values[i]`.
+ */
+void
+currency_set_CAD_values(
+    const time_t *dates,
+    Currency **currencies,
+    const double *values,
+    unsigned int count);
+
 bool
 currency_daterange(Currency *currency, time_t *start, time_t *stop);
@@ -1,6 +1,9 @@
 #include <stdlib.h>
 #include "entry.h"
 
+// Last generation given to an EntryList.
+static uint64_t g_generation = 0;
+
 void
 entry_init(Entry *entry, Split *split, Transaction *txn)
 {
@@ -98,14 +101,15 @@ _entry_qsort_cmp(const void *a, const void *b)
 }
 
 static void
-_entries_maybe_set_last_reconciled(EntryList *entries, Entry *entry)
+_entries_maybe_set_last_reconciled(EntryList *entries, int index)
 {
+    Entry *entry = &entries->entries[index];
     if (entry->split->reconciliation_date != 0) {
-        if (entries->last_reconciled == NULL) {
-            entries->last_reconciled = entry;
+        if (entries->last_reconciled == -1) {
+            entries->last_reconciled = index;
         } else {
             bool replace = false;
-            Entry *old = entries->last_reconciled;
+            Entry *old = &entries->entries[entries->last_reconciled];
             if (entry->split->reconciliation_date != old->split->reconciliation_date) {
                 if (entry->split->reconciliation_date > old->split->reconciliation_date) {
                     replace = true;
@@ -122,42 +126,52 @@ _entries_maybe_set_last_reconciled(EntryList *entries, Entry *entry)
                 replace = true;
             }
             if (replace) {
-                entries->last_reconciled = entry;
+                entries->last_reconciled = index;
             }
         }
     }
 }
 
+static void
+_entries_touch(EntryList *entries)
+{
+    entries->generation = ++g_generation;
+}
+
 /* EntryList Public*/
 void
 entries_init(EntryList *entries, Account *account)
 {
     entries->count = 0;
+    entries->capacity = 0;
     entries->cooked_until = 0;
     entries->entries = NULL;
-    entries->last_reconciled = NULL;
+    entries->last_reconciled = -1;
     entries->account = account;
+    _entries_touch(entries);
 }
 
 void
 entries_deinit(EntryList *entries)
 {
-    entries_clear(entries, 0);
     entries->count = 0;
+    entries->capacity = 0;
     entries->cooked_until = 0;
-    entries->last_reconciled = NULL;
+    entries->last_reconciled = -1;
     entries->account = NULL;
     free(entries->entries);
+    entries->entries = NULL;
 }
 
 bool
 entries_balance_of_reconciled(const EntryList *entries, Amount *dst)
 {
-    if (entries->last_reconciled == NULL) {
+    if (entries->last_reconciled == -1) {
         dst->val = 0;
         return false;
     } else {
-        amount_copy(dst, &entries->last_reconciled->reconciled_balance);
+        Entry *entry = &entries->entries[entries->last_reconciled];
+        amount_copy(dst, &entry->reconciled_balance);
         return true;
     }
 }
@@ -182,7 +196,7 @@ entries_balance(const EntryList *entries, Amount *dst, time_t date, bool with_bu
         return false;
     }
     if (index >= 0) {
-        Entry *entry = entries->entries[index];
+        Entry *entry = &entries->entries[index];
         Amount *src = with_budget ? &entry->balance_with_budget : &entry->balance;
         if (date > 0) {
             if (amount_convert(dst, src, date)) {
@@ -200,6 +214,98 @@ entries_balance(const EntryList *entries, Amount *dst, time_t date, bool with_bu
     }
 }
 
+BalancePoint*
+entries_balance_series(
+    EntryList **lists,
+    int listcount,
+    Currency *currency,
+    time_t from,
+    time_t to,
+    int *count)
+{
+    // For each list, the index of the first entry that isn't part of
+    // `balances` yet.
+    int *indexes = malloc(sizeof(int) * listcount);
+    Amount *balances = malloc(sizeof(Amount) * listcount);
+    // Sum of the balances that don't need a conversion.
+    int64_t native_total = 0;
+    for (int i=0; i<listcount; i++) {
+        EntryList *entries = lists[i];
+        int index = entries_find_date(entries, from, true);
+        if (index > entries->cooked_until) {
+            index = entries->cooked_until;
+        }
+        indexes[i] = index;
+        if (index > 0) {
+            amount_copy(&balances[i], &entries->entries[index-1].balance);
+        } else {
+            amount_set(&balances[i], 0, entries->account->currency);
+        }
+        if (balances[i].currency == currency) {
+            native_total += balances[i].val;
+        }
+    }
+
+    int capacity = 16;
+    BalancePoint *res = malloc(sizeof(BalancePoint) * capacity);
+    *count = 0;
+    time_t date = from;
+    while (date <= to) {
+        int64_t total = native_total;
+        time_t next = to + SECS_IN_DAY;
+        bool daily = false;
+        for (int i=0; i<listcount; i++) {
+            EntryList *entries = lists[i];
+            Amount *balance = &balances[i];
+            int index = indexes[i];
+            while (index < entries->cooked_until
+                    && entries->entries[index].txn->date <= date) {
+                index++;
+            }
+            if (index != indexes[i]) {
+                indexes[i] = index;
+                int64_t prev_val = balance->val;
+                amount_copy(balance, &entries->entries[index-1].balance);
+                if (balance->currency == currency) {
+                    native_total += balance->val - prev_val;
+                    total += balance->val - prev_val;
+                }
+            }
+            if (index < entries->cooked_until) {
+                time_t entry_date = entries->entries[index].txn->date;
+                if (entry_date < next) {
+                    next = entry_date;
+                }
+            }
+            if (balance->currency != currency && balance->val) {
+                Amount converted;
+                converted.currency = currency;
+                if (!amount_convert(&converted, balance, date)) {
+                    free(indexes);
+                    free(balances);
+                    free(res);
+                    return NULL;
+                }
+                total += converted.val;
+                daily = true;
+            }
+        }
+        if (*count == 0 || total != res[*count-1].val) {
+            if (*count == capacity) {
+                capacity *= 2;
+                res = realloc(res, sizeof(BalancePoint) * capacity);
+            }
+            res[*count].date = date;
+            res[*count].val = total;
+            (*count)++;
+        }
+        date = daily ? date + SECS_IN_DAY : next;
+    }
+    free(indexes);
+    free(balances);
+    return res;
+}
+
 bool
 entries_cash_flow(
     const EntryList *entries,
@@ -208,20 +314,48 @@ entries_cash_flow(
     time_t to)
 {
     dst->val = 0;
-    for (int i=0; i<entries->count; i++) {
-        Entry *entry = entries->entries[i];
+    int start = entries_find_date(entries, from, false);
+    int end = entries_find_date(entries, to, true);
+    if (start >= end) {
+        return true;
+    }
+    if (dst->currency == entries->account->currency
+            && end <= entries->cooked_until) {
+        // Our cooked balances are the running sum, without budget spawns, of
+        // our amounts converted exactly like we would convert them here.
+        dst->val = entries->entries[end-1].balance.val;
+        if (start > 0) {
+            dst->val -= entries->entries[start-1].balance.val;
+        }
+        return true;
+    }
+    for (int i=start; i<end; i++) {
+        Entry *entry = &entries->entries[i];
         Transaction *txn = entry->txn;
         if (txn->type == TXN_TYPE_BUDGET) {
             continue;
         }
-        if (txn->date >= from && txn->date <= to) {
-            Amount a;
-            a.currency = dst->currency;
-            Amount *src = &entry->split->amount;
-            if (!amount_convert(&a, src, entry->txn->date)) {
-                return false;
-            }
-            dst->val += a.val;
+        Amount a;
+        a.currency = dst->currency;
+        if (!amount_convert(&a, &entry->split->amount, txn->date)) {
+            return false;
+        }
+        dst->val += a.val;
+    }
+    return true;
+}
+
+bool
+entries_cash_flow_by_period(
+    const EntryList *entries,
+    Amount *dst,
+    const time_t *froms,
+    const time_t *tos,
+    int count)
+{
+    for (int i=0; i<count; i++) {
+        if (!entries_cash_flow(entries, &dst[i], froms[i], tos[i])) {
+            return false;
         }
     }
     return true;
@@ -244,17 +378,14 @@ entries_clear(EntryList *entries, time_t fromdate)
             return;
         }
     }
-    for (int i=index; i<entries->count; i++) {
-        free(entries->entries[i]);
-    }
+    // Entries don't own anything, truncating is enough. We keep our
+    // allocated memory around for the upcoming cook.
     entries->count = index;
     entries->cooked_until = index;
-    entries->entries = realloc(
-        entries->entries,
-        sizeof(Entry*) * entries->count);
-    entries->last_reconciled = NULL;
+    _entries_touch(entries);
+    entries->last_reconciled = -1;
     for (int i=0; i<index; i++) {
-        _entries_maybe_set_last_reconciled(entries, entries->entries[i]);
+        _entries_maybe_set_last_reconciled(entries, i);
     }
 }
 
@@ -287,7 +418,7 @@ entries_cook(EntryList *entries)
     Entry** rel;
     rel = malloc(sizeof(Entry *) * cookcount);
     for (int i=0; i<cookcount; i++) {
-        Entry *entry = entries->entries[entries->cooked_until+i];
+        Entry *entry = &entries->entries[entries->cooked_until+i];
         Split *split = entry->split;
         if (!amount_convert(&amount, &split->amount, entry->txn->date)) {
             return false;
@@ -308,25 +439,29 @@ entries_cook(EntryList *entries)
         Entry *entry = rel[i];
         if (entry->split->reconciliation_date != 0) {
             reconciled_balance.val += entry->split->amount.val;
-            entries->last_reconciled = entry;
+            entries->last_reconciled = entry - entries->entries;
         }
         amount_copy(&entry->reconciled_balance, &reconciled_balance);
     }
     free(rel);
     entries->cooked_until = entries->count;
+    _entries_touch(entries);
     return true;
 }
 
 Entry*
 entries_create(EntryList *entries, Split *split, Transaction *txn)
 {
+    if (entries->count == entries->capacity) {
+        entries->capacity = entries->capacity ? entries->capacity * 2 : 16;
+        entries->entries = realloc(
+            entries->entries,
+            sizeof(Entry) * entries->capacity);
+    }
+    Entry *res = &entries->entries[entries->count];
     entries->count++;
-    entries->entries = realloc(
-        entries->entries,
-        sizeof(Entry*) * entries->count);
-    Entry *res = malloc(sizeof(Entry));
     entry_init(res, split, txn);
-    entries->entries[entries->count-1] = res;
+    _entries_touch(entries);
     return res;
 }
 
@@ -345,7 +480,7 @@ entries_find_date(const EntryList *entries, time_t date, bool equal)
     bool matched_once = false;
     while ((high > low) || ((high == low) && !matched_once)) {
         int mid = ((high - low) / 2) + low;
-        Entry *entry = entries->entries[mid];
+        Entry *entry = &entries->entries[mid];
         time_t tdate = entry->txn->date;
         // operator *look* like they're inverted, but they're not.
         bool match = equal ? tdate > date : tdate >= date;
@@ -381,7 +516,7 @@ entries_last_entry(const EntryList *entries, time_t date)
     // We want the entry *before* the threshold
     index--;
     if (index >= 0) {
-        return entries->entries[index];
+        return &entries->entries[index];
     } else {
         return NULL;
     }
@@ -3,6 +3,7 @@
 #include "amount.h"
 #include "split.h"
 #include "transaction.h"
+#include "util.h"
 
 /* An Entry represents a split in the context of an account */
 typedef struct {
@@ -18,14 +19,35 @@ typedef struct {
     Amount balance_with_budget;
 } Entry;
 
+/* Entries of an account, in date order.
+ *
+ * Entries are stored contiguously in a geometrically growing array. Clearing
+ * entries only truncates the array, its memory is kept for the next cook.
+ * This means that an Entry pointer is only valid until the next call to
+ * entries_create(): keep indexes, not pointers.
+ */
 typedef struct {
     int count;
+    // Number of entries `entries` has room for.
+    int capacity;
     int cooked_until;
-    Entry **entries;
-    Entry *last_reconciled;
+    Entry *entries;
+    // Index of the last entry, in reconciliation order, that is reconciled.
+    // -1 if there's none.
+    int last_reconciled;
     Account *account;
+    // Changes whenever entries are added, removed or cooked. Generations are
+    // unique across all lists: a value is never seen twice, even in another
+    // list, so it can be used as a cache key.
+    uint64_t generation;
 } EntryList;
 
+/* A change in a balance series: from `date` on, the balance is `val`. */
+typedef struct {
+    time_t date;
+    int64_t val;
+} BalancePoint;
+
 void
 entry_init(Entry *entry, Split *split, Transaction *txn);
 
@@ -55,6 +77,36 @@ entries_balance(const EntryList *entries, Amount *dst, time_t date, bool with_bu
 bool
 entries_balance_of_reconciled(const EntryList *entries, Amount *dst);
 
+/* Returns the daily series of the sum of the balances of `lists`.
+ *
+ * The balance of each list is converted to `currency` at the date of each day,
+ * exactly like entries_balance() does. We go through entries of all lists in a
+ * single sweep and only return the days, from `from` to `to` inclusively,
+ * where the sum changes. The first point is always `from`.
+ *
+ * We only have to look at days that have entries, except for lists that need
+ * a conversion: their converted balance can change every day.
+ *
+ * The result, with `*count` points, has to be freed with free(). Returns NULL
+ * if a conversion fails.
+ */
+BalancePoint*
+entries_balance_series(
+    EntryList **lists,
+    int listcount,
+    Currency *currency,
+    time_t from,
+    time_t to,
+    int *count);
+
+/* Sets `dst` to the sum of our amounts from `from` to `to` inclusively.
+ *
+ * Amounts are converted to the currency of `dst` at the date of their
+ * transaction. Budget spawns aren't counted. We find the bounds of the range
+ * with entries_find_date() and, when `dst` is in our account's currency and
+ * the range is cooked, we compute the sum from our running balances. Otherwise,
+ * we go through the entries of the range.
+ */
 bool
 entries_cash_flow(
     const EntryList *entries,
@@ -62,12 +114,30 @@ entries_cash_flow(
     time_t from,
     time_t to);
 
+/* Computes the cash flow of `entries` for each of `count` periods.
+ *
+ * Period `i` goes from `froms[i]` to `tos[i]` inclusively and its cash flow
+ * goes in `dst[i]`, which must have its currency set. Each period is exactly
+ * what entries_cash_flow() computes for it.
+ */
+bool
+entries_cash_flow_by_period(
+    const EntryList *entries,
+    Amount *dst,
+    const time_t *froms,
+    const time_t *tos,
+    int count);
+
 void
 entries_clear(EntryList *entries, time_t fromdate);
 
 bool
 entries_cook(EntryList *entries);
 
+/* Adds a new entry at the end of `entries`.
+ *
+ * The returned pointer is only valid until the next entries_create() call.
+ */
 Entry*
 entries_create(EntryList *entries, Split *split, Transaction *txn);
 
@@ -111,10 +111,6 @@ static PyObject *EntryList_Type;
 typedef struct {
     PyObject_HEAD
     TransactionList tlist;
-    // cache
-    PyObject *descriptions;
-    PyObject *payees;
-    PyObject *account_names;
 } PyTransactionList;
 
 static PyObject *TransactionList_Type;
@@ -423,6 +419,56 @@ py_currency_set_CAD_value(PyObject *self, PyObject *args)
     return Py_None;
 }
 
+static PyObject*
+py_currency_set_CAD_values(PyObject *self, PyObject *rates)
+{
+    PyObject *seq, *pydate;
+    char *code;
+    Currency *c;
+    double rate;
+
+    seq = PySequence_Fast(rates, "rates must be a sequence");
+    if (seq == NULL) {
+        return NULL;
+    }
+    Py_ssize_t count = PySequence_Fast_GET_SIZE(seq);
+    time_t *dates = malloc(sizeof(time_t) * count);
+    Currency **currencies = malloc(sizeof(Currency *) * count);
+    double *values = malloc(sizeof(double) * count);
+    bool ok = true;
+    for (Py_ssize_t i=0; i<count; i++) {
+        PyObject *item = PySequence_Fast_GET_ITEM(seq, i);
+        if (!PyArg_ParseTuple(item, "Osd", &pydate, &code, &rate)) {
+            ok = false;
+            break;
+        }
+        dates[i] = pydate2time(pydate);
+        if (dates[i] == -1) {
+            ok = false;
+            break;
+        }
+        c = getcur(code);
+        if (c == NULL) {
+            ok = false;
+            break;
+        }
+        currencies[i] = c;
+        values[i] = rate;
+    }
+    if (ok) {
+        currency_set_CAD_values(dates, currencies, values, count);
+    }
+    free(dates);
+    free(currencies);
+    free(values);
+    Py_DECREF(seq);
+    if (!ok) {
+        return NULL;
+    }
+    Py_INCREF(Py_None);
+    return Py_None;
+}
+
 static PyObject*
 py_currency_daterange(PyObject *self, PyObject *args)
 {
@@ -823,6 +869,40 @@ py_amount_parse(PyObject *self, PyObject *args, PyObject *kwds)
     }
 }
 
+static PyObject*
+py_amount_raw(PyObject *self, PyObject *amount_p)
+{
+    if (!check_amount(amount_p)) {
+        PyErr_SetString(PyExc_TypeError, "not an amount");
+        return NULL;
+    }
+    const Amount *amount = get_amount(amount_p);
+    if (amount->currency == NULL) {
+        return Py_BuildValue("(iO)", 0, Py_None);
+    }
+    return Py_BuildValue("(Ls)", (long long)amount->val, amount->currency->code);
+}
+
+static PyObject*
+py_amount_from_raw(PyObject *self, PyObject *args)
+{
+    long long val;
+    char *code;
+    Currency *c;
+
+    if (!PyArg_ParseTuple(args, "Lz", &val, &code)) {
+        return NULL;
+    }
+    if (code == NULL) {
+        return PyLong_FromLong(0);
+    }
+    c = getcur(code);
+    if (c == NULL) {
+        return NULL;
+    }
+    return create_amount(val, c);
+}
+
 static PyObject*
 py_amount_convert(PyObject *self, PyObject *args)
 {
@@ -2261,6 +2341,25 @@ PyEntryList_clear(PyEntryList *self, PyObject *args)
     Py_RETURN_NONE;
 }
 
+/* Balance and cash flow computations only read entries and rates. We release
+ * the GIL while we do them so that the balances of many accounts can be
+ * computed in parallel threads. Entries must not be cooked while that
+ * happens.
+ */
+static bool
+_PyEntryList_balance(PyEntryList *self, Amount *dst, time_t date, bool with_budget)
+{
+    bool ok;
+
+    Py_BEGIN_ALLOW_THREADS
+    ok = entries_balance(self->entries, dst, date, with_budget);
+    Py_END_ALLOW_THREADS
+    if (!ok) {
+        PyErr_SetString(PyExc_ValueError, "couldn't compute balance");
+    }
+    return ok;
+}
+
 static PyObject*
 PyEntryList_balance(PyEntryList *self, PyObject *args)
 {
@@ -2281,22 +2380,48 @@ PyEntryList_balance(PyEntryList *self, PyObject *args)
     if (date == -1) {
         return NULL;
     }
-    if (!entries_balance(self->entries, &dst, date, with_budget)) {
+    if (!_PyEntryList_balance(self, &dst, date, with_budget)) {
         return NULL;
     } else {
         return pyamount(&dst);
     }
 }
 
+static bool
+_pydaterange_bounds(PyObject *daterange, time_t *from, time_t *to)
+{
+    PyObject *start = PyObject_GetAttrString(daterange, "start");
+    if (start == NULL) {
+        return false;
+    }
+    *from = pydate2time(start);
+    Py_DECREF(start);
+    PyObject *end = PyObject_GetAttrString(daterange, "end");
+    if (end == NULL) {
+        return false;
+    }
+    *to = pydate2time(end);
+    Py_DECREF(end);
+    return *from != -1 && *to != -1;
+}
+
 static bool
 _PyEntryList_cash_flow(PyEntryList *self, Amount *dst, PyObject *daterange)
 {
-    time_t from = pydate2time(PyObject_GetAttrString(daterange, "start"));
-    time_t to = pydate2time(PyObject_GetAttrString(daterange, "end"));
-    if (from == -1 || to == -1) {
+    time_t from;
+    time_t to;
+    if (!_pydaterange_bounds(daterange, &from, &to)) {
         return false;
     }
-    return entries_cash_flow(self->entries, dst, from, to);
+    bool ok;
+    Py_BEGIN_ALLOW_THREADS
+    ok = entries_cash_flow(self->entries, dst, from, to);
+    Py_END_ALLOW_THREADS
+    if (!ok) {
+        PyErr_SetString(PyExc_ValueError, "problems getting a rate");
+        return false;
+    }
+    return true;
 }
 
 static PyObject*
@@ -2341,7 +2466,7 @@ PyEntryList_normal_balance(PyEntryList *self, PyObject *args)
     if (date == -1) {
         return NULL;
     }
-    if (!entries_balance(self->entries, &res, date, false)) {
+    if (!_PyEntryList_balance(self, &res, date, false)) {
         return NULL;
     } else {
         account_normalize_amount(self->entries->account, &res);
@@ -2375,12 +2500,100 @@ PyEntryList_normal_cash_flow(PyEntryList *self, PyObject *args)
     }
 }
 
+/* Returns a list of the cash flows, in `currency`, for each date range in
+ * `dateranges`.
+ *
+ * If `normalize` is true, amounts are normalized for our account.
+ */
+static PyObject*
+_PyEntryList_cash_flow_by_period(
+    PyEntryList *self,
+    PyObject *dateranges,
+    Currency *currency,
+    bool normalize)
+{
+    PyObject *seq = PySequence_Fast(dateranges, "date_ranges must be iterable");
+    if (seq == NULL) {
+        return NULL;
+    }
+    int count = PySequence_Fast_GET_SIZE(seq);
+    time_t *froms = malloc(sizeof(time_t) * count);
+    time_t *tos = malloc(sizeof(time_t) * count);
+    Amount *amounts = malloc(sizeof(Amount) * count);
+    PyObject *res = NULL;
+    bool ok;
+    for (int i=0; i<count; i++) {
+        PyObject *item = PySequence_Fast_GET_ITEM(seq, i); // borrowed
+        if (!_pydaterange_bounds(item, &froms[i], &tos[i])) {
+            goto end;
+        }
+        amounts[i].currency = currency;
+    }
+    Py_BEGIN_ALLOW_THREADS
+    ok = entries_cash_flow_by_period(self->entries, amounts, froms, tos, count);
+    Py_END_ALLOW_THREADS
+    if (!ok) {
+        PyErr_SetString(PyExc_ValueError, "problems getting a rate");
+        goto end;
+    }
+    res = PyList_New(count);
+    for (int i=0; i<count; i++) {
+        if (normalize) {
+            account_normalize_amount(self->entries->account, &amounts[i]);
+        }
+        PyList_SET_ITEM(res, i, pyamount(&amounts[i]));
+    }
+end:
+    free(froms);
+    free(tos);
+    free(amounts);
+    Py_DECREF(seq);
+    return res;
+}
+
+static PyObject*
+PyEntryList_cash_flow_by_period(PyEntryList *self, PyObject *args)
+{
+    PyObject *dateranges;
+    char *currency;
+
+    if (!PyArg_ParseTuple(args, "Os", &dateranges, &currency)) {
+        return NULL;
+    }
+    Currency *cur = getcur(currency);
+    if (cur == NULL) {
+        return NULL;
+    }
+    return _PyEntryList_cash_flow_by_period(self, dateranges, cur, false);
+}
+
+static PyObject*
+PyEntryList_normal_cash_flow_by_period(PyEntryList *self, PyObject *args)
+{
+    PyObject *dateranges;
+    char *currency = NULL;
+
+    if (!PyArg_ParseTuple(args, "O|s", &dateranges, &currency)) {
+        return NULL;
+    }
+    Currency *cur;
+    if (currency == NULL) {
+        cur = self->entries->account->currency;
+    } else {
+        cur = getcur(currency);
+        if (cur == NULL) {
+            return NULL;
+        }
+    }
+    return _PyEntryList_cash_flow_by_period(self, dateranges, cur, true);
+}
+
 static PyObject*
 PyEntryList_iter(PyEntryList *self)
 {
     PyObject *list = PyList_New(self->entries->count);
     for (int i=0; i<self->entries->count; i++) {
-        Entry *entry = self->entries->entries[i];
+        Entry *entry = &self->entries->entries[i];
         PyList_SetItem(list, i, (PyObject *)_PyEntry_from_entry(entry));
     }
     PyObject *res = PyObject_GetIter(list);
@@ -2388,6 +2601,12 @@ PyEntryList_iter(PyEntryList *self)
     return res;
 }
 
+static PyObject*
+PyEntryList_generation(PyEntryList *self)
+{
+    return PyLong_FromUnsignedLongLong(self->entries->generation);
+}
+
 static Py_ssize_t
 PyEntryList_len(PyEntryList *self)
 {
@@ -2771,16 +2990,34 @@ PyAccountList_dealloc(PyAccountList *self)
  *
  * This takes a list of transactions to cook. Adds entries directly in the
  * proper accounts.
+ *
+ * If `only` is specified (a collection of accounts), only splits belonging to
+ * these accounts are cooked. Entries of other accounts are left untouched.
  */
 static PyObject*
 py_oven_cook_txns(PyObject *self, PyObject *args)
 {
     PyAccountList *accounts;
     PyObject *txns;
+    PyObject *only = Py_None;
 
-    if (!PyArg_ParseTuple(args, "OO", &accounts, &txns)) {
+    if (!PyArg_ParseTuple(args, "OO|O", &accounts, &txns, &only)) {
         return NULL;
     }
+    GHashTable *only_set = NULL;
+    if (only != Py_None) {
+        PyObject *iter = PyObject_GetIter(only);
+        if (iter == NULL) {
+            return NULL;
+        }
+        only_set = g_hash_table_new(g_direct_hash, g_direct_equal);
+        PyObject *item;
+        while ((item = PyIter_Next(iter))) {
+            g_hash_table_add(only_set, ((PyAccount *)item)->account);
+            Py_DECREF(item);
+        }
+        Py_DECREF(iter);
+    }
     Py_ssize_t len = PySequence_Length(txns);
     for (int i=0; i<len; i++) {
         PyTransaction *txn = (PyTransaction *)PyList_GetItem(txns, i); // borrowed
@@ -2790,12 +3027,20 @@ py_oven_cook_txns(PyObject *self, PyObject *args)
             if (split->account == NULL) {
                 continue;
             }
+            if (only_set != NULL && !g_hash_table_contains(only_set, split->account)) {
+                continue;
+            }
             EntryList *entries = accounts_entries_for_account(
                 &accounts->alist, split->account);
             entries_create(entries, split, txn->txn);
         }
     }
+    if (only_set != NULL) {
+        g_hash_table_destroy(only_set);
+    }
 
+    // Entry lists that didn't get new entries have nothing to cook and return
+    // immediately.
     GHashTableIter iter;
     g_hash_table_iter_init(&iter, accounts->alist.a2entries);
 
@@ -2822,6 +3067,312 @@ py_patch_today(PyObject *self, PyObject *today_p)
     Py_RETURN_NONE;
 }
 
+/* Fills `list` with the UTF-8 strings of the `names` iterable, NULL-terminated.
+ *
+ * Strings belong to their Python objects: `names` has to outlive `list`.
+ * Returns NULL on error. `list` has to be freed.
+ */
+static char**
+_names_from_pyiter(PyObject *names)
+{
+    Py_ssize_t len = PyObject_Length(names);
+    if (len < 0) {
+        return NULL;
+    }
+    char **res = calloc(len + 1, sizeof(char *));
+    if (res == NULL) {
+        PyErr_NoMemory();
+        return NULL;
+    }
+    PyObject *iter = PyObject_GetIter(names);
+    if (iter == NULL) {
+        free(res);
+        return NULL;
+    }
+    PyObject *item;
+    int i = 0;
+    while (i < len && (item = PyIter_Next(iter))) {
+        res[i] = (char *)PyUnicode_AsUTF8(item);
+        Py_DECREF(item);
+        if (res[i] == NULL) {
+            Py_DECREF(iter);
+            free(res);
+            return NULL;
+        }
+        i++;
+    }
+    Py_DECREF(iter);
+    if (PyErr_Occurred()) {
+        free(res);
+        return NULL;
+    }
+    res[i] = NULL;
+    return res;
+}
+
+/* Fills `query` with the criteria in the `pyquery` dict.
+ *
+ * See txn_matches() in core.model.transaction for the format of `pyquery`.
+ * Strings in `query` belong to `pyquery`, which has to outlive it. Returns
+ * false on error. Call _query_deinit() when done.
+ */
+static bool
+_query_from_pydict(TransactionQuery *query, PyObject *pyquery)
+{
+    const char *strkeys[] = {"description", "payee", "checkno", "memo"};
+    char **strdsts[] = {
+        &query->description, &query->payee, &query->checkno, &query->memo};
+    memset(query, 0, sizeof(TransactionQuery));
+    for (int i=0; i<4; i++) {
+        PyObject *value = PyDict_GetItemString(pyquery, strkeys[i]); // borrowed
+        if (value != NULL) {
+            *strdsts[i] = (char *)PyUnicode_AsUTF8(value);
+            if (*strdsts[i] == NULL) {
+                return false;
+            }
+        }
+    }
+    PyObject *amount = PyDict_GetItemString(pyquery, "amount"); // borrowed
+    if (amount != NULL) {
+        query->has_amount = true;
+        PyObject *pyfloat = PyNumber_Float(amount);
+        if (pyfloat == NULL) {
+            return false;
+        }
+        query->amount = PyFloat_AsDouble(pyfloat);
+        Py_DECREF(pyfloat);
+    }
+    PyObject *accounts = PyDict_GetItemString(pyquery, "account"); // borrowed
+    if (accounts != NULL) {
+        query->accounts = _names_from_pyiter(accounts);
+        if (query->accounts == NULL) {
+            return false;
+        }
+    }
+    PyObject *groups = PyDict_GetItemString(pyquery, "group"); // borrowed
+    if (groups != NULL) {
+        query->groups = _names_from_pyiter(groups);
+        if (query->groups == NULL) {
+            free(query->accounts);
+            return false;
+        }
+    }
+    return true;
+}
+
+static void
+_query_deinit(TransactionQuery *query)
+{
+    free(query->accounts);
+    free(query->groups);
+}
+
+/* txns_matching(items, query)
+ *
+ * Returns a list of the items in `items` that match `query`. `query` is a
+ * dict of criteria as described in txn_matches() in core.model.transaction.
+ *
+ * `items` can be a TransactionList, an EntryList or an iterable of
+ * transactions or entries. When it's an iterable, the returned list contains
+ * the items themselves.
+ */
+static PyObject*
+py_txns_matching(PyObject *self, PyObject *args)
+{
+    PyObject *items;
+    PyObject *pyquery;
+    TransactionQuery query;
+    PyObject *res;
+    int is_tlist, is_elist;
+
+    if (!PyArg_ParseTuple(args, "OO!", &items, &PyDict_Type, &pyquery)) {
+        return NULL;
+    }
+    if (!_query_from_pydict(&query, pyquery)) {
+        return NULL;
+    }
+    res = PyList_New(0);
+    if (res == NULL) {
+        goto error;
+    }
+    is_tlist = PyObject_IsInstance(items, TransactionList_Type);
+    if (is_tlist < 0) {
+        goto error;
+    }
+    is_elist = is_tlist ? 0 : PyObject_IsInstance(items, EntryList_Type);
+    if (is_elist < 0) {
+        goto error;
+    }
+    if (is_tlist) {
+        TransactionList *tlist = &((PyTransactionList *)items)->tlist;
+        for (unsigned int i=0; i<tlist->count; i++) {
+            Transaction *txn = tlist->txns[i];
+            if (transaction_matches(txn, &query)) {
+                PyObject *pytxn = (PyObject *)_PyTransaction_from_txn(txn);
+                if (pytxn == NULL) {
+                    goto error;
+                }
+                int rc = PyList_Append(res, pytxn);
+                Py_DECREF(pytxn);
+                if (rc < 0) {
+                    goto error;
+                }
+            }
+        }
+    } else if (is_elist) {
+        EntryList *entries = ((PyEntryList *)items)->entries;
+        for (int i=0; i<entries->count; i++) {
+            Entry *entry = &entries->entries[i];
+            if (transaction_matches(entry->txn, &query)) {
+                PyObject *pyentry = (PyObject *)_PyEntry_from_entry(entry);
+                if (pyentry == NULL) {
+                    goto error;
+                }
+                int rc = PyList_Append(res, pyentry);
+                Py_DECREF(pyentry);
+                if (rc < 0) {
+                    goto error;
+                }
+            }
+        }
+    } else {
+        PyObject *iter = PyObject_GetIter(items);
+        if (iter == NULL) {
+            goto error;
+        }
+        PyObject *item;
+        while ((item = PyIter_Next(iter))) {
+            Transaction *txn;
+            int is_txn = 0;
+            if (Entry_Check(item)) {
+                txn = ((PyEntry *)item)->entry.txn;
+            } else if ((is_txn = PyObject_IsInstance(item, Transaction_Type)) > 0) {
+                txn = ((PyTransaction *)item)->txn;
+            } else {
+                if (is_txn == 0) {
+                    PyErr_SetString(
+                        PyExc_TypeError, "items must be transactions or entries");
+                }
+                Py_DECREF(item);
+                Py_DECREF(iter);
+                goto error;
+            }
+            if (transaction_matches(txn, &query) && PyList_Append(res, item) < 0) {
+                Py_DECREF(item);
+                Py_DECREF(iter);
+                goto error;
+            }
+            Py_DECREF(item);
+        }
+        Py_DECREF(iter);
+        if (PyErr_Occurred()) {
+            goto error;
+        }
+    }
+    _query_deinit(&query);
+    return res;
+
+error:
+    Py_XDECREF(res);
+    _query_deinit(&query);
+    return NULL;
+}
+
+/* balance_series(entry_lists, from_date, to_date, currency)
+ *
+ * Returns the daily sum of the balances of `entry_lists`, converted to
+ * `currency`, as a list of `(date, amount)` for the days, from `from_date` to
+ * `to_date`, where that sum changes. The first item is always `from_date`.
+ *
+ * See entries_balance_series().
+ */
+static PyObject*
+py_balance_series(PyObject *self, PyObject *args)
+{
+    PyObject *lists_p;
+    PyObject *from_p;
+    PyObject *to_p;
+    char *code;
+
+    if (!PyArg_ParseTuple(args, "OOOs", &lists_p, &from_p, &to_p, &code)) {
+        return NULL;
+    }
+    Currency *currency = getcur(code);
+    if (currency == NULL) {
+        return NULL;
+    }
+    time_t from = pydate2time(from_p);
+    time_t to = pydate2time(to_p);
+    if (from == -1 || to == -1) {
+        return NULL;
+    }
+    PyObject *seq = PySequence_Fast(lists_p, "entry_lists must be iterable");
+    if (seq == NULL) {
+        return NULL;
+    }
+    EntryList **lists = NULL;
+    BalancePoint *points = NULL;
+    PyObject *res = NULL;
+    int listcount = PySequence_Fast_GET_SIZE(seq);
+    lists = malloc(sizeof(EntryList *) * listcount);
+    if (lists == NULL && listcount > 0) {
+        PyErr_NoMemory();
+        goto error;
+    }
+    for (int i=0; i<listcount; i++) {
+        PyObject *item = PySequence_Fast_GET_ITEM(seq, i); // borrowed
+        int is_elist = PyObject_IsInstance(item, EntryList_Type);
+        if (is_elist < 0) {
+            goto error;
+        }
+        if (!is_elist) {
+            PyErr_SetString(PyExc_TypeError, "not an entry list");
+            goto error;
+        }
+        lists[i] = ((PyEntryList *)item)->entries;
+    }
+    int count;
+    points = entries_balance_series(lists, listcount, currency, from, to, &count);
+    if (points == NULL) {
+        PyErr_SetString(PyExc_ValueError, "problems getting a rate");
+        goto error;
+    }
+    res = PyList_New(count);
+    if (res == NULL) {
+        goto error;
+    }
+    for (int i=0; i<count; i++) {
+        Amount amount;
+        amount_set(&amount, points[i].val, currency);
+        PyObject *date_p = time2pydate(points[i].date);
+        if (date_p == NULL) {
+            goto error;
+        }
+        PyObject *amount_p = pyamount(&amount);
+        if (amount_p == NULL) {
+            Py_DECREF(date_p);
+            goto error;
+        }
+        // Py_BuildValue() steals both references with "N", even when it fails.
+        PyObject *point_p = Py_BuildValue("(NN)", date_p, amount_p);
+        if (point_p == NULL) {
+            goto error;
+        }
+        PyList_SET_ITEM(res, i, point_p);
+    }
+    free(points);
+    free(lists);
+    Py_DECREF(seq);
+    return res;
+
+error:
+    Py_XDECREF(res);
+    free(points);
+    free(lists);
+    Py_DECREF(seq);
+    return NULL;
+}
+
 static PyObject*
 py_inc_date(PyObject *self, PyObject *args)
 {
@@ -2874,52 +3425,9 @@ PyTransactionList_init(PyTransactionList *self, PyObject *args, PyObject *kwds)
     }
 
     transactions_init(&self->tlist);
-    self->descriptions = NULL;
-    self->payees = NULL;
-    self->account_names = NULL;
     return 0;
 }
 
-static PyObject*
-PyTransactionList_clear_cache(PyTransactionList *self)
-{
-    if (self->descriptions != NULL) {
-        Py_DECREF(self->descriptions);
-        self->descriptions = NULL;
-    }
-    if (self->payees != NULL) {
-        Py_DECREF(self->payees);
-        self->payees = NULL;
-    }
-    if (self->account_names != NULL) {
-        Py_DECREF(self->account_names);
-        self->account_names = NULL;
-    }
-    Py_RETURN_NONE;
-}
-
-static PyObject*
-PyTransactionList_account_names(PyTransactionList *self)
-{
-    if (self->account_names != NULL) {
-        Py_INCREF(self->account_names);
-        return self->account_names;
-    }
-    char **account_names = transactions_account_names(&self->tlist);
-    char **iter = account_names;
-    PyObject *res = PyList_New(0);
-    while (*iter != NULL) {
-        PyObject *s = _strget(*iter);
-        PyList_Append(res, s);
-        Py_DECREF(s);
-        iter++;
-    }
-    free(account_names);
-    self->account_names = res;
-    Py_INCREF(self->account_names);
-    return res;
-}
-
 static PyObject*
 PyTransactionList_add(PyTransactionList *self, PyObject *args)
 {
@@ -2968,41 +3476,17 @@ PyTransactionList_add(PyTransactionList *self, PyObject *args)
         txn->txn->ref = toadd;
     }
     transactions_add(&self->tlist, toadd, keep_position);
-    PyTransactionList_clear_cache(self);
     Py_RETURN_NONE;
 }
 
 static PyObject*
 PyTransactionList_clear(PyTransactionList *self, PyObject *args)
 {
-    PyTransactionList_clear_cache(self);
     transactions_deinit(&self->tlist);
     transactions_init(&self->tlist);
     Py_RETURN_NONE;
 }
 
-static PyObject*
-PyTransactionList_descriptions(PyTransactionList *self)
-{
-    if (self->descriptions != NULL) {
-        Py_INCREF(self->descriptions);
-        return self->descriptions;
-    }
-    char **descs = transactions_descriptions(&self->tlist);
-    char **iter = descs;
-    PyObject *res = PyList_New(0);
-    while (*iter != NULL) {
-        PyObject *s = _strget(*iter);
-        PyList_Append(res, s);
-        Py_DECREF(s);
-        iter++;
-    }
-    free(descs);
-    self->descriptions = res;
-    Py_INCREF(self->descriptions);
-    return res;
-}
-
 static PyObject*
 PyTransactionList_first(PyTransactionList *self, PyObject *args)
 {
@@ -3024,28 +3508,6 @@ PyTransactionList_last(PyTransactionList *self, PyObject *args)
         self->tlist.txns[self->tlist.count-1]);
 }
 
-static PyObject*
-PyTransactionList_payees(PyTransactionList *self)
-{
-    if (self->payees != NULL) {
-        Py_INCREF(self->payees);
-        return self->payees;
-    }
-    char **payees = transactions_payees(&self->tlist);
-    char **iter = payees;
-    PyObject *res = PyList_New(0);
-    while (*iter != NULL) {
-        PyObject *s = _strget(*iter);
-        PyList_Append(res, s);
-        Py_DECREF(s);
-        iter++;
-    }
-    free(payees);
-    self->payees = res;
-    Py_INCREF(self->payees);
-    return res;
-}
-
 static PyObject *
 PyTransactionList_move_before(PyTransactionList *self, PyObject *args)
 {
@@ -3081,7 +3543,6 @@ PyTransactionList_reassign_account(PyTransactionList *self, PyObject *args)
         reassign_to = reassign_to_p->account;
     }
     transactions_reassign_account(&self->tlist, account, reassign_to);
-    PyTransactionList_clear_cache(self);
     Py_RETURN_NONE;
 }
 
@@ -3091,7 +3552,17 @@ PyTransactionList_remove(PyTransactionList *self, PyTransaction *txn)
     if (!transactions_remove(&self->tlist, txn->txn)) {
         return NULL;
     }
-    PyTransactionList_clear_cache(self);
+    Py_RETURN_NONE;
+}
+
+/* Re-files `txn` after its date or position was directly modified.
+ *
+ * Does nothing if `txn` isn't in the list.
+ */
+static PyObject*
+PyTransactionList_reposition(PyTransactionList *self, PyTransaction *txn)
+{
+    transactions_reposition(&self->tlist, txn->txn);
     Py_RETURN_NONE;
 }
 
@@ -3125,21 +3596,54 @@ PyTransactionList_transactions_at_date(PyTransactionList *self, PyObject *date_p
     return res;
 }
 
-static int
-PyTransactionList_contains(PyTransactionList *self, PyTransaction *txn)
+/* Returns the txn of `self` that `txn` stands for, or NULL if there's none.
+ *
+ * That's either `txn` itself or, if it was imported from another list, the
+ * copy we added. See PyTransactionList_add().
+ */
+static Transaction*
+_PyTransactionList_find(PyTransactionList *self, PyTransaction *txn)
 {
     if (txn->owned) {
-        return 0;
+        return NULL;
     }
     if (transactions_find(&self->tlist, txn->txn) >= 0) {
-        return 1;
+        return txn->txn;
     }
     if (txn->txn->ref != NULL) {
         if (transactions_find(&self->tlist, txn->txn->ref) >= 0) {
-            return 1;
+            return txn->txn->ref;
         }
     }
-    return 0;
+    return NULL;
+}
+
+/* find(txn)
+ *
+ * Returns the transaction of the list that `txn` stands for, or None. It's
+ * `txn` itself unless the list holds a copy of it.
+ */
+static PyObject*
+PyTransactionList_find(PyTransactionList *self, PyObject *txn)
+{
+    int is_txn = PyObject_IsInstance(txn, Transaction_Type);
+    if (is_txn <= 0) {
+        if (is_txn == 0) {
+            PyErr_SetString(PyExc_TypeError, "not a txn");
+        }
+        return NULL;
+    }
+    Transaction *found = _PyTransactionList_find(self, (PyTransaction *)txn);
+    if (found == NULL) {
+        Py_RETURN_NONE;
+    }
+    return (PyObject *)_PyTransaction_from_txn(found);
+}
+
+static int
+PyTransactionList_contains(PyTransactionList *self, PyTransaction *txn)
+{
+    return _PyTransactionList_find(self, txn) != NULL;
 }
 
 static PyObject*
@@ -3165,9 +3669,6 @@ static void
 PyTransactionList_dealloc(PyTransactionList *self)
 {
     transactions_deinit(&self->tlist);
-    Py_XDECREF(self->descriptions);
-    Py_XDECREF(self->payees);
-    Py_XDECREF(self->account_names);
     Py_TYPE(self)->tp_free(self);
 }
 
@@ -3403,15 +3904,23 @@ static PyMethodDef module_methods[] = {
     {"amount_format", (PyCFunction)py_amount_format, METH_VARARGS | METH_KEYWORDS},
     {"amount_parse", (PyCFunction)py_amount_parse, METH_VARARGS | METH_KEYWORDS},
     {"amount_convert", (PyCFunction)py_amount_convert, METH_VARARGS},
+    {"balance_series", py_balance_series, METH_VARARGS},
+    // Returns `(val, currency_code)`, the raw internal value of `amount`.
+    // `currency_code` is `None` for a zero amount without currency.
+    {"amount_raw", py_amount_raw, METH_O},
+    // Creates an amount from values returned by `amount_raw()`.
+    {"amount_from_raw", py_amount_from_raw, METH_VARARGS},
     {"currency_global_init", py_currency_global_init, METH_VARARGS},
     {"currency_global_reset_currencies", py_currency_global_reset_currencies, METH_NOARGS},
     {"currency_register", py_currency_register, METH_VARARGS},
     {"currency_getrate", py_currency_getrate, METH_VARARGS},
     {"currency_set_CAD_value", py_currency_set_CAD_value, METH_VARARGS},
+    {"currency_set_CAD_values", py_currency_set_CAD_values, METH_O},
     {"currency_daterange", py_currency_daterange, METH_VARARGS},
     {"oven_cook_txns", py_oven_cook_txns, METH_VARARGS},
     {"patch_today", py_patch_today, METH_O},
     {"inc_date", py_inc_date, METH_VARARGS},
+    {"txns_matching", py_txns_matching, METH_VARARGS},
     {NULL}  /* Sentinel */
 };
 
@@ -3423,6 +3932,9 @@ static PyMethodDef PyEntryList_methods[] = {
     // Returns the sum of entry amounts occuring in `date_range`.
     // If `currency` is specified, the result is converted to it.
     {"cash_flow", (PyCFunction)PyEntryList_cash_flow, METH_VARARGS, ""},
+    // Returns a list with the cash flow of each range in `date_ranges`.
+    // Same as calling `cash_flow()` for each of them, but faster.
+    {"cash_flow_by_period", (PyCFunction)PyEntryList_cash_flow_by_period, METH_VARARGS, ""},
     // Remove all entries after `from_date`.
     {"clear", (PyCFunction)PyEntryList_clear, METH_VARARGS, ""},
     // Return the last entry with a date that isn't after `date`.
@@ -3430,11 +3942,20 @@ static PyMethodDef PyEntryList_methods[] = {
     {"last_entry", (PyCFunction)PyEntryList_last_entry, METH_VARARGS, ""},
     {"normal_balance", (PyCFunction)PyEntryList_normal_balance, METH_VARARGS, ""},
     {"normal_cash_flow", (PyCFunction)PyEntryList_normal_cash_flow, METH_VARARGS, ""},
+    {"normal_cash_flow_by_period", (PyCFunction)PyEntryList_normal_cash_flow_by_period, METH_VARARGS, ""},
     {0, 0, 0, 0},
 };
 
+static PyGetSetDef PyEntryList_getseters[] = {
+    // Changes whenever entries change. Never the same for two different
+    // states of any entry list.
+    {"generation", (getter)PyEntryList_generation, NULL, NULL, NULL},
+    {0, 0, 0, 0, 0},
+};
+
 static PyType_Slot EntryList_Slots[] = {
     {Py_tp_methods, PyEntryList_methods},
+    {Py_tp_getset, PyEntryList_getseters},
     {Py_sq_length, PyEntryList_len},
     {Py_tp_iter, PyEntryList_iter},
     {Py_tp_dealloc, PyEntryList_dealloc},
@@ -3601,29 +4122,23 @@ PyType_Spec Transaction_Type_Spec = {
 static PyMethodDef PyTransactionList_methods[] = {
     {"add", (PyCFunction)PyTransactionList_add, METH_VARARGS, ""},
     {"clear", (PyCFunction)PyTransactionList_clear, METH_NOARGS, ""},
-    {"clear_cache", (PyCFunction)PyTransactionList_clear_cache, METH_NOARGS, ""},
+    {"find", (PyCFunction)PyTransactionList_find, METH_O, ""},
     {"first", (PyCFunction)PyTransactionList_first, METH_NOARGS, ""},
     {"last", (PyCFunction)PyTransactionList_last, METH_NOARGS, ""},
     {"move_before", (PyCFunction)PyTransactionList_move_before, METH_VARARGS, ""},
     {"move_last", (PyCFunction)PyTransactionList_move_last, METH_O, ""},
     {"reassign_account", (PyCFunction)PyTransactionList_reassign_account, METH_VARARGS, ""},
     {"remove", (PyCFunction)PyTransactionList_remove, METH_O, ""},
+    {"reposition", (PyCFunction)PyTransactionList_reposition, METH_O, ""},
     {"sort", (PyCFunction)PyTransactionList_sort, METH_NOARGS, ""},
     {"transactions_at_date", (PyCFunction)PyTransactionList_transactions_at_date, METH_O, ""},
     {0, 0, 0, 0},
 };
 
-static PyGetSetDef PyTransactionList_getseters[] = {
-    {"account_names", (getter)PyTransactionList_account_names, NULL, NULL, NULL},
-    {"descriptions", (getter)PyTransactionList_descriptions, NULL, NULL, NULL},
-    {"payees", (getter)PyTransactionList_payees, NULL, NULL, NULL},
-    {0, 0, 0, 0, 0},
-};
 
 static PyType_Slot TransactionList_Slots[] = {
     {Py_tp_init, PyTransactionList_init},
     {Py_tp_methods, PyTransactionList_methods},
-    {Py_tp_getset, PyTransactionList_getseters},
     {Py_sq_length, PyTransactionList_len},
     {Py_sq_contains, PyTransactionList_contains},
     {Py_tp_iter, PyTransactionList_iter},
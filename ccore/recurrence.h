@@ -1,6 +1,5 @@
 #include <time.h>
-
-#define SECS_IN_DAY 86400
+#include "util.h"
 
 typedef enum {
     REPEAT_DAILY,
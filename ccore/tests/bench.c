@@ -0,0 +1,84 @@
+/* Cooking benchmark
+ *
+ * Not a unit test. Creates a large amount of transactions in a few accounts
+ * and then repeatedly clears and re-cooks all their entries, the way the
+ * oven does it on a full re-cook. Reports the time spent cooking and the
+ * process' peak RSS.
+ *
+ * Usage: ./runbench [txn_count] [cook_count]
+ */
+#include <stdio.h>
+#include <stdlib.h>
+#include <time.h>
+#include <sys/resource.h>
+#include "../accounts.h"
+#include "../transaction.h"
+#include "../entry.h"
+#include "../currency.h"
+
+#define ACCOUNT_COUNT 10
+#define DAY (60 * 60 * 24)
+
+int main(int argc, char *argv[])
+{
+    int txncount = argc > 1 ? atoi(argv[1]) : 100000;
+    int cookcount = argc > 2 ? atoi(argv[2]) : 20;
+
+    currency_global_init(":memory:");
+    Currency *USD = currency_get("USD");
+    AccountList al;
+    accounts_init(&al, USD);
+    Account *accounts[ACCOUNT_COUNT];
+    EntryList *entries[ACCOUNT_COUNT];
+    char name[32];
+    for (int i=0; i<ACCOUNT_COUNT; i++) {
+        accounts[i] = accounts_create(&al);
+        snprintf(name, sizeof(name), "account%d", i);
+        account_init(accounts[i], name, USD, ACCOUNT_ASSET);
+        entries[i] = accounts_entries_for_account(&al, accounts[i]);
+    }
+
+    Transaction *txns = malloc(sizeof(Transaction) * txncount);
+    for (int i=0; i<txncount; i++) {
+        Transaction *txn = &txns[i];
+        transaction_init(txn, TXN_TYPE_NORMAL, (time_t)(i / 10) * DAY);
+        transaction_resize_splits(txn, 2);
+        txn->splits[0].account = accounts[i % ACCOUNT_COUNT];
+        amount_set(&txn->splits[0].amount, 4200 + i, USD);
+        txn->splits[1].account = accounts[(i + 1) % ACCOUNT_COUNT];
+        amount_set(&txn->splits[1].amount, -4200 - i, USD);
+    }
+
+    clock_t start = clock();
+    for (int c=0; c<cookcount; c++) {
+        for (int i=0; i<ACCOUNT_COUNT; i++) {
+            entries_clear(entries[i], 0);
+        }
+        for (int i=0; i<txncount; i++) {
+            Transaction *txn = &txns[i];
+            for (unsigned int j=0; j<txn->splitcount; j++) {
+                Split *split = &txn->splits[j];
+                EntryList *el = accounts_entries_for_account(&al, split->account);
+                entries_create(el, split, txn);
+            }
+        }
+        for (int i=0; i<ACCOUNT_COUNT; i++) {
+            entries_cook(entries[i]);
+        }
+    }
+    double elapsed = (double)(clock() - start) / CLOCKS_PER_SEC;
+
+    struct rusage usage;
+    getrusage(RUSAGE_SELF, &usage);
+    printf("%d txns, %d cooks\n", txncount, cookcount);
+    printf("cook time: %.3f ms/cook\n", elapsed * 1000 / cookcount);
+    printf("peak RSS: %ld KB\n", usage.ru_maxrss);
+
+    for (int i=0; i<txncount; i++) {
+        transaction_deinit(&txns[i]);
+    }
+    free(txns);
+    accounts_deinit(&al);
+    currency_global_deinit();
+    return 0;
+}
@@ -0,0 +1,170 @@
+#include <stdlib.h>
+#include <CUnit/CUnit.h>
+#include "../entry.h"
+#include "../accounts.h"
+#include "../currency.h"
+
+// 2019-01-01 plus `n` days
+#define DAY(n) (1546300800 + (n) * SECS_IN_DAY)
+
+static void _add_entry(EntryList *entries, Transaction *txn, time_t date, int64_t val)
+{
+    transaction_init(txn, TXN_TYPE_NORMAL, date);
+    Split *s = transaction_add_split(txn);
+    s->account = entries->account;
+    amount_set(&s->amount, val, entries->account->currency);
+    entries_create(entries, s, txn);
+}
+
+static void test_balance_series()
+{
+    Currency *CAD = currency_get("CAD");
+    Currency *XBS = currency_register("XBS", 2, 0, 0, 0, 0);
+    AccountList al;
+    accounts_init(&al, CAD);
+    Account *a1 = accounts_create(&al);
+    account_init(a1, "a1", CAD, ACCOUNT_ASSET);
+    Account *a2 = accounts_create(&al);
+    account_init(a2, "a2", CAD, ACCOUNT_ASSET);
+    Account *a3 = accounts_create(&al);
+    account_init(a3, "a3", XBS, ACCOUNT_ASSET);
+    EntryList e1, e2, e3;
+    entries_init(&e1, a1);
+    entries_init(&e2, a2);
+    entries_init(&e3, a3);
+    Transaction txns[4];
+    _add_entry(&e1, &txns[0], DAY(1), 100);
+    _add_entry(&e1, &txns[1], DAY(5), -30);
+    _add_entry(&e2, &txns[2], DAY(3), 50);
+    _add_entry(&e3, &txns[3], DAY(6), 10);
+    entries_cook(&e1);
+    entries_cook(&e2);
+    entries_cook(&e3);
+
+    // We only get the days where the sum of balances changes.
+    EntryList *lists[] = {&e1, &e2, &e3};
+    int count;
+    BalancePoint *points = entries_balance_series(lists, 2, CAD, DAY(0), DAY(10), &count);
+    CU_ASSERT_EQUAL_FATAL(count, 4);
+    CU_ASSERT_EQUAL(points[0].date, DAY(0));
+    CU_ASSERT_EQUAL(points[0].val, 0);
+    CU_ASSERT_EQUAL(points[1].date, DAY(1));
+    CU_ASSERT_EQUAL(points[1].val, 100);
+    CU_ASSERT_EQUAL(points[2].date, DAY(3));
+    CU_ASSERT_EQUAL(points[2].val, 150);
+    CU_ASSERT_EQUAL(points[3].date, DAY(5));
+    CU_ASSERT_EQUAL(points[3].val, 120);
+    free(points);
+
+    // The first point has the balance of entries before the range.
+    points = entries_balance_series(lists, 2, CAD, DAY(2), DAY(4), &count);
+    CU_ASSERT_EQUAL_FATAL(count, 2);
+    CU_ASSERT_EQUAL(points[0].date, DAY(2));
+    CU_ASSERT_EQUAL(points[0].val, 100);
+    CU_ASSERT_EQUAL(points[1].date, DAY(3));
+    CU_ASSERT_EQUAL(points[1].val, 150);
+    free(points);
+
+    // Balances in another currency are converted at the rate of each day.
+    currency_set_CAD_value(DAY(0), XBS, 2);
+    currency_set_CAD_value(DAY(7), XBS, 3);
+    points = entries_balance_series(lists, 3, CAD, DAY(0), DAY(10), &count);
+    CU_ASSERT_EQUAL_FATAL(count, 6);
+    CU_ASSERT_EQUAL(points[4].date, DAY(6));
+    CU_ASSERT_EQUAL(points[4].val, 140);
+    CU_ASSERT_EQUAL(points[5].date, DAY(7));
+    CU_ASSERT_EQUAL(points[5].val, 150);
+    free(points);
+
+    entries_deinit(&e1);
+    entries_deinit(&e2);
+    entries_deinit(&e3);
+    accounts_deinit(&al);
+}
+
+static void test_cash_flow()
+{
+    Currency *CAD = currency_get("CAD");
+    Currency *XBS = currency_register("XBS", 2, 0, 0, 0, 0);
+    currency_set_CAD_value(DAY(0), XBS, 2);
+    currency_set_CAD_value(DAY(7), XBS, 3);
+    AccountList al;
+    accounts_init(&al, CAD);
+    Account *a = accounts_create(&al);
+    account_init(a, "a", CAD, ACCOUNT_ASSET);
+    EntryList e;
+    entries_init(&e, a);
+    Transaction txns[5];
+    _add_entry(&e, &txns[0], DAY(1), 100);
+    _add_entry(&e, &txns[1], DAY(2), 1000);
+    txns[1].type = TXN_TYPE_BUDGET;
+    _add_entry(&e, &txns[2], DAY(3), 10);
+    txns[2].splits[0].amount.currency = XBS;
+    _add_entry(&e, &txns[3], DAY(8), 7);
+    entries_cook(&e);
+    // Not cooked yet
+    _add_entry(&e, &txns[4], DAY(9), 3);
+
+    Amount amount;
+    amount.currency = CAD;
+    CU_ASSERT_FATAL(entries_cash_flow(&e, &amount, DAY(1), DAY(8)));
+    CU_ASSERT_EQUAL(amount.val, 127);
+    CU_ASSERT_FATAL(entries_cash_flow(&e, &amount, DAY(2), DAY(2)));
+    CU_ASSERT_EQUAL(amount.val, 0);
+    CU_ASSERT_FATAL(entries_cash_flow(&e, &amount, DAY(3), DAY(10)));
+    CU_ASSERT_EQUAL(amount.val, 30);
+    CU_ASSERT_FATAL(entries_cash_flow(&e, &amount, DAY(5), DAY(4)));
+    CU_ASSERT_EQUAL(amount.val, 0);
+    amount.currency = XBS;
+    CU_ASSERT_FATAL(entries_cash_flow(&e, &amount, DAY(3), DAY(3)));
+    CU_ASSERT_EQUAL(amount.val, 10);
+
+    entries_deinit(&e);
+    accounts_deinit(&al);
+}
+
+static void test_cash_flow_by_period()
+{
+    Currency *CAD = currency_get("CAD");
+    AccountList al;
+    accounts_init(&al, CAD);
+    Account *a = accounts_create(&al);
+    account_init(a, "a", CAD, ACCOUNT_ASSET);
+    EntryList e;
+    entries_init(&e, a);
+    Transaction txns[5];
+    _add_entry(&e, &txns[0], DAY(1), 100);
+    _add_entry(&e, &txns[1], DAY(3), -30);
+    _add_entry(&e, &txns[2], DAY(3), 5);
+    _add_entry(&e, &txns[3], DAY(4), 1000);
+    txns[3].type = TXN_TYPE_BUDGET;
+    _add_entry(&e, &txns[4], DAY(8), 42);
+    entries_cook(&e);
+
+    // Bounds are inclusive, budget spawns aren't counted and periods don't
+    // have to be ordered.
+    time_t froms[] = {DAY(0), DAY(3), DAY(4), DAY(0)};
+    time_t tos[] = {DAY(2), DAY(3), DAY(7), DAY(10)};
+    Amount amounts[4];
+    for (int i=0; i<4; i++) {
+        amounts[i].currency = CAD;
+    }
+    CU_ASSERT_FATAL(entries_cash_flow_by_period(&e, amounts, froms, tos, 4));
+    CU_ASSERT_EQUAL(amounts[0].val, 100);
+    CU_ASSERT_EQUAL(amounts[1].val, -25);
+    CU_ASSERT_EQUAL(amounts[2].val, 0);
+    CU_ASSERT_EQUAL(amounts[3].val, 117);
+
+    entries_deinit(&e);
+    accounts_deinit(&al);
+}
+
+void test_entry_init()
+{
+    CU_pSuite s;
+
+    s = CU_add_suite("Entry", NULL, NULL);
+    CU_ADD_TEST(s, test_balance_series);
+    CU_ADD_TEST(s, test_cash_flow);
+    CU_ADD_TEST(s, test_cash_flow_by_period);
+}
@@ -1,5 +1,7 @@
+#include <stdlib.h>
 #include <CUnit/CUnit.h>
 #include "../transaction.h"
+#include "../transactions.h"
 #include "../accounts.h"
 #include "../currency.h"
 
@@ -137,6 +139,114 @@ static void test_affected_accounts()
     CU_ASSERT_PTR_NULL(affected[2]);
 }
 
+static void test_transactions_sort_order()
+{
+    TransactionList tl;
+    transactions_init(&tl);
+    Transaction t1, t2, t3, t4;
+    transaction_init(&t1, TXN_TYPE_NORMAL, 42);
+    transaction_init(&t2, TXN_TYPE_NORMAL, 12);
+    transaction_init(&t3, TXN_TYPE_NORMAL, 42);
+    transaction_init(&t4, TXN_TYPE_NORMAL, 42);
+    // whatever the order we add txns in, they end up sorted by date/position
+    transactions_add(&tl, &t1, false);
+    transactions_add(&tl, &t2, false);
+    transactions_add(&tl, &t3, false);
+    CU_ASSERT_EQUAL(tl.count, 3);
+    CU_ASSERT_PTR_EQUAL(tl.txns[0], &t2);
+    CU_ASSERT_PTR_EQUAL(tl.txns[1], &t1);
+    CU_ASSERT_PTR_EQUAL(tl.txns[2], &t3);
+    CU_ASSERT(t3.position > t1.position);
+    Transaction **at42 = transactions_at_date(&tl, 42);
+    CU_ASSERT_PTR_EQUAL(at42[0], &t1);
+    CU_ASSERT_PTR_EQUAL(at42[1], &t3);
+    CU_ASSERT_PTR_NULL(at42[2]);
+    free(at42);
+    CU_ASSERT_PTR_NULL(transactions_at_date(&tl, 43));
+
+    // moving re-files the txn
+    transactions_move_before(&tl, &t3, &t1);
+    CU_ASSERT_PTR_EQUAL(tl.txns[1], &t3);
+    CU_ASSERT_PTR_EQUAL(tl.txns[2], &t1);
+
+    // Direct modifications don't prevent us from finding the txn...
+    t2.date = 50;
+    CU_ASSERT_EQUAL(transactions_find(&tl, &t2), 0);
+    CU_ASSERT_EQUAL(transactions_find(&tl, &t4), -1);
+    // ... and we can re-file it.
+    CU_ASSERT(transactions_reposition(&tl, &t2));
+    CU_ASSERT_PTR_EQUAL(tl.txns[2], &t2);
+    CU_ASSERT_EQUAL(transactions_find(&tl, &t2), 2);
+    CU_ASSERT(!transactions_reposition(&tl, &t4));
+
+    CU_ASSERT(transactions_remove(&tl, &t3));
+    CU_ASSERT(!transactions_remove(&tl, &t3));
+    CU_ASSERT_EQUAL(tl.count, 2);
+    CU_ASSERT_PTR_EQUAL(tl.txns[0], &t1);
+    CU_ASSERT_PTR_EQUAL(tl.txns[1], &t2);
+    transactions_deinit(&tl);
+}
+
+static void test_matches()
+{
+    Currency *USD = currency_get("USD");
+    Account a = {0};
+    a.name = "Checking";
+    a.groupname = "Bank";
+    Transaction t;
+    transaction_init(&t, TXN_TYPE_NORMAL, 42);
+    t.description = "Barber Shop";
+    t.checkno = "42A";
+    Split *s = transaction_add_split(&t);
+    s->account = &a;
+    s->memo = "";
+    amount_set(&s->amount, -1250, USD);
+    s = transaction_add_split(&t);
+    s->account = NULL;
+    s->memo = "Haircut";
+    amount_set(&s->amount, 1250, USD);
+
+    TransactionQuery q = {0};
+    CU_ASSERT(!transaction_matches(&t, &q));
+    q.description = "ber sh";
+    CU_ASSERT(transaction_matches(&t, &q));
+    q.description = "barbers";
+    CU_ASSERT(!transaction_matches(&t, &q));
+    q.payee = "";
+    // An empty needle is in everything
+    CU_ASSERT(transaction_matches(&t, &q));
+
+    q = (TransactionQuery){0};
+    q.checkno = "42";
+    CU_ASSERT(!transaction_matches(&t, &q));
+    q.checkno = "42a";
+    CU_ASSERT(transaction_matches(&t, &q));
+
+    q = (TransactionQuery){0};
+    q.memo = "cut";
+    CU_ASSERT(transaction_matches(&t, &q));
+
+    q = (TransactionQuery){0};
+    q.has_amount = true;
+    q.amount = 12.5;
+    CU_ASSERT(transaction_matches(&t, &q));
+    q.amount = 12;
+    CU_ASSERT(!transaction_matches(&t, &q));
+
+    char *names[] = {"foo", "checking", NULL};
+    char *othernames[] = {"check", NULL};
+    q = (TransactionQuery){0};
+    q.accounts = othernames;
+    CU_ASSERT(!transaction_matches(&t, &q));
+    q.accounts = names;
+    CU_ASSERT(transaction_matches(&t, &q));
+    q = (TransactionQuery){0};
+    q.groups = names;
+    CU_ASSERT(!transaction_matches(&t, &q));
+    names[0] = "bank";
+    CU_ASSERT(transaction_matches(&t, &q));
+}
+
 void test_transaction_init()
 {
     CU_pSuite s;
@@ -146,4 +256,6 @@ void test_transaction_init()
     CU_ADD_TEST(s, test_balance_currencies);
     CU_ADD_TEST(s, test_balance);
     CU_ADD_TEST(s, test_affected_accounts);
+    CU_ADD_TEST(s, test_transactions_sort_order);
+    CU_ADD_TEST(s, test_matches);
 }
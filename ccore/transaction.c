@@ -1,6 +1,7 @@
 #include <stdlib.h>
 #include <string.h>
 #include <stdio.h>
+#include <math.h>
 #include "transaction.h"
 #include "util.h"
 
@@ -417,6 +418,94 @@ transaction_is_null(const Transaction *txn)
     return true;
 }
 
+static bool
+_lowered_contains(const char *s, const char *needle)
+{
+    if (s == NULL || s[0] == '\0') {
+        return needle[0] == '\0';
+    }
+    gchar *lowered = g_utf8_strdown(s, -1);
+    bool res = strstr(lowered, needle) != NULL;
+    g_free(lowered);
+    return res;
+}
+
+static bool
+_lowered_in(const char *s, char **names)
+{
+    if (s == NULL) {
+        return false;
+    }
+    gchar *lowered = g_utf8_strdown(s, -1);
+    bool res = false;
+    for (char **name=names; *name != NULL; name++) {
+        if (strcmp(lowered, *name) == 0) {
+            res = true;
+            break;
+        }
+    }
+    g_free(lowered);
+    return res;
+}
+
+bool
+transaction_matches(const Transaction *txn, const TransactionQuery *query)
+{
+    if (query->description != NULL) {
+        if (_lowered_contains(txn->description, query->description)) {
+            return true;
+        }
+    }
+    if (query->payee != NULL) {
+        if (_lowered_contains(txn->payee, query->payee)) {
+            return true;
+        }
+    }
+    if (query->checkno != NULL) {
+        const char *checkno = txn->checkno != NULL ? txn->checkno : "";
+        gchar *lowered = g_utf8_strdown(checkno, -1);
+        bool res = strcmp(lowered, query->checkno) == 0;
+        g_free(lowered);
+        if (res) {
+            return true;
+        }
+    }
+    for (unsigned int i=0; i<txn->splitcount; i++) {
+        Split *split = &txn->splits[i];
+        if (query->memo != NULL) {
+            if (_lowered_contains(split->memo, query->memo)) {
+                return true;
+            }
+        }
+        if (query->has_amount) {
+            double val = 0;
+            if (split->amount.val) {
+                val = (double)split->amount.val / pow(10, split->amount.currency->exponent);
+            }
+            if (query->amount == fabs(val)) {
+                return true;
+            }
+        }
+        if (split->account == NULL) {
+            continue;
+        }
+        if (query->accounts != NULL) {
+            if (_lowered_in(split->account->name, query->accounts)) {
+                return true;
+            }
+        }
+        if (query->groups != NULL && split->account->groupname != NULL) {
+            if (split->account->groupname[0] == '\0') {
+                continue;
+            }
+            if (_lowered_in(split->account->groupname, query->groups)) {
+                return true;
+            }
+        }
+    }
+    return false;
+}
+
 void
 transaction_mct_balance(Transaction *txn, Currency *new_split_currency)
 {
@@ -72,6 +72,24 @@ typedef struct _Transaction {
     time_t recurrence_date;
 } Transaction;
 
+/* A search query, as understood by `transaction_matches()`.
+ *
+ * Strings are lowercased and are NULL when we don't search for them.
+ * `accounts` and `groups` are NULL-terminated lists of lowercased names, or
+ * NULL when we don't search for them.
+ */
+typedef struct {
+    char *description;
+    char *payee;
+    char *checkno;
+    char *memo;
+    bool has_amount;
+    // Absolute value of the amount we search for, as a float.
+    double amount;
+    char **accounts;
+    char **groups;
+} TransactionQuery;
+
 void
 transaction_init(Transaction *txn, TransactionType type, time_t date);
 
@@ -194,6 +212,15 @@ transaction_is_mct(const Transaction *txn);
 bool
 transaction_is_null(const Transaction *txn);
 
+/* Returns whether `txn` matches any of the criteria in `query`.
+ *
+ * Description, payee and memo criteria match when they're in the lowercased
+ * text. Checkno, account names and group names have to be equal. The amount
+ * matches when it's equal to the absolute value of one of our splits.
+ */
+bool
+transaction_matches(const Transaction *txn, const TransactionQuery *query);
+
 /* Balances a multi-currency transaction using exchange rates.
  *
  * *This balancing doesn't occur automatically, it is a user-initiated action.*
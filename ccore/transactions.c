@@ -1,61 +1,111 @@
 #include <stdlib.h>
+#include <string.h>
+#include <limits.h>
 #include "transactions.h"
 
 /* Private */
 static int
-_txn_cmp_key(const void *a, const void *b)
+_key_cmp(time_t date1, int pos1, time_t date2, int pos2)
 {
-    Transaction *t1 = *((Transaction **)a);
-    Transaction *t2 = *((Transaction **)b);
-
-    if (t1->date != t2->date) {
-        return t1->date < t2->date ? -1 : 1;
+    if (date1 != date2) {
+        return date1 < date2 ? -1 : 1;
     }
-    if (t1->position != t2->position) {
-        return t1->position < t2->position ? -1 : 1;
+    if (pos1 != pos2) {
+        return pos1 < pos2 ? -1 : 1;
     }
     return 0;
 }
 
 static int
-_txn_cmp_mtime(const void *a, const void *b)
+_txn_cmp_key(const void *a, const void *b)
 {
     Transaction *t1 = *((Transaction **)a);
     Transaction *t2 = *((Transaction **)b);
 
-    if (t1->mtime != t2->mtime) {
-        return t1->mtime < t2->mtime ? -1 : 1;
+    return _key_cmp(t1->date, t1->position, t2->date, t2->position);
+}
+
+static TransactionKey*
+_filed_key(const TransactionList *txns, const Transaction *txn)
+{
+    return g_hash_table_lookup(txns->keys, txn);
+}
+
+/* Returns the index of the first txn filed under a key that is >= (or >, if
+ * `after` is true) than (date, position).
+ */
+static unsigned int
+_bisect(const TransactionList *txns, time_t date, int position, bool after)
+{
+    unsigned int lo = 0;
+    unsigned int hi = txns->count;
+    while (lo < hi) {
+        unsigned int mid = lo + (hi - lo) / 2;
+        TransactionKey *key = _filed_key(txns, txns->txns[mid]);
+        int cmp = _key_cmp(key->date, key->position, date, position);
+        if (cmp < 0 || (after && cmp == 0)) {
+            lo = mid + 1;
+        } else {
+            hi = mid;
+        }
     }
-    return 0;
+    return lo;
 }
 
-// TODO: re-instate this. seems to be causing problems
-// deduplicates *in place*. slist is NULL-terminated after and before.
-/*static void                                                      */
-/*_deduplicate_strings(char **slist)                               */
-/*{                                                                */
-/*    GHashTable *seen = g_hash_table_new(g_str_hash, g_str_equal);*/
-/*    char **iter = slist;                                         */
-/*    char **replace_iter = slist;                                 */
-/*    while (*iter != NULL) {                                      */
-/*        char *s = *iter;                                         */
-/*        if ((s[0] != '\0') && !g_hash_table_contains(seen, &s)) {*/
-/*            *replace_iter = s;                                   */
-/*            g_hash_table_add(seen, &s);                          */
-/*            replace_iter++;                                      */
-/*        }                                                        */
-/*        iter++;                                                  */
-/*    }                                                            */
-/*    *replace_iter = NULL;                                        */
-/*    g_hash_table_destroy(seen);                                  */
-/*}                                                                */
+// Inserts `txn` at its proper place according to its current date/position.
+static void
+_file(TransactionList *txns, Transaction *txn)
+{
+    if (txns->count == txns->capacity) {
+        txns->capacity = txns->capacity ? txns->capacity * 2 : 64;
+        txns->txns = realloc(txns->txns, sizeof(Transaction*) * txns->capacity);
+    }
+    // We insert after txns with the same key to keep insertion order stable.
+    unsigned int index = _bisect(txns, txn->date, txn->position, true);
+    memmove(
+        &txns->txns[index+1],
+        &txns->txns[index],
+        sizeof(Transaction*) * (txns->count - index));
+    txns->txns[index] = txn;
+    txns->count++;
+    TransactionKey *key = malloc(sizeof(TransactionKey));
+    key->date = txn->date;
+    key->position = txn->position;
+    g_hash_table_insert(txns->keys, txn, key);
+}
+
+// Removes txn at `index`.
+static void
+_unfile(TransactionList *txns, unsigned int index)
+{
+    g_hash_table_remove(txns->keys, txns->txns[index]);
+    memmove(
+        &txns->txns[index],
+        &txns->txns[index+1],
+        sizeof(Transaction*) * (txns->count - index - 1));
+    txns->count--;
+}
+
+// Updates the filed key of `txn` without moving it. Only valid when sort order
+// is preserved by the change.
+static void
+_refresh_key(TransactionList *txns, Transaction *txn)
+{
+    TransactionKey *key = _filed_key(txns, txn);
+    if (key != NULL) {
+        key->date = txn->date;
+        key->position = txn->position;
+    }
+}
 
 /* Public */
 void
 transactions_init(TransactionList *txns)
 {
     txns->count = 0;
+    txns->capacity = 0;
     txns->txns = NULL;
+    txns->keys = g_hash_table_new_full(g_direct_hash, g_direct_equal, NULL, free);
 }
 
 void
@@ -67,177 +117,102 @@ transactions_deinit(TransactionList *txns)
     /*    free(txn);                       */
     /*}                                    */
     free(txns->txns);
-}
-
-char**
-transactions_account_names(const TransactionList *txns)
-{
-    Transaction **bymtime = malloc(sizeof(Transaction*) * txns->count);
-    memcpy(bymtime, txns->txns, sizeof(Transaction*) * txns->count);
-    qsort(bymtime, txns->count, sizeof(Transaction*), _txn_cmp_mtime);
-
-    // we don't know our upper count limit beforehand. Let's try with
-    // txns->count and realloc if needed.
-    int count = txns->count;
-    char **res = malloc(sizeof(char*) * count);
-    int current = 0;
-    for (int i=txns->count-1; i>=0; i--) {
-        Account **accounts = transaction_affected_accounts(bymtime[i]);
-        while (*accounts != NULL) {
-            if (!(*accounts)->inactive) {
-                if (current == count) {
-                    // Didn't allocate enough space. double it.
-                    count *= 2;
-                    res = realloc(res, sizeof(char*) * count);
-                }
-                res[current] = (*accounts)->name;
-                current++;
-            }
-            accounts++;
-        }
-    }
-    res[current] = NULL;
-    return res;
+    g_hash_table_destroy(txns->keys);
 }
 
 void
 transactions_add(TransactionList *txns, Transaction *txn, bool keep_position)
 {
     if (!keep_position) {
-        Transaction **others = transactions_at_date(txns, txn->date);
-        if (others != NULL) {
-            Transaction **iter = others;
-            while (*iter != NULL) {
-                if ((*iter)->position >= txn->position) {
-                    txn->position = (*iter)->position + 1;
-                }
-                iter++;
+        // The last txn of the same date is the one with the highest position.
+        unsigned int index = _bisect(txns, txn->date, INT_MAX, true);
+        if (index > 0) {
+            TransactionKey *key = _filed_key(txns, txns->txns[index-1]);
+            if (key->date == txn->date && key->position >= txn->position) {
+                txn->position = key->position + 1;
             }
-            free(others);
         }
     }
-    txns->count++;
-    txns->txns = realloc(txns->txns, sizeof(Transaction*) * txns->count);
-    txns->txns[txns->count-1] = txn;
+    _file(txns, txn);
 }
 
 Transaction**
 transactions_at_date(const TransactionList *txns, time_t date)
 {
-    /* We don't (yet) maintain sort order at all times, so we have to iterate
-     * through the whole list. However, most of the time, all resulting txns
-     * will be bunched up together. Because we don't know how many elements we
-     * need to allocate yet, we start with a first pass, to get first/last
-     * indexes and count. This then allows us to allocate and, with first/last,
-     * make the second pass usually much faster.
-     */
-    int first, last, count=0;
-    for (int i=0; i<txns->count; i++) {
-        if (txns->txns[i]->date == date) {
-            last = i;
-            if (count == 0) {
-                first = i;
-            }
-            count++;
-        }
-    }
-    if (count == 0) {
+    unsigned int first = _bisect(txns, date, INT_MIN, false);
+    unsigned int last = _bisect(txns, date, INT_MAX, true);
+    if (first == last) {
         return NULL;
     }
+    int count = last - first;
     Transaction** res = malloc(sizeof(Transaction*) * (count+1));
-    int fillindex = 0;
-    for (int i=first; i<=last; i++) {
-        if (txns->txns[i]->date == date) {
-            res[fillindex] = txns->txns[i];
-            fillindex++;
-        }
-    }
+    memcpy(res, &txns->txns[first], sizeof(Transaction*) * count);
     res[count] = NULL;
     return res;
 }
 
-char**
-transactions_descriptions(const TransactionList *txns)
-{
-    Transaction **bymtime = malloc(sizeof(Transaction*) * txns->count);
-    memcpy(bymtime, txns->txns, sizeof(Transaction*) * txns->count);
-    qsort(bymtime, txns->count, sizeof(Transaction*), _txn_cmp_mtime);
-
-    char **res = malloc(sizeof(char*) * (txns->count + 1));
-    char **iter = res;
-    for (int i=txns->count-1; i>=0; i--) {
-        *iter = bymtime[i]->description;
-        if (*iter != NULL) {
-            iter++;
-        }
-    }
-    *iter = NULL;
-    return res;
-}
-
 int
 transactions_find(const TransactionList *txns, Transaction *txn)
 {
-    for (int i=0; i<txns->count; i++) {
-        if (txns->txns[i] == txn) {
-            return i;
+    TransactionKey *key = _filed_key(txns, txn);
+    if (key == NULL) {
+        return -1;
+    }
+    unsigned int index = _bisect(txns, key->date, key->position, false);
+    // Many txns can share the same key. Our txn is among them.
+    while (index < txns->count) {
+        if (txns->txns[index] == txn) {
+            return index;
         }
+        index++;
     }
+    // Not supposed to happen: all filed txns are in the array.
     return -1;
 }
 
 void
 transactions_move_before(
-    const TransactionList *txns,
+    TransactionList *txns,
     Transaction *txn,
     Transaction *target)
 {
-    if (transactions_find(txns, txn) == -1) {
+    int index = transactions_find(txns, txn);
+    if (index == -1) {
         return;
     }
+    // We re-file `txn` after having set its position. In the meantime, it's
+    // out of the list, which also conveniently excludes it from its bunch.
+    _unfile(txns, index);
     if ((target != NULL) && (txn->date != target->date)) {
         target = NULL;
     }
     Transaction **bunch = transactions_at_date(txns, txn->date);
     Transaction **iter = bunch;
-    if (target == NULL) {
+    if (bunch == NULL) {
+        // alone on its date, no position to adjust.
+    } else if (target == NULL) {
         // set txn->position to the highest value of its bunch
         while (*iter != NULL) {
-            if ((*iter != txn) && ((*iter)->position >= txn->position)) {
+            if ((*iter)->position >= txn->position) {
                 txn->position = (*iter)->position + 1;
             }
             iter++;
         }
     } else {
-        // set txn position to its target and offset everything after it
+        // set txn position to its target and offset everything after it.
+        // Offsetting doesn't change the relative order within the bunch, so
+        // we only need to refresh keys, not to move txns around.
         txn->position = target->position;
         while (*iter != NULL) {
-            if ((*iter != txn) && ((*iter)->position >= txn->position)) {
+            if ((*iter)->position >= txn->position) {
                 (*iter)->position++;
+                _refresh_key(txns, *iter);
             }
             iter++;
         }
     }
     free(bunch);
-}
-
-char**
-transactions_payees(const TransactionList *txns)
-{
-    Transaction **bymtime = malloc(sizeof(Transaction*) * txns->count);
-    memcpy(bymtime, txns->txns, sizeof(Transaction*) * txns->count);
-    qsort(bymtime, txns->count, sizeof(Transaction*), _txn_cmp_mtime);
-
-    char **res = malloc(sizeof(char*) * (txns->count + 1));
-    char **iter = res;
-    for (int i=txns->count-1; i>=0; i--) {
-        *iter = bymtime[i]->payee;
-        if (*iter != NULL) {
-            iter++;
-        }
-    }
-    *iter = NULL;
-    return res;
+    _file(txns, txn);
 }
 
 void
@@ -265,13 +240,22 @@ transactions_remove(TransactionList *txns, Transaction *txn)
         // bad pointer
         return false;
     }
-    // we have to move memory around
-    memmove(
-        &txns->txns[index],
-        &txns->txns[index+1],
-        sizeof(Transaction*) * (txns->count - index - 1));
-    txns->count--;
-    txns->txns = realloc(txns->txns, sizeof(Transaction*) * txns->count);
+    _unfile(txns, index);
+    return true;
+}
+
+bool
+transactions_reposition(TransactionList *txns, Transaction *txn)
+{
+    int index = transactions_find(txns, txn);
+    if (index == -1) {
+        return false;
+    }
+    TransactionKey *key = _filed_key(txns, txn);
+    if (key->date != txn->date || key->position != txn->position) {
+        _unfile(txns, index);
+        _file(txns, txn);
+    }
     return true;
 }
 
@@ -279,4 +263,7 @@ void
 transactions_sort(TransactionList *txns)
 {
     qsort(txns->txns, txns->count, sizeof(Transaction*), _txn_cmp_key);
+    for (unsigned int i=0; i<txns->count; i++) {
+        _refresh_key(txns, txns->txns[i]);
+    }
 }
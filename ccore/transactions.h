@@ -1,9 +1,31 @@
 #pragma once
+#include <glib.h>
 #include "transaction.h"
 
+/* Key under which a txn is filed in a TransactionList.
+ *
+ * It's usually equal to the (date, position) pair of the txn, but the txn
+ * itself can be directly modified without the list knowing about it. This is
+ * why we keep a copy of the key: we can then always find a txn through binary
+ * search, even when its key changed. See transactions_reposition().
+ */
+typedef struct {
+    time_t date;
+    int position;
+} TransactionKey;
+
+/* List of transactions, always kept sorted in (date, position) order.
+ *
+ * `txns` can be iterated directly, but never modified directly: go through
+ * transactions_add() and friends.
+ */
 typedef struct {
     unsigned int count;
     Transaction **txns;
+    // Allocated size of `txns`. Always >= count.
+    unsigned int capacity;
+    // Transaction* -> TransactionKey*, the key under which it's filed.
+    GHashTable *keys;
 } TransactionList;
 
 void
@@ -12,9 +34,6 @@ transactions_init(TransactionList *txns);
 void
 transactions_deinit(TransactionList *txns);
 
-char**
-transactions_account_names(const TransactionList *txns);
-
 /* keep_position: if true, `txn`'s `position` stays unchanged. if false, we
  *                set `position` so that `txn` ends up at the end of the txns
  *                that are on the same date.
@@ -24,15 +43,17 @@ transactions_add(TransactionList *txns, Transaction *txn, bool keep_position);
 
 /* Returns a NULL-terminated list of txns with specified date
  *
- * The resulting list must be freed with free(). Returns NULL if there's no
- * matching txn.
+ * Txns are in position order. The resulting list must be freed with free().
+ * Returns NULL if there's no matching txn.
  */
 Transaction**
 transactions_at_date(const TransactionList *txns, time_t date);
 
-char**
-transactions_descriptions(const TransactionList *txns);
-
+/* Returns the index of `txn` in `txns->txns`, -1 if it's not there.
+ *
+ * Works in O(log n), even if `txn`'s date or position was changed since it was
+ * filed.
+ */
 int
 transactions_find(const TransactionList *txns, Transaction *txn);
 
@@ -49,13 +70,10 @@ transactions_find(const TransactionList *txns, Transaction *txn);
  */
 void
 transactions_move_before(
-    const TransactionList *txns,
+    TransactionList *txns,
     Transaction *txn,
     Transaction *target);
 
-char**
-transactions_payees(const TransactionList *txns);
-
 /* Calls `transaction_reassign_account()` on all transactions.
  *
  * If, after such an operation, a transaction ends up referencing no account at
@@ -70,5 +88,20 @@ transactions_reassign_account(
 bool
 transactions_remove(TransactionList *txns, Transaction *txn);
 
+/* Re-files `txn` according to its current date and position.
+ *
+ * When `txn`'s date or position is changed directly (not through this list),
+ * this has to be called for sort order to stay correct.
+ *
+ * Returns false if `txn` isn't in the list.
+ */
+bool
+transactions_reposition(TransactionList *txns, Transaction *txn);
+
+/* Re-files all txns according to their current date and position.
+ *
+ * Only needed when txns were directly modified in bulk. Otherwise, the list
+ * is always sorted.
+ */
 void
 transactions_sort(TransactionList *txns);
@@ -131,7 +131,11 @@ _readd_txns(Transaction **txns, TransactionList *tlist, AccountList *alist)
 }
 
 static bool
-_swap_txns(ChangedTransaction *txns, int count, AccountList *alist)
+_swap_txns(
+    ChangedTransaction *txns,
+    int count,
+    TransactionList *tlist,
+    AccountList *alist)
 {
     for (int i=0; i<count; i++) {
         ChangedTransaction *c = &txns[i];
@@ -147,6 +151,12 @@ _swap_txns(ChangedTransaction *txns, int count, AccountList *alist)
         memcpy(c->txn, &c->copy, sizeof(Transaction));
         memcpy(&c->copy, &tmp, sizeof(Transaction));
         _add_auto_created_accounts(c->txn, alist);
+        // date and position might have changed. Changed txns aren't
+        // necessarily in tlist (they can be deleted in the same step), in
+        // which case this does nothing.
+        if (tlist != NULL) {
+            transactions_reposition(tlist, c->txn);
+        }
     }
     return true;
 }
@@ -247,7 +257,7 @@ undostep_undo(UndoStep *step, AccountList *alist, TransactionList *tlist)
     if (!_readd_txns(step->deleted_txns, tlist, alist)) {
         return false;
     }
-    if (!_swap_txns(step->changed_txns, step->changed_txns_count, alist)) {
+    if (!_swap_txns(step->changed_txns, step->changed_txns_count, tlist, alist)) {
         return false;
     }
     return true;
@@ -271,7 +281,7 @@ undostep_redo(UndoStep *step, AccountList *alist, TransactionList *tlist)
     if (!_remove_txns(step->deleted_txns, tlist, alist)) {
         return false;
     }
-    if (!_swap_txns(step->changed_txns, step->changed_txns_count, alist)) {
+    if (!_swap_txns(step->changed_txns, step->changed_txns_count, tlist, alist)) {
         return false;
     }
     return true;
@@ -51,6 +51,8 @@ bool
 strstrip(char **dst, const char *src);
 
 /* Time */
+#define SECS_IN_DAY 86400
+
 // Returns today's time_t in a "normalized" way (truncated to discard time).
 // today() == today() if both are called in the same day.
 time_t
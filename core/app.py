@@ -23,11 +23,13 @@ class PreferenceNames:
     * ``AutoDecimalPlace``
     * ``CustomRanges``
     * ``ShowScheduleScopeDialog``
+    * ``ReportWorkerCount``
     """
     AutoSaveInterval = 'AutoSaveInterval'
     AutoDecimalPlace = 'AutoDecimalPlace'
     DayFirstDateEntry = 'DayFirstDateEntry'
     ShowScheduleScopeDialog = 'ShowScheduleScopeDialog'
+    ReportWorkerCount = 'ReportWorkerCount'
 
 class ApplicationView:
     """Expected interface for :class:`Application`'s view.
@@ -111,6 +113,7 @@ class Application:
         self._auto_decimal_place = self.get_default(PreferenceNames.AutoDecimalPlace, False)
         self._day_first_date_entry = self.get_default(PreferenceNames.DayFirstDateEntry, True)
         self._show_schedule_scope_dialog = self.get_default(PreferenceNames.ShowScheduleScopeDialog, True)
+        self._report_worker_count = self.get_default(PreferenceNames.ReportWorkerCount, 1)
         self._hook_currency_providers()
         self._update_date_entry_order()
 
@@ -233,3 +236,20 @@ class Application:
         self._show_schedule_scope_dialog = value
         self.set_default(PreferenceNames.ShowScheduleScopeDialog, value)
 
+    @property
+    def report_worker_count(self):
+        """*get/set int*. Number of threads computing the values of report and pie chart accounts.
+
+        ``1`` computes them in the main thread. Most of that computation happens in ``ccore``,
+        which releases the GIL while it computes balances and cash flows.
+
+        .. seealso:: :func:`core.util.parallel_map`
+        """
+        return self._report_worker_count
+
+    @report_worker_count.setter
+    def report_worker_count(self, value):
+        if value == self._report_worker_count:
+            return
+        self._report_worker_count = value
+        self.set_default(PreferenceNames.ReportWorkerCount, value)
@@ -5,11 +5,11 @@
 # http://www.gnu.org/licenses/gpl-3.0.html
 
 import datetime
+import os.path as op
+import shutil
 import time
 import uuid
 import logging
-import os
-import os.path as op
 from functools import wraps
 
 from core.util import nonone, allsame, dedupe, extract, first, flatten
@@ -18,17 +18,23 @@ from core.trans import tr
 from .const import NOEDIT, AccountType
 from .exception import FileFormatError, OperationAborted
 from .gui.base import GUIObject
-from .loader import native
+from .loader import journal, native, snapshot
 from .model._ccore import (
     AccountList, Entry, TransactionList, amount_parse, amount_format)
 from .model.currency import Currencies
 from .model.budget import BudgetList
+from .model.completion import CompletionIndex
 from .model.date import YearRange
 from .model.oven import Oven
 from .model.undo import Undoer, Action
 from .model.recurrence import find_schedule_of_ref
+from .model.search import SearchIndex
+from .saver.autosave import AutoSaver, copy_for_save
+from .saver.journal import Journal, prune_journals
 from .saver.native import save as save_native
+from .saver.snapshot import save as save_snapshot
 
+AUTOSAVE_BUFFER_COUNT = 10 # Number of autosave journals that will be kept in the cache.
 EXCLUDED_ACCOUNTS_PREFERENCE = 'ExcludedAccounts'
 
 class ScheduleScope:
@@ -36,7 +42,13 @@ class ScheduleScope:
     Global = 1
     Cancel = 2
 
-AUTOSAVE_BUFFER_COUNT = 10 # Number of autosave files that will be kept in the cache.
+
+def affected_accounts(transactions):
+    """Returns the set of all accounts affected by ``transactions``."""
+    result = set()
+    for txn in transactions:
+        result |= txn.affected_accounts()
+    return result
 
 def handle_abort(method):
     @wraps(method)
@@ -90,31 +102,114 @@ class Document(GUIObject):
         self.excluded_accounts = set()
         # Keep track of newly added groups between refreshes
         self.newgroups = set()
-        self._undoer = Undoer(self.accounts, self.transactions, self.schedules, self.budgets)
+        self._journal = Journal()
+        self._journal_path = None
+        self._snapshot_saver = AutoSaver(save_snapshot)
+        #: :class:`.SearchIndex` of :attr:`transactions`.
+        self.search_index = SearchIndex(self.transactions)
+        #: :class:`.CompletionIndex` of :attr:`transactions`.
+        self.completion_index = CompletionIndex(self.transactions)
+        self._undoer = Undoer(
+            self.accounts, self.transactions, self.schedules, self.budgets,
+            on_action=self._action_performed)
         self._date_range = YearRange(datetime.date.today())
         self._document_id = None
         self._dirty_flag = False
 
     # --- Private
+    def _action_performed(self, action):
+        self._journal.add_action(action)
+        self.search_index.add_action(action)
+        self.completion_index.add_action(action)
+
     def _add_transactions(self, transactions):
         if not transactions:
             return
         for txn in transactions:
             self.transactions.add(txn)
         min_date = min(t.date for t in transactions)
-        self._cook(from_date=min_date)
+        self._cook(from_date=min_date, affected_accounts=affected_accounts(transactions))
 
     def _autosave(self):
-        existing_names = [name for name in os.listdir(self.app.cache_path) if name.startswith('autosave')]
-        existing_names.sort()
-        timestamp = int(time.time())
-        autosave_name = 'autosave{0}.moneyguru'.format(timestamp)
-        while autosave_name in existing_names:
-            timestamp += 1
-            autosave_name = 'autosave{0}.moneyguru'.format(timestamp)
-        self.save_to_xml(op.join(self.app.cache_path, autosave_name), autosave=True)
-        if len(existing_names) >= AUTOSAVE_BUFFER_COUNT:
-            os.remove(op.join(self.app.cache_path, existing_names[0]))
+        # We only write what changed since our last autosave to our journal. From time to time, the
+        # journal writes a full snapshot of the document in a worker thread.
+        if self._document_id is None:
+            self._document_id = uuid.uuid4().hex
+        if self._journal_path is None:
+            # We're starting a new journal folder. Make room for it.
+            prune_journals(self.app.cache_path, AUTOSAVE_BUFFER_COUNT - 1)
+            self._journal_path = journal.journal_path(self.app.cache_path, uuid.uuid4().hex)
+        self._journal.flush(
+            self._journal_path, self._document_id,
+            self._properties, self.accounts, self.transactions, self.schedules, self.budgets
+        )
+
+    def _discard_journal(self):
+        # The document is saved or closed. We don't need to recover it from its journal anymore.
+        self._journal.wait()
+        if self._journal_path is not None:
+            shutil.rmtree(self._journal_path, ignore_errors=True)
+            self._journal_path = None
+        self._journal.reset()
+
+    def _load_from_loader(self, loader):
+        self.clear()
+        self._document_id = loader.document_id
+        for propname in self._properties:
+            if propname in loader.properties:
+                self._properties[propname] = loader.properties[propname]
+        self.accounts = loader.accounts
+        self.oven._accounts = self.accounts
+        self._undoer._accounts = self.accounts
+        for transaction in loader.transactions:
+            self.transactions.add(transaction, True)
+        for recurrence in loader.schedules:
+            self.schedules.append(recurrence)
+        self.budgets.start_date = loader.budgets.start_date
+        self.budgets.repeat_type = loader.budgets.repeat_type
+        self.budgets.repeat_every = loader.budgets.repeat_every
+        for budget in loader.budgets:
+            self.budgets.append(budget)
+        self.accounts.default_currency = self.default_currency
+        self._cook()
+        self._undoer.set_save_point()
+        self._restore_preferences_after_load()
+
+    def _load_snapshot(self, filename):
+        # Returns a loaded snapshot loader for ``filename`` if we have a fresh snapshot of it.
+        # Otherwise, returns None.
+        if not self.app.cache_path:
+            return None
+        loader = snapshot.Loader(self.default_currency, filename)
+        try:
+            loader.parse(snapshot.snapshot_path(self.app.cache_path, filename))
+            loader.load()
+        except FileFormatError:
+            return None
+        except Exception:
+            logging.warning("Couldn't load snapshot of %s", filename, exc_info=True)
+            return None
+        return loader
+
+    def _save_snapshot(self, filename):
+        # Snapshots are only a cache. We only make them for documents that are slow to load and
+        # write them in a worker thread. If we can't write one, we simply go on without it.
+        if not self.app.cache_path:
+            return
+        try:
+            if op.getsize(filename) < snapshot.SNAPSHOT_MIN_SIZE:
+                return
+            signature = snapshot.source_signature(filename)
+        except OSError:
+            logging.warning("Couldn't save snapshot of %s", filename, exc_info=True)
+            return
+        args = copy_for_save(
+            self._document_id, self._properties, self.accounts, self.transactions,
+            self.schedules, self.budgets
+        )
+        self._snapshot_saver.submit(
+            snapshot.snapshot_path(self.app.cache_path, filename), signature, *args
+        )
 
     def _change_transaction(self, transaction, global_scope=False, **kwargs):
         date = kwargs.get('date', NOEDIT)
@@ -135,10 +230,11 @@ class Document(GUIObject):
                 self.transactions.add(transaction)
             elif date_changed:
                 self.transactions.move_last(transaction)
-        self.transactions.clear_cache()
 
-    def _cook(self, from_date=None):
-        self.oven.cook(from_date=from_date, until_date=self.date_range.end)
+    def _cook(self, from_date=None, affected_accounts=None):
+        self.oven.cook(
+            from_date=from_date, until_date=self.date_range.end,
+            affected_accounts=affected_accounts)
         # Whenever we cook, we touch. That saves us some touch() repetitions.
         self.touch()
 
@@ -241,7 +337,6 @@ class Document(GUIObject):
             if kwargs:
                 account.change(**kwargs)
         self._cook()
-        self.transactions.clear_cache()
         return True
 
     def delete_accounts(self, accounts, reassign_to=None):
@@ -360,6 +455,7 @@ class Document(GUIObject):
         action = Action(tr('Change transaction'))
         action.change_transactions([original], self.schedules)
         self._undoer.record(action)
+        affected = original.affected_accounts()
         # don't forget that account up here is an external instance. Even if an account of
         # the same name exists in self.accounts, it's not gonna be the same instance.
         for split in new.splits:
@@ -371,7 +467,8 @@ class Document(GUIObject):
             original, date=new.date, description=new.description,
             payee=new.payee, checkno=new.checkno, notes=new.notes, global_scope=global_scope
         )
-        self._cook(from_date=min_date)
+        affected |= original.affected_accounts()
+        self._cook(from_date=min_date, affected_accounts=affected)
         self.accounts.clean_empty_categories()
         self.date_range = self.date_range.around(original.date)
 
@@ -407,13 +504,15 @@ class Document(GUIObject):
             Currencies.get_rates_db().ensure_rates(date, currencies_to_ensure)
 
         min_date = date if date is not NOEDIT else datetime.date.max
+        affected = affected_accounts(transactions)
         for transaction in transactions:
             min_date = min(min_date, transaction.date)
             self._change_transaction(
                 transaction, date=date, description=description, payee=payee, checkno=checkno,
                 from_=from_, to=to, amount=amount, currency=currency, global_scope=global_scope
             )
-        self._cook(from_date=min_date)
+        affected |= affected_accounts(transactions)
+        self._cook(from_date=min_date, affected_accounts=affected)
         self.accounts.clean_empty_categories()
         self.date_range = self.date_range.around(transactions[-1].date)
 
@@ -443,7 +542,7 @@ class Document(GUIObject):
             else:
                 self.transactions.remove(txn)
         min_date = min(t.date for t in transactions)
-        self._cook(from_date=min_date)
+        self._cook(from_date=min_date, affected_accounts=affected_accounts(transactions))
         self.accounts.clean_empty_categories(from_account)
 
     def duplicate_transactions(self, transactions):
@@ -472,7 +571,7 @@ class Document(GUIObject):
         action.added_transactions |= {materialized}
         self._undoer.record(action)
         self.transactions.add(materialized)
-        self._cook(from_date=materialized.date)
+        self._cook(from_date=materialized.date, affected_accounts=materialized.affected_accounts())
 
     def move_transactions(self, transactions, to_transaction):
         """Re-orders ``transactions`` so that they are right before ``to_transaction``.
@@ -523,6 +622,7 @@ class Document(GUIObject):
             entry = Entry(newsplit, newtxn)
             action.added_transactions.add(newtxn)
         self._undoer.record(action)
+        affected = entry.transaction.affected_accounts()
         candidate_dates = [entry.date, date, reconciliation_date, entry.reconciliation_date]
         min_date = min(d for d in candidate_dates if d is not NOEDIT and d is not None)
         if reconciliation_date is not NOEDIT:
@@ -537,7 +637,8 @@ class Document(GUIObject):
             entry.transaction, date=date, description=description,
             payee=payee, checkno=checkno, global_scope=global_scope
         )
-        self._cook(from_date=min_date)
+        affected |= entry.transaction.affected_accounts()
+        self._cook(from_date=min_date, affected_accounts=affected)
         self.accounts.clean_empty_categories()
         self.date_range = self.date_range.around(entry.date)
 
@@ -582,7 +683,9 @@ class Document(GUIObject):
         else:
             for entry in entries:
                 entry.split.reconciliation_date = None
-        self._cook(from_date=min_date)
+        affected = {e.account for e in entries}
+        affected |= affected_accounts(action.added_transactions)
+        self._cook(from_date=min_date, affected_accounts=affected)
 
     # --- Budget
     def budgeted_amount(self, date_range, filter_excluded=True):
@@ -629,7 +732,7 @@ class Document(GUIObject):
         original.notes = new.notes
         if original not in self.budgets:
             self.budgets.append(original)
-        self._cook(from_date=min_date)
+        self._cook(from_date=min_date, affected_accounts=set())
 
     def delete_budgets(self, budgets):
         """Removes ``budgets`` from the document.
@@ -643,7 +746,7 @@ class Document(GUIObject):
         self._undoer.record(action)
         for budget in budgets:
             self.budgets.remove(budget)
-        self._cook(from_date=self.budgets.start_date)
+        self._cook(from_date=self.budgets.start_date, affected_accounts=set())
 
     # --- Schedule
     def change_schedule(self, schedule, new_ref, repeat_type, repeat_every, stop_date):
@@ -680,7 +783,7 @@ class Document(GUIObject):
         schedule.reset_spawn_cache()
         if schedule not in self.schedules:
             self.schedules.append(schedule)
-        self._cook(from_date=min_date)
+        self._cook(from_date=min_date, affected_accounts=set())
 
     def delete_schedules(self, schedules):
         """Removes ``schedules`` from the document.
@@ -695,7 +798,7 @@ class Document(GUIObject):
         for schedule in schedules:
             self.schedules.remove(schedule)
         min_date = min(s.ref.date for s in schedules)
-        self._cook(from_date=min_date)
+        self._cook(from_date=min_date, affected_accounts=set())
 
     # --- Load / Save / Import
     def load_from_xml(self, filename):
@@ -705,33 +808,50 @@ class Document(GUIObject):
 
         :param filename: ``str``
         """
-        loader = native.Loader(self.default_currency)
+        loader = self._load_snapshot(filename)
+        from_snapshot = loader is not None
+        if not from_snapshot:
+            loader = native.Loader(self.default_currency)
+            try:
+                loader.parse(filename)
+                loader.load()
+            except FileFormatError as e:
+                # Errors such as unsupported currencies come with their own message.
+                raise FileFormatError(str(e) or tr('"%s" is not a moneyGuru file') % filename)
+        self._load_from_loader(loader)
+        if not from_snapshot:
+            self._save_snapshot(filename)
+
+    def load_from_journal(self, path):
+        """Clears the document and recovers it from the autosave journal in ``path``.
+
+        ``path`` is the journal folder of a document, in our cache folder.
+
+        :param path: ``str``
+        """
+        loader = journal.Loader(self.default_currency)
         try:
-            loader.parse(filename)
+            loader.parse(path)
         except FileFormatError:
-            raise FileFormatError(tr('"%s" is not a moneyGuru file') % filename)
+            raise FileFormatError(tr('"%s" is not a moneyGuru file') % path)
         loader.load()
-        self.clear()
-        self._document_id = loader.document_id
-        for propname in self._properties:
-            if propname in loader.properties:
-                self._properties[propname] = loader.properties[propname]
-        self.accounts = loader.accounts
-        self.oven._accounts = self.accounts
-        self._undoer._accounts = self.accounts
-        for transaction in loader.transactions:
-            self.transactions.add(transaction, True)
-        for recurrence in loader.schedules:
-            self.schedules.append(recurrence)
-        self.budgets.start_date = loader.budgets.start_date
-        self.budgets.repeat_type = loader.budgets.repeat_type
-        self.budgets.repeat_every = loader.budgets.repeat_every
-        for budget in loader.budgets:
-            self.budgets.append(budget)
-        self.accounts.default_currency = self.default_currency
-        self._cook()
-        self._undoer.set_save_point()
-        self._restore_preferences_after_load()
+        self._load_from_loader(loader)
+        # What we just recovered hasn't been saved anywhere but in the journal. We keep autosaving
+        # in the same folder so that it goes away once the document is saved.
+        self._journal_path = path
+        self.set_dirty()
+
+    def recoverable_journals(self):
+        """Returns the paths of the journals we could recover a document from, most recent first.
+
+        The journal of the current document isn't part of them.
+        """
+        if not self.app.cache_path:
+            return []
+        return [
+            path for path in journal.journal_folders(self.app.cache_path)
+            if path != self._journal_path
+        ]
 
     def save_to_xml(self, filename, autosave=False):
         """Saves the document to ``filename``.
@@ -751,8 +871,10 @@ class Document(GUIObject):
             self.transactions, self.schedules, self.budgets
         )
         if not autosave:
+            self._save_snapshot(filename)
             self._undoer.set_save_point()
             self._dirty_flag = False
+            self._discard_journal()
 
     def import_entries(self, target_account, ref_account, matches):
         """Imports entries in ``mathes`` into ``target_account``.
@@ -825,6 +947,7 @@ class Document(GUIObject):
                 assert not split.account or split.account in self.accounts
             if ref is not None:
                 ref.transaction.date = entry.date
+                self.transactions.reposition(ref.transaction)
                 ref.split.amount = entry.split.amount
                 ref.transaction.balance(ref.split, True)
                 ref.split.reference = entry.split.reference
@@ -895,6 +1018,10 @@ class Document(GUIObject):
         del self.schedules[:]
         del self.budgets[:]
         self._undoer.clear()
+        self._journal.reset()
+        self._journal_path = None
+        self.search_index.reset()
+        self.completion_index.reset()
         self._dirty_flag = False
         self.excluded_accounts = set()
         self.newgroups = set()
@@ -904,6 +1031,8 @@ class Document(GUIObject):
 
     def close(self):
         self._save_preferences()
+        self._discard_journal()
+        self.wait_for_snapshot()
 
     def can_restore_from_prefs(self):
         """Returns whether the document has preferences to restore from.
@@ -934,6 +1063,14 @@ class Document(GUIObject):
             return True
         return amount.currency_code == self.default_currency
 
+    def wait_for_autosave(self):
+        """Waits until autosaves that are running in the background are done."""
+        self._journal.wait()
+
+    def wait_for_snapshot(self):
+        """Waits until the snapshot of the loaded file that is written in the background is done."""
+        self._snapshot_saver.wait()
+
     def touch(self):
         self.step += 1
         if self.app.autosave_interval and self.step % self.app.autosave_interval == 0:
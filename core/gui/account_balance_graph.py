@@ -4,6 +4,7 @@
 # which should be included with this package. The terms are also available at
 # http://www.gnu.org/licenses/gpl-3.0.html
 
+from ..model._ccore import balance_series
 from .balance_graph import BalanceGraph
 
 class AccountBalanceGraph(BalanceGraph):
@@ -11,12 +12,14 @@ class AccountBalanceGraph(BalanceGraph):
         BalanceGraph.__init__(self, account_view)
         self._account = account_view.account
 
-    def _balance_for_date(self, date):
+    def _balance_series(self, start, end):
         if self._account is None:
-            return 0
+            return [(start, 0)]
         entries = self.document.accounts.entries_for_account(self._account)
-        entry = entries.last_entry(date)
-        return entry.normal_balance() if entry else 0
+        series = balance_series([entries], start, end, self._account.currency)
+        if self._account.is_credit_account():
+            series = [(date, -balance) for date, balance in series]
+        return series
 
     # --- Properties
     @property
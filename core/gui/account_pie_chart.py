@@ -10,6 +10,7 @@
 from collections import defaultdict
 from core.trans import tr
 from ..const import AccountType
+from ..util import parallel_map
 from .pie_chart import PieChart
 
 class _AccountPieChart(PieChart):
@@ -32,6 +33,13 @@ class _AccountPieChart(PieChart):
             data[name] += amount
         return data
 
+    def _map_accounts(self, func, accounts):
+        # Returns [(account, func(account))]. ``func`` runs in worker threads if the app is
+        # configured to.
+        accounts = list(accounts)
+        values = parallel_map(func, accounts, self.app.report_worker_count)
+        return list(zip(accounts, values))
+
     def _accounts(self, account_type):
         accounts = {a for a in self.document.accounts if a.type == account_type}
         return accounts - self.document.excluded_accounts
@@ -56,7 +64,7 @@ class BalancePieChart(_AccountPieChart):
             balance = entries.normal_balance(date, currency)
             return balance
 
-        return [(a, get_value(a)) for a in accounts]
+        return self._map_accounts(get_value, accounts)
 
     def _get_data(self):
         return (
@@ -79,7 +87,7 @@ class CashFlowPieChart(_AccountPieChart):
             budgeted = self.document.budgets.normal_amount_for_account(account, date_range, currency=currency)
             return cash_flow + budgeted
 
-        return [(a, get_value(a)) for a in accounts]
+        return self._map_accounts(get_value, accounts)
 
     def _get_data(self):
         return (
@@ -24,8 +24,10 @@ class BrushID:
 class BalanceGraph(Graph):
     # BalanceGraph's data point is (float x, float y)
     # --- Virtual
-    def _balance_for_date(self, date):
-        return 0
+    def _balance_series(self, start, end):
+        # Returns a list of (date, balance) for the days, from `start` to `end`, where the balance
+        # changes. The first item is always `start`.
+        return [(start, 0)]
 
     def _budget_for_date(self, date):
         return 0
@@ -36,15 +38,24 @@ class BalanceGraph(Graph):
     # To save some calculations (in a year range, those take a lot of time if they're made every day),
     # rather than calculating the budget every day, they are only calculated when the balance without
     # budget changes. this is what the algorithm below reflects.
+    # We only look at the days where the balance changes, today and the last day of the range.
+    # Nothing happens on other days.
     def compute_data(self):
         date_range = self.document.date_range
         TODAY = date.today()
         date2value = {}
-        last_balance = self._balance_for_date(date_range.start - ONE_DAY)
+        series = self._balance_series(date_range.start - ONE_DAY, date_range.end)
+        last_balance = series[0][1]
         if last_balance:
             date2value[date_range.start] = last_balance
-        for date_point in date_range:
-            balance = self._balance_for_date(date_point)
+        changes = dict(series[1:])
+        date_points = set(changes)
+        date_points.add(date_range.end)
+        if TODAY in date_range:
+            date_points.add(TODAY)
+        balance = last_balance
+        for date_point in sorted(date_points):
+            balance = changes.get(date_point, balance)
             if (balance != last_balance) or (date_point == TODAY) or (date_point == date_range.end):
                 if date2value and last_balance != balance:
                     # create a "step"
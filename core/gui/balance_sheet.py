@@ -24,6 +24,10 @@ class BalanceSheet(Report):
         Column('delta', display=trcol("Change"), visible=False, optional=True),
         Column('delta_perc', display=trcol("Change %"), visible=False, optional=True),
     ]
+    ACCOUNT_TYPES = (AccountType.Asset, AccountType.Liability)
+    ACCOUNT_NODE_ATTRS = (
+        'start_amount', 'end_amount', 'start', 'end', 'delta', 'delta_perc',
+    )
 
     # --- Override
     def _compute_account_node(self, node):
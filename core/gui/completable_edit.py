@@ -4,16 +4,17 @@
 # which should be included with this package. The terms are also available at
 # http://www.gnu.org/licenses/gpl-3.0.html
 
-from core.util import nonone, dedupe
+from core.util import nonone
 
 from .base import DocumentGUIObject
-from ..model.completion import CompletionList
+from ..model.completion import CompletionList, Candidates
 
 class CompletableEdit(DocumentGUIObject):
     def __init__(self, mainwindow):
         super().__init__(mainwindow.document)
         self.mainwindow = mainwindow
         self._attrname = ''
+        self._candidates = Candidates()
         self._completions = None
         self._complete_completion = ''
         self.completion = ''
@@ -28,17 +29,17 @@ class CompletableEdit(DocumentGUIObject):
         doc = self.mainwindow.document
         attrname = self.attrname
         if attrname == 'description':
-            self._candidates = doc.transactions.descriptions
+            self._candidates = doc.completion_index.descriptions()
         elif attrname == 'payee':
-            self._candidates = doc.transactions.payees
+            self._candidates = doc.completion_index.payees()
         elif attrname in {'from', 'to', 'account', 'transfer'}:
-            result = doc.transactions.account_names
-            # `result` doesn't contain empty accounts' name, so we'll add them.
-            result += [a.name for a in doc.accounts if not a.inactive]
+            accounts = doc.completion_index.accounts()
+            # `accounts` doesn't contain empty accounts, so we'll add them.
+            accounts += [a for a in doc.accounts if not a.inactive]
+            names = [a.name for a in accounts]
             if attrname == 'transfer' and self.account is not None:
-                result = [name for name in result if name != self.account.name]
-            self._candidates = result
-        self._candidates = dedupe([name for name in self._candidates if name.strip()])
+                names = [name for name in names if name != self.account.name]
+            self._candidates = Candidates.from_list(names)
 
     def _set_completion(self, completion):
         completion = nonone(completion, '')
@@ -106,7 +107,7 @@ class CompletableEdit(DocumentGUIObject):
     @property
     def candidates(self):
         self.revalidate()
-        return self._candidates
+        return self._candidates.all()
 
     @property
     def text(self):
@@ -115,8 +116,9 @@ class CompletableEdit(DocumentGUIObject):
     @text.setter
     def text(self, value):
         self._text = value
-        if self.candidates:
-            self._completions = CompletionList(value, self._candidates)
+        self.revalidate()
+        if self._candidates:
+            self._completions = CompletionList(value, self._candidates.completions(value))
             self._set_completion(self._completions.current())
         else:
             self._completions = None
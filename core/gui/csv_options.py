@@ -71,11 +71,15 @@ class Layout:
         self.columns[index] = field
 
     def set_line_excluded(self, index, value, linecount):
+        # ``linecount`` is None when we don't know how many lines the file has.
         if value:
             self.excluded_lines.add(index)
         else:
             self.excluded_lines.discard(index)
-            self.excluded_lines.discard(index - linecount)
+            if linecount is not None:
+                self.excluded_lines.discard(index - linecount)
+        if linecount is None:
+            return
         # adjust line exclusion
         last_index = linecount - 1
         while last_index > 0:
@@ -103,6 +107,7 @@ class CSVOptions(GUIObject):
         self.document = mainwindow.document
         self.app = self.document.app
         self.lines = []
+        self._linecount = 0
         self._colcount = 0
         self._target_accounts = []
         self._default_layout = Layout(tr('Default'))
@@ -125,6 +130,9 @@ class CSVOptions(GUIObject):
 
     def _refresh_lines(self):
         self.lines = self.mainwindow.loader.lines
+        # When the file is larger than the preview we show, we don't know how many lines it has.
+        # Lines excluded from the end of the file only apply to lines after the preview.
+        self._linecount = None if self.mainwindow.loader.has_more_lines else len(self.lines)
         self.view.refresh_lines()
 
     def _refresh_targets(self):
@@ -138,6 +146,10 @@ class CSVOptions(GUIObject):
         loader.columns = self.layout.columns
         lines = [line for index, line in enumerate(self.lines) if not self.line_is_excluded(index)]
         loader.lines = lines
+        if self._linecount is None:
+            loader.excluded_last_lines = {index for index in self.excluded_lines if index < 0}
+        else:
+            loader.excluded_last_lines = set()
         target_name = self.layout.target_account_name
         target_account = first(t for t in self._target_accounts if t.name == target_name)
         try:
@@ -162,7 +174,7 @@ class CSVOptions(GUIObject):
     def line_is_excluded(self, index):
         if index in self.excluded_lines:
             return True
-        elif index - len(self.lines) in self.excluded_lines:
+        elif self._linecount is not None and index - self._linecount in self.excluded_lines:
             return True
         else:
             return False
@@ -225,7 +237,7 @@ class CSVOptions(GUIObject):
         self.view.refresh_columns_name()
 
     def set_line_excluded(self, index, value):
-        self.layout.set_line_excluded(index, value, len(self.lines))
+        self.layout.set_line_excluded(index, value, self._linecount)
 
     def show(self):
         self._default_layout = Layout(tr('Default'))
@@ -5,6 +5,7 @@
 # http://www.gnu.org/licenses/gpl-3.0.html
 
 import datetime
+from bisect import bisect_left
 from collections import defaultdict
 
 from core.util import dedupe, first as getfirst
@@ -49,12 +50,13 @@ def swap_format_elements(format, first, second):
     return swapped
 
 class AccountPane:
-    def __init__(self, iwin, account, target_account, parsing_date_format):
+    def __init__(self, iwin, loader, account, target_account, parsing_date_format):
         self.iwin = iwin
+        self.loader = loader
         self.account = account
         self._selected_target = target_account
         self.name = account.name
-        entries = iwin.loader.accounts.entries_for_account(account)
+        entries = loader.accounts.entries_for_account(account)
         self.count = len(entries)
         self.matches = [] # [[ref, imported]]
         self.parsing_date_format = parsing_date_format
@@ -66,7 +68,7 @@ class AccountPane:
         self._compute_swap_possibilities()
 
     def _compute_swap_possibilities(self):
-        entries = list(self.iwin.loader.accounts.entries_for_account(self.account))
+        entries = list(self.loader.accounts.entries_for_account(self.account))
         if not entries:
             return
         self._swap_possibilities = set([(DAY, MONTH), (MONTH, YEAR), (DAY, YEAR)])
@@ -79,65 +81,88 @@ class AccountPane:
                     break
 
     def _match_entries(self):
-        to_import = list(self.iwin.loader.accounts.entries_for_account(self.account))
+        to_import = list(self.loader.accounts.entries_for_account(self.account))
         reference2entry = {}
         for entry in (e for e in to_import if e.reference):
             reference2entry[entry.reference] = entry
         self.matches = []
+        matched = set()
         if self.selected_target is not None:
             entries = self.iwin.document.accounts.entries_for_account(self.selected_target)
             for entry in entries:
                 if entry.reference in reference2entry:
-                    other = reference2entry[entry.reference]
+                    other = reference2entry.pop(entry.reference)
                     if entry.reconciled:
                         self.iwin.import_table.dont_import.add(other)
-                    to_import.remove(other)
-                    del reference2entry[entry.reference]
+                    matched.add(other)
                 else:
                     other = None
                 if other is not None or not entry.reconciled:
                     self.matches.append([entry, other])
-        self.matches += [[None, entry] for entry in to_import]
+        self.matches += [[None, entry] for entry in to_import if entry not in matched]
+        self._index_matches()
         self._sort_matches()
 
+    def _index_matches(self):
+        # existing/imported entry --> the match it's in. These are kept up to date by _bind() and
+        # unbind() so that we never have to scan self.matches to find a match.
+        self._existing2match = {m[0]: m for m in self.matches if m[0] is not None}
+        self._imported2match = {m[1]: m for m in self.matches if m[1] is not None}
+
     def _sort_matches(self):
         self.matches.sort(key=lambda t: t[0].date if t[0] is not None else t[1].date)
 
-    def bind(self, existing, imported):
-        [match1] = [m for m in self.matches if m[0] is existing]
-        [match2] = [m for m in self.matches if m[1] is imported]
+    def _bind(self, existing, imported):
+        # Binds without removing the now empty match of `imported` from self.matches. Returns that
+        # match.
+        match1 = self._existing2match[existing]
+        match2 = self._imported2match[imported]
         assert match1[1] is None
         assert match2[0] is None
-        match1[1] = match2[1]
-        self.matches.remove(match2)
+        match1[1] = imported
+        self._imported2match[imported] = match1
+        return match2
+
+    def bind(self, existing, imported):
+        self.matches.remove(self._bind(existing, imported))
 
     def can_swap_date_fields(self, first, second): # 'day', 'month', 'year'
         return (first, second) in self._swap_possibilities or (second, first) in self._swap_possibilities
 
     def match_entries_by_date_and_amount(self, threshold):
         delta = datetime.timedelta(days=threshold)
-        unmatched = (
-            to_import for ref, to_import in self.matches if ref is None)
-        unmatched_refs = (
-            ref for ref, to_import in self.matches if to_import is None)
+        unmatched = [to_import for ref, to_import in self.matches if ref is None]
         amount2refs = defaultdict(list)
-        for entry in unmatched_refs:
-            amount2refs[entry.amount].append(entry)
+        for ref, to_import in self.matches:
+            if to_import is None:
+                amount2refs[ref.amount].append(ref)
+        # self.matches is sorted, so our refs are sorted by date.
+        amount2dates = {
+            amount: [ref.date for ref in refs] for amount, refs in amount2refs.items()
+        }
+        emptied = set()
         for entry in unmatched:
             if entry.amount not in amount2refs:
                 continue
             potentials = amount2refs[entry.amount]
-            for ref in potentials:
-                if abs(ref.date - entry.date) <= delta:
-                    self.bind(ref, entry)
-                    potentials.remove(ref)
+            dates = amount2dates[entry.amount]
+            # The earliest ref within the threshold, if any, is the first one that isn't too early.
+            index = bisect_left(dates, entry.date - delta)
+            if index < len(dates) and dates[index] <= entry.date + delta:
+                emptied.add(id(self._bind(potentials[index], entry)))
+                del potentials[index]
+                del dates[index]
+        if emptied:
+            self.matches = [m for m in self.matches if id(m) not in emptied]
         self._sort_matches()
 
-
     def unbind(self, existing, imported):
-        [match] = [m for m in self.matches if m[0] is existing and m[1] is imported]
+        match = self._existing2match[existing]
+        assert match[1] is imported
         match[1] = None
-        self.matches.append([None, imported])
+        newmatch = [None, imported]
+        self.matches.append(newmatch)
+        self._imported2match[imported] = newmatch
         self._sort_matches()
 
     @property
@@ -161,10 +186,14 @@ class ImportWindow(GUIObject):
     # show()
     #
 
-    def __init__(self, mainwindow, target_account=None):
+    def __init__(self, mainwindow, target_account=None, loaders=None):
+        # `loaders` are the loaders we import from. Each account in them gets its own pane. By
+        # default, we import from the main window's loader.
         super().__init__()
-        if not hasattr(mainwindow, 'loader'):
-            raise ValueError("Nothing to import!")
+        if loaders is None:
+            if not hasattr(mainwindow, 'loader'):
+                raise ValueError("Nothing to import!")
+            loaders = [mainwindow.loader]
         self.mainwindow = mainwindow
         self.document = mainwindow.document
         self.app = self.document.app
@@ -184,28 +213,29 @@ class ImportWindow(GUIObject):
         self.panes = []
         self.import_table = ImportTable(self)
 
-        self.loader = self.mainwindow.loader
+        self.loaders = loaders
         self.target_accounts = [
             a for a in self.document.accounts if a.is_balance_sheet_account()]
         self.target_accounts.sort(key=lambda a: a.name.lower())
-        accounts = []
-        for account in self.loader.accounts:
-            if account.is_balance_sheet_account():
-                entries = self.loader.accounts.entries_for_account(account)
-                if len(entries):
-                    new_name = self.document.accounts.new_name(account.name)
-                    if new_name != account.name:
-                        self.loader.accounts.rename_account(account, new_name)
-                    accounts.append(account)
-        parsing_date_format = DateFormat.from_sysformat(self.loader.parsing_date_format)
-        for account in accounts:
-            target = target_account
-            if target is None and account.reference:
-                target = getfirst(
-                    t for t in self.target_accounts if t.reference == account.reference
-                )
-            self.panes.append(
-                AccountPane(self, account, target, parsing_date_format))
+        for loader in loaders:
+            accounts = []
+            for account in loader.accounts:
+                if account.is_balance_sheet_account():
+                    entries = loader.accounts.entries_for_account(account)
+                    if len(entries):
+                        new_name = self.document.accounts.new_name(account.name)
+                        if new_name != account.name:
+                            loader.accounts.rename_account(account, new_name)
+                        accounts.append(account)
+            parsing_date_format = DateFormat.from_sysformat(loader.parsing_date_format)
+            for account in accounts:
+                target = target_account
+                if target is None and account.reference:
+                    target = getfirst(
+                        t for t in self.target_accounts if t.reference == account.reference
+                    )
+                self.panes.append(
+                    AccountPane(self, loader, account, target, parsing_date_format))
 
     # --- Private
     def _can_swap_date_fields(self, first, second): # 'day', 'month', 'year'
@@ -220,7 +250,7 @@ class ImportWindow(GUIObject):
         else:
             panes = [self.selected_pane]
         for pane in panes:
-            entries = self.loader.accounts.entries_for_account(pane.account)
+            entries = pane.loader.accounts.entries_for_account(pane.account)
             txns = dedupe(e.transaction for e in entries)
             for txn in txns:
                 for split in txn.splits:
@@ -255,8 +285,9 @@ class ImportWindow(GUIObject):
         else:
             panes = [self.selected_pane]
 
-        def switch_func(txn):
+        def switch_func(txn, loader):
             txn.date = swapped_date(txn.date, first, second)
+            loader.transactions.reposition(txn)
 
         self._swap_fields(panes, switch_func)
         # Now, lets' change the date format on these panes
@@ -274,7 +305,7 @@ class ImportWindow(GUIObject):
         else:
             panes = [self.selected_pane]
 
-        def switch_func(txn):
+        def switch_func(txn, loader):
             txn.description, txn.payee = txn.payee, txn.description
 
         self._swap_fields(panes, switch_func)
@@ -282,13 +313,13 @@ class ImportWindow(GUIObject):
     def _swap_fields(self, panes, switch_func):
         seen = set()
         for pane in panes:
-            entries = self.loader.accounts.entries_for_account(pane.account)
+            entries = pane.loader.accounts.entries_for_account(pane.account)
             txns = dedupe(e.transaction for e in entries)
             for txn in txns:
                 if txn.affected_accounts() & seen:
                     # We've already swapped this txn in a previous pane.
                     continue
-                switch_func(txn)
+                switch_func(txn, pane.loader)
             seen.add(pane.account)
         self.import_table.refresh()
 
@@ -22,6 +22,11 @@ class IncomeStatement(Report):
         Column('delta_perc', display=trcol("Change %"), visible=False, optional=True),
         Column('budgeted', display=trcol("Budgeted"), optional=True),
     ]
+    ACCOUNT_TYPES = (AccountType.Income, AccountType.Expense)
+    ACCOUNT_NODE_ATTRS = (
+        'cash_flow_amount', 'last_cash_flow_amount', 'budgeted_amount', 'cash_flow',
+        'last_cash_flow', 'budgeted', 'delta', 'delta_perc',
+    )
 
     # --- Override
     def _compute_account_node(self, node):
@@ -29,10 +34,11 @@ class IncomeStatement(Report):
         entries = self.document.accounts.entries_for_account(account)
         date_range = self.document.date_range
         currency = self.document.default_currency
-        cash_flow = entries.normal_cash_flow(date_range)
-        cash_flow_native = entries.normal_cash_flow(date_range, currency)
-        last_cash_flow = entries.normal_cash_flow(date_range.prev())
-        last_cash_flow_native = entries.normal_cash_flow(date_range.prev(), currency)
+        date_ranges = [date_range.prev(), date_range]
+        last_cash_flow, cash_flow = entries.normal_cash_flow_by_period(date_ranges)
+        last_cash_flow_native, cash_flow_native = entries.normal_cash_flow_by_period(
+            date_ranges, currency
+        )
         remaining = self.document.budgets.normal_amount_for_account(account, date_range)
         remaining_native = self.document.budgets.normal_amount_for_account(account, date_range, currency)
         delta = cash_flow - last_cash_flow
@@ -7,17 +7,17 @@
 import logging
 import re
 import weakref
+from collections import OrderedDict
 
 from core.util import first, minmax, nonone
 from core.trans import tr
 
-from ..const import PaneType, FilterType
+from ..const import PaneType, FilterType, AccountType
 from ..exception import OperationAborted, FileFormatError
 from ..model._ccore import inc_date
 from ..model.date import RepeatType, DateFormat
 from ..model.recurrence import Recurrence
-from ..model.transaction import txn_matches
-from ..loader import csv, qif, ofx, native
+from ..loader import csv, batch
 from .base import DocumentGUIObject
 from .search_field import SearchField
 from .date_range_selector import DateRangeSelector
@@ -36,6 +36,12 @@ from .general_ledger_view import GeneralLedgerView
 from .docprops_view import DocPropsView
 from .empty_view import EmptyView
 
+ALL_QUERY_TYPES = ['account', 'group', 'amount', 'description', 'checkno', 'payee', 'memo']
+TEXT_QUERY_TYPES = {'description', 'payee', 'memo'}
+RE_TARGETED_SEARCH = re.compile(r'({}):(.*)'.format('|'.join(ALL_QUERY_TYPES)))
+# Number of parsed queries and of filtered lists we remember.
+VISIBLE_CACHE_SIZE = 32
+
 PANETYPE2LABEL = {
     PaneType.NetWorth: tr("Net Worth"),
     PaneType.Profit: tr("Profit & Loss"),
@@ -47,6 +53,27 @@ PANETYPE2LABEL = {
     PaneType.Empty: tr("New Tab"),
 }
 
+def has_accounts_to_import(loader):
+    return any(a.is_balance_sheet_account() for a in loader.accounts) and bool(loader.transactions)
+
+def query_narrows(query, prev_query):
+    """Returns whether everything matching ``query`` also matches ``prev_query``.
+
+    A transaction matches a query when it matches one of its query types. Text types match when
+    the query string is in the text, so a longer string containing the previous one can only be
+    narrower. Other types are compared for equality, so they have to be the same.
+    """
+    for qtype, qargs in query.items():
+        if qtype not in prev_query:
+            return False
+        prev_qargs = prev_query[qtype]
+        if qtype in TEXT_QUERY_TYPES:
+            if prev_qargs not in qargs:
+                return False
+        elif prev_qargs != qargs:
+            return False
+    return True
+
 class Preference:
     OpenedPanes = 'OpenedPanes'
     SelectedPane = 'SelectedPane'
@@ -90,7 +117,8 @@ class MainWindow(DocumentGUIObject):
         self._explicitly_selected_transactions = []
         self._selected_schedules = []
         self._selected_budgets = []
-        self._account2visibleentries = {}
+        self._parsed_queries = OrderedDict()
+        self._visible_cache = OrderedDict()
         self._filter_string = ''
         self._filter_type = None
         self.panes = []
@@ -108,7 +136,6 @@ class MainWindow(DocumentGUIObject):
         self.current_pane_index = len(self.panes) - 1
 
     def _apply_filter(self):
-        self._invalidate_visible_entries()
         is_txn_pane = self._current_pane.view.VIEW_TYPE in {PaneType.Transaction, PaneType.Account}
         if self.filter_string and not is_txn_pane:
             self.select_pane_of_type(PaneType.Transaction, clear_filter=False)
@@ -191,7 +218,50 @@ class MainWindow(DocumentGUIObject):
                 pane.view.invalidate()
 
     def _invalidate_visible_entries(self):
-        self._account2visibleentries = {}
+        self._parsed_queries.clear()
+        self._visible_cache.clear()
+
+    def _narrow_visible_items(self, key):
+        # If we have the filtered list of a broader query, we only need to filter it further.
+        query_string = key[2]
+        if not query_string:
+            return None
+        query = self.parse_search_query(query_string)
+        for prev_key in reversed(self._visible_cache):
+            prev_query_string = prev_key[2]
+            if not prev_query_string or prev_key[:2] != key[:2] or prev_key[3:] != key[3:]:
+                continue
+            if query_narrows(query, self.parse_search_query(prev_query_string)):
+                matches = self.document.search_index.matcher(query)
+                prev_result = self._visible_cache[prev_key]
+                if key[4] is None:
+                    return [t for t in prev_result if matches(t)]
+                else:
+                    return [e for e in prev_result if matches(e.transaction)]
+        return None
+
+    def _parse_search_query(self, query_string):
+        query_string = query_string.strip().lower()
+        m = RE_TARGETED_SEARCH.match(query_string)
+        if m is not None:
+            qtype, qargs = m.groups()
+            qtypes = [qtype]
+        else:
+            qtypes = ALL_QUERY_TYPES
+            qargs = query_string
+        query = {}
+        for qtype in qtypes:
+            if qtype in {'account', 'group'}:
+                # account and group args are comma-splitted
+                query[qtype] = {s.strip() for s in qargs.split(',')}
+            elif qtype == 'amount':
+                try:
+                    query['amount'] = abs(self.document.parse_amount(qargs, with_expression=False))
+                except ValueError:
+                    pass
+            else:
+                query[qtype] = qargs
+        return query
 
     def _perform_if_possible(self, action_name):
         current_view = self._current_pane.view
@@ -273,6 +343,26 @@ class MainWindow(DocumentGUIObject):
             self._current_pane.view.update_visibility()
         self.view.update_area_visibility()
 
+    def _visible_items(self, account):
+        # Returns the visible entries of ``account`` or, if it's None, the visible transactions.
+        # Filtered lists stay valid until the document changes, so we key them on its step.
+        document = self.document
+        key = (document.step, document.date_range, self.filter_string, self.filter_type, account)
+        cache = self._visible_cache
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        result = self._narrow_visible_items(key)
+        if result is None:
+            if account is None:
+                result = self._visible_transactions()
+            else:
+                result = self._visible_entries_for_account(account)
+        cache[key] = result
+        if len(cache) > VISIBLE_CACHE_SIZE:
+            cache.popitem(last=False)
+        return result
+
     def _visible_entries_for_account(self, account):
         date_range = self.document.date_range
         entries = self.document.accounts.entries_for_account(account)
@@ -281,7 +371,8 @@ class MainWindow(DocumentGUIObject):
         filter_type = self.filter_type
         if query_string:
             query = self.parse_search_query(query_string)
-            entries = [e for e in entries if txn_matches(e.transaction, query)]
+            matches = self.document.search_index.matcher(query)
+            entries = [e for e in entries if matches(e.transaction)]
         if filter_type is FilterType.Unassigned:
             entries = [e for e in entries if not e.transfer]
         elif (filter_type is FilterType.Income) or (filter_type is FilterType.Expense):
@@ -304,6 +395,33 @@ class MainWindow(DocumentGUIObject):
             entries = [e for e in entries if not e.reconciled]
         return entries
 
+    def _visible_transactions(self):
+        date_range = self.document.date_range
+        txns = [t for t in self.document.oven.transactions if t.date in date_range]
+        query_string = self.filter_string
+        filter_type = self.filter_type
+        if not query_string and filter_type is None:
+            return txns
+        if query_string:
+            query = self.parse_search_query(query_string)
+            matches = self.document.search_index.matcher(query)
+            txns = [t for t in txns if matches(t)]
+        if filter_type is FilterType.Unassigned:
+            txns = [t for t in txns if t.has_unassigned_split]
+        elif filter_type is FilterType.Income:
+            txns = [t for t in txns if any(getattr(s.account, 'type', '') == AccountType.Income for s in t.splits)]
+        elif filter_type is FilterType.Expense:
+            txns = [t for t in txns if any(getattr(s.account, 'type', '') == AccountType.Expense for s in t.splits)]
+        elif filter_type is FilterType.Transfer:
+            def is_transfer(t):
+                return len([s for s in t.splits if s.account is not None and s.account.is_balance_sheet_account()]) >= 2
+            txns = list(filter(is_transfer, txns))
+        elif filter_type is FilterType.Reconciled:
+            txns = [t for t in txns if any(s.reconciled for s in t.splits)]
+        elif filter_type is FilterType.NotReconciled:
+            txns = [t for t in txns if all(not s.reconciled for s in t.splits)]
+        return txns
+
     # --- Override
     def _revalidate(self):
         self.stop_editing()
@@ -327,7 +445,6 @@ class MainWindow(DocumentGUIObject):
 
     # --- Public
     def apply_date_range(self, new_date_range, prev_date_range):
-        self._invalidate_visible_entries()
         if self._current_pane is not None:
             view = self._current_pane.view
             view.apply_date_range(new_date_range, prev_date_range)
@@ -402,6 +519,12 @@ class MainWindow(DocumentGUIObject):
         self.restore_view()
         self.revalidate()
 
+    def load_from_journal(self, path):
+        self._close_irrelevant_account_panes(close_all=True)
+        self.document.load_from_journal(path)
+        self.restore_view()
+        self.revalidate()
+
     def load_parsed_file_for_import(self, target_account=None):
         """Load a parsed file for import and trigger the opening of the Import window.
 
@@ -410,7 +533,7 @@ class MainWindow(DocumentGUIObject):
         parsed data into model instances, ready to be shown in the Import window.
         """
         self.loader.load()
-        if any(a.is_balance_sheet_account() for a in self.loader.accounts) and self.loader.transactions:
+        if has_accounts_to_import(self.loader):
             panel = ImportWindow(self, target_account)
             panel.view = weakref.proxy(self.view.get_panel_view(panel))
             panel.view.show()
@@ -490,22 +613,14 @@ class MainWindow(DocumentGUIObject):
     def parse_file_for_import(self, filename):
         """Parses ``filename`` in preparation for importing.
 
-        Opens and parses ``filename`` and try to determine its format by successively trying to read
-        is as a moneyGuru file, an OFX, a QIF and finally a CSV. Once parsed, take the appropriate
-        action for the file which is either to show the CSV options window or to call
-        :meth:`load_parsed_file_for_import`.
+        Opens and parses ``filename`` and try to determine its format by sniffing its header. If it
+        doesn't tell us anything, we successively try to read it as a moneyGuru file, an OFX, a QIF
+        and finally a CSV. Once parsed, take the appropriate action for the file which is either to
+        show the CSV options window or to call :meth:`load_parsed_file_for_import`.
         """
         default_date_format = DateFormat(self.app.date_format).sys_format
-        for loaderclass in (native.Loader, ofx.Loader, qif.Loader, csv.Loader):
-            try:
-                loader = loaderclass(
-                    self.document.default_currency, default_date_format=default_date_format
-                )
-                loader.parse(filename)
-                break
-            except FileFormatError:
-                pass
-        else:
+        loader = batch.parse_file(filename, self.document.default_currency, default_date_format)
+        if loader is None:
             # No file fitted
             raise FileFormatError(tr('%s is of an unknown format.') % filename)
         self.loader = loader
@@ -517,35 +632,64 @@ class MainWindow(DocumentGUIObject):
         else:
             return self.load_parsed_file_for_import()
 
+    def parse_files_for_import(self, filenames):
+        """Parses all ``filenames`` as a batch and shows them in a single Import window.
+
+        Files are read in worker processes and parsed (see :func:`core.loader.batch.parse_files`),
+        then loaded one after the other. Each of their accounts gets its own pane in the Import window.
+
+        CSV files need to be configured before they're loaded, so they can only be imported by
+        themselves. We skip them, as well as files we can't import, and tell the user about it. If
+        there's nothing left to import, we raise ``FileFormatError``.
+
+        With a single file, this is the same as :meth:`parse_file_for_import`.
+        """
+        if len(filenames) == 1:
+            return self.parse_file_for_import(filenames[0])
+        default_date_format = DateFormat(self.app.date_format).sys_format
+        loaders = batch.parse_files(
+            filenames, self.document.default_currency, default_date_format
+        )
+        to_import = []
+        errors = []
+        for filename, loader in zip(filenames, loaders):
+            if loader is None:
+                errors.append(tr('%s is of an unknown format.') % filename)
+                continue
+            if isinstance(loader, csv.Loader):
+                errors.append(tr('%s is a CSV file and has to be imported by itself.') % filename)
+                continue
+            loader.load()
+            if has_accounts_to_import(loader):
+                to_import.append(loader)
+            else:
+                errors.append(tr('%s does not contain any account to import.') % filename)
+        if not to_import:
+            raise FileFormatError('\n'.join(errors))
+        panel = ImportWindow(self, loaders=to_import)
+        panel.view = weakref.proxy(self.view.get_panel_view(panel))
+        panel.view.show()
+        if errors:
+            self.view.show_message('\n'.join(errors))
+        return panel
+
     def parse_search_query(self, query_string):
         """Parses ``query_string`` into something that can be used to filter transactions.
 
         :param str query_string: Search string that comes straight from the user through the search
                                  box.
-        :rtype: a dict of query arguments
+        :rtype: a dict of query arguments. It's shared with other callers, so don't modify it.
         """
-        query_string = query_string.strip().lower()
-        ALL_QUERY_TYPES = ['account', 'group', 'amount', 'description', 'checkno', 'payee', 'memo']
-        RE_TARGETED_SEARCH = re.compile(r'({}):(.*)'.format('|'.join(ALL_QUERY_TYPES)))
-        m = RE_TARGETED_SEARCH.match(query_string)
-        if m is not None:
-            qtype, qargs = m.groups()
-            qtypes = [qtype]
-        else:
-            qtypes = ALL_QUERY_TYPES
-            qargs = query_string
-        query = {}
-        for qtype in qtypes:
-            if qtype in {'account', 'group'}:
-                # account and group args are comma-splitted
-                query[qtype] = {s.strip() for s in qargs.split(',')}
-            elif qtype == 'amount':
-                try:
-                    query['amount'] = abs(self.document.parse_amount(qargs, with_expression=False))
-                except ValueError:
-                    pass
-            else:
-                query[qtype] = qargs
+        # Amounts are parsed according to the document, so parsed queries are valid until it
+        # changes.
+        key = (self.document.step, query_string)
+        cache = self._parsed_queries
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        query = cache[key] = self._parse_search_query(query_string)
+        if len(cache) > VISIBLE_CACHE_SIZE:
+            cache.popitem(last=False)
         return query
 
     def redo(self):
@@ -627,9 +771,11 @@ class MainWindow(DocumentGUIObject):
     def visible_entries_for_account(self, account):
         if account is None:
             return []
-        if account not in self._account2visibleentries:
-            self._account2visibleentries[account] = self._visible_entries_for_account(account)
-        return self._account2visibleentries[account]
+        return self._visible_items(account)
+
+    def visible_transactions(self):
+        """Returns transactions in the current date range that match the current filters."""
+        return self._visible_items(None)
 
     # Column menu
     def column_menu_items(self):
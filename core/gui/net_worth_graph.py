@@ -5,6 +5,7 @@
 # http://www.gnu.org/licenses/gpl-3.0.html
 
 from core.trans import tr
+from ..model._ccore import balance_series
 from ..model.date import DateRange
 from .balance_graph import BalanceGraph
 
@@ -12,12 +13,9 @@ class NetWorthGraph(BalanceGraph):
     def __init__(self, networth_view):
         BalanceGraph.__init__(self, networth_view)
 
-    def _balance_for_date(self, date):
-        def bal(a):
-            entries = self.document.accounts.entries_for_account(a)
-            return entries.balance(date, self._currency)
-
-        return sum(map(bal, self._accounts))
+    def _balance_series(self, start, end):
+        entry_lists = [self.document.accounts.entries_for_account(a) for a in self._accounts]
+        return balance_series(entry_lists, start, end, self._currency)
 
     def _budget_for_date(self, date):
         date_range = DateRange(date.min, date)
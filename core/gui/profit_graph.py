@@ -16,19 +16,23 @@ class ProfitGraph(BarGraph):
     def _currency(self):
         return self.document.default_currency
 
-    def _get_cash_flow(self, date_range):
-        self.document.oven.continue_cooking(date_range.end) # it's possible that the overflow is not cooked
+    def _get_cash_flows(self, date_ranges):
+        if not date_ranges:
+            return []
+        # it's possible that the overflow is not cooked
+        self.document.oven.continue_cooking(date_ranges[-1].end)
         accounts = {a for a in self.document.accounts if a.is_income_statement_account()}
         accounts = accounts - self.document.excluded_accounts
-
-        def getentries(a):
-            return self.document.accounts.entries_for_account(a)
-
-        cash_flow = -sum(
-            getentries(a).cash_flow(date_range, self.document.default_currency)
-            for a in accounts)
-        budgeted_amount = self.document.budgeted_amount(date_range)
-        return cash_flow + budgeted_amount
+        currency = self.document.default_currency
+        cash_flows = [0] * len(date_ranges)
+        for account in accounts:
+            entries = self.document.accounts.entries_for_account(account)
+            amounts = entries.cash_flow_by_period(date_ranges, currency)
+            cash_flows = [total + amount for total, amount in zip(cash_flows, amounts)]
+        return [
+            -cash_flow + self.document.budgeted_amount(date_range)
+            for cash_flow, date_range in zip(cash_flows, date_ranges)
+        ]
 
     def _is_reverted(self):
         return True
@@ -5,12 +5,13 @@
 # http://www.gnu.org/licenses/gpl-3.0.html
 
 import csv
+from datetime import date
 from io import StringIO
 
 from core.trans import tr
 
 from ..model.sort import ACCOUNT_SORT_KEY
-from ..util import extract
+from ..util import extract, parallel_map
 from .column import Columns
 from .base import ViewChild
 from . import tree
@@ -33,6 +34,10 @@ def new_name(base_name, search_func):
 class Report(ViewChild, tree.Tree):
     SAVENAME = ''
     COLUMNS = []
+    # Node attributes that _compute_account_node() sets.
+    ACCOUNT_NODE_ATTRS = ()
+    # Types of the accounts we show.
+    ACCOUNT_TYPES = ()
 
     def __init__(self, parent_view):
         ViewChild.__init__(self, parent_view)
@@ -40,6 +45,11 @@ class Report(ViewChild, tree.Tree):
         self.columns = Columns(self, prefaccess=parent_view.document, savename=self.SAVENAME)
         self.edited = None
         self._expanded_paths = {(0, ), (1, )}
+        # account: (key, values of ACCOUNT_NODE_ATTRS)
+        self._account_values = {}
+        self._prev_account_values = {}
+        # account: (key, values) computed in worker threads for the current refresh
+        self._computed_account_values = {}
 
     # --- Override
     def restore_view(self):
@@ -63,6 +73,67 @@ class Report(ViewChild, tree.Tree):
         pass
 
     # --- Protected
+    def _account_values_key(self, account):
+        # Returns a key that changes whenever the values of ``account``'s node might change, or
+        # None if we can't tell. Values in a foreign currency depend on exchange rates, which can
+        # change without notice.
+        currency = self.document.default_currency
+        if account.currency != currency:
+            return None
+        date_range = self.document.date_range
+        entries = self.document.accounts.entries_for_account(account)
+        return (
+            account.type, currency, type(date_range), date_range.start, date_range.end,
+            date.today(), entries.generation,
+        )
+
+    def _cached_account_values(self, account, key):
+        # Returns the values from our last refresh if ``key`` still matches, None otherwise.
+        cached = self._prev_account_values.get(account)
+        if key is not None and cached is not None and cached[0] == key:
+            return cached[1]
+        return None
+
+    def _compute_account_values(self, account):
+        # Returns the values of ACCOUNT_NODE_ATTRS for ``account``. Can run in a worker thread.
+        node = self._make_node(account.name)
+        node.account = account
+        self._compute_account_node(node)
+        return tuple(getattr(node, attr) for attr in self.ACCOUNT_NODE_ATTRS)
+
+    def _compute_account_values_in_parallel(self):
+        # Computes, before we build the tree, the values of all accounts that can't be re-used.
+        worker_count = self.app.report_worker_count
+        if worker_count <= 1:
+            return
+        excluded = self.document.excluded_accounts
+        todo = []
+        for account in self.document.accounts:
+            if account.type not in self.ACCOUNT_TYPES or account in excluded:
+                continue
+            key = self._account_values_key(account)
+            if self._cached_account_values(account, key) is None:
+                todo.append((account, key))
+        accounts = [account for account, key in todo]
+        values = parallel_map(self._compute_account_values, accounts, worker_count)
+        self._computed_account_values = {
+            account: (key, v) for (account, key), v in zip(todo, values)
+        }
+
+    def _compute_account_node_cached(self, node):
+        account = node.account
+        if account in self._computed_account_values:
+            key, values = self._computed_account_values[account]
+        else:
+            key = self._account_values_key(account)
+            values = self._cached_account_values(account, key)
+            if values is None:
+                values = self._compute_account_values(account)
+        for attr, value in zip(self.ACCOUNT_NODE_ATTRS, values):
+            setattr(node, attr, value)
+        if key is not None:
+            self._account_values[account] = (key, values)
+
     def _node_of_account(self, account):
         return self.find(lambda n: getattr(n, 'account', None) == account)
 
@@ -207,7 +278,7 @@ class Report(ViewChild, tree.Tree):
         node.account_number = account.account_number
         node.is_excluded = account in self.document.excluded_accounts
         if not node.is_excluded:
-            self._compute_account_node(node)
+            self._compute_account_node_cached(node)
         return node
 
     def make_blank_node(self):
@@ -269,7 +340,14 @@ class Report(ViewChild, tree.Tree):
     def refresh(self, refresh_view=True):
         selected_accounts = self.selected_accounts
         selected_paths = self.selected_paths
+        # Account nodes that are still valid are re-used. We only keep values for accounts that
+        # are still in the report.
+        self._prev_account_values = self._account_values
+        self._account_values = {}
+        self._compute_account_values_in_parallel()
         self._refresh()
+        self._prev_account_values = {}
+        self._computed_account_values = {}
         selected_nodes = []
         for account in selected_accounts:
             node_of_account = self._node_of_account(account)
@@ -7,9 +7,8 @@
 import weakref
 
 from core.trans import tr
-from ..const import PaneType, FilterType, AccountType
+from ..const import PaneType
 from ..model._ccore import amount_convert
-from ..model.transaction import txn_matches
 from .base import BaseView
 from .filter_bar import FilterBar
 from .mass_edition_panel import MassEditionPanel
@@ -101,31 +100,7 @@ class TransactionView(TransactionViewBase):
         self.status_line = msg.format(selected, total, total_amount_fmt)
 
     def _set_visible_transactions(self):
-        date_range = self.document.date_range
-        txns = [t for t in self.document.oven.transactions if t.date in date_range]
-        query_string = self.mainwindow.filter_string
-        filter_type = self.mainwindow.filter_type
-        if not query_string and filter_type is None:
-            self._visible_transactions = txns
-            return
-        if query_string:
-            query = self.mainwindow.parse_search_query(query_string)
-            txns = [t for t in txns if txn_matches(t, query)]
-        if filter_type is FilterType.Unassigned:
-            txns = [t for t in txns if t.has_unassigned_split]
-        elif filter_type is FilterType.Income:
-            txns = [t for t in txns if any(getattr(s.account, 'type', '') == AccountType.Income for s in t.splits)]
-        elif filter_type is FilterType.Expense:
-            txns = [t for t in txns if any(getattr(s.account, 'type', '') == AccountType.Expense for s in t.splits)]
-        elif filter_type is FilterType.Transfer:
-            def is_transfer(t):
-                return len([s for s in t.splits if s.account is not None and s.account.is_balance_sheet_account()]) >= 2
-            txns = list(filter(is_transfer, txns))
-        elif filter_type is FilterType.Reconciled:
-            txns = [t for t in txns if any(s.reconciled for s in t.splits)]
-        elif filter_type is FilterType.NotReconciled:
-            txns = [t for t in txns if all(not s.reconciled for s in t.splits)]
-        self._visible_transactions = txns
+        self._visible_transactions = self.mainwindow.visible_transactions()
 
     # --- Override
     def _invalidate_cache(self):
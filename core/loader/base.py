@@ -5,8 +5,10 @@
 # http://www.gnu.org/licenses/gpl-3.0.html
 
 import datetime
+import io
 import logging
 import re
+from functools import lru_cache
 
 from core.util import dedupe, nonone
 from core.trans import tr
@@ -86,30 +88,85 @@ def clean_date(str_date):
     match = re_possibly_a_date.search(str_date)
     return match.group() if match is not None else None
 
+# Number of distinct date strings we first try a format on when guessing. When a format is wrong,
+# it usually shows quickly in a spread out sample.
+DATE_SAMPLE_SIZE = 20
+DATE_CACHE_SIZE = 10000
+
+@lru_cache(maxsize=None)
+def _date_format_shape(date_format):
+    # Returns a regexp that matches all strings that ``date_format`` can possibly parse. It's much
+    # cheaper than strptime() and allows us to quickly eliminate most formats when guessing.
+    directives = {
+        '%d': r'[\d ]?\d',
+        '%m': r'\d{1,2}',
+        '%y': r'\d\d',
+        '%Y': r'\d\d\d\d',
+        '%b': r'\D+?',
+    }
+    pattern = re.sub(
+        r'%.|\s+|[^%\s]+',
+        lambda m: directives.get(m.group(), r'\s+' if m.group().isspace() else re.escape(m.group())),
+        date_format
+    )
+    return re.compile(pattern, re.IGNORECASE)
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _parse_date(date_str, date_format):
+    # Returns None if ``date_str`` can't be parsed with ``date_format``. Results are cached because
+    # imported files usually have many transactions on the same dates.
+    try:
+        result = datetime.datetime.strptime(date_str, date_format).date()
+    except ValueError:
+        return None
+    if result.year < 1900:
+        # we have a typo in the house. Just use 2000 + last-two-digits
+        year = (result.year % 100) + 2000
+        result = result.replace(year=year)
+    return result
+
 def guess_date_format(str_dates, formats_to_try):
+    """Returns the first format of ``formats_to_try`` that can parse all ``str_dates``.
+
+    Returns None if there's no such format.
+    """
+    str_dates = dedupe(str_dates)
+    if not str_dates:
+        return None
+    step = max(len(str_dates) // DATE_SAMPLE_SIZE, 1)
+    sample = str_dates[::step]
     for format in dedupe(formats_to_try):
-        found_at_least_one = False
-        for str_date in str_dates:
-            try:
-                datetime.datetime.strptime(str_date, format)
-                found_at_least_one = True
-            except ValueError:
-                logging.debug("Failed try to read the date %s with the format %s", str_date, format)
-                break
-        else:
-            if found_at_least_one:
-                logging.debug("Correct date format: %s", format)
-                return format
+        shape = _date_format_shape(format)
+        if not all(shape.fullmatch(str_date) for str_date in str_dates):
+            continue
+        if all(_parse_date(str_date, format) is not None for str_date in sample) and \
+                all(_parse_date(str_date, format) is not None for str_date in str_dates):
+            logging.debug("Correct date format: %s", format)
+            return format
     return None
 
 def parse_date_str(date_str, date_format):
     """Parses date_str using date_format and perform heuristic fixes if needed.
     """
-    result = datetime.datetime.strptime(date_str, date_format).date()
-    if result.year < 1900:
-        # we have a typo in the house. Just use 2000 + last-two-digits
-        year = (result.year % 100) + 2000
-        result = result.replace(year=year)
+    result = _parse_date(date_str, date_format)
+    if result is None:
+        raise ValueError("%r doesn't match format %r" % (date_str, date_format))
+    return result
+
+def parse_dates(str_dates, date_format):
+    """Parses all ``str_dates`` using ``date_format``, like :func:`parse_date_str`.
+
+    Returns a list of dates in the same order as ``str_dates``. Strings that can't be parsed give
+    ``None``. Each distinct string is only parsed once.
+    """
+    cache = {}
+    result = []
+    for str_date in str_dates:
+        try:
+            date = cache[str_date]
+        except KeyError:
+            date = cache[str_date] = _parse_date(str_date, date_format)
+        result.append(date)
     return result
 
 class Loader:
@@ -189,8 +246,17 @@ class Loader:
         return self.default_currency
 
     # --- Public
-    def parse(self, filename):
-        """Parses 'filename' and raises FileFormatError if appropriate."""
+    def parse(self, filename, content=None):
+        """Parses 'filename' and raises FileFormatError if appropriate.
+
+        If we've already read the file, we parse its ``content`` (bytes) instead of reading it again.
+        """
+        if content is not None:
+            infile = io.BytesIO(content)
+            if 't' in self.FILE_OPEN_MODE:
+                infile = io.TextIOWrapper(infile, encoding=self.FILE_ENCODING, errors='ignore')
+            self._parse(infile)
+            return
         try:
             if 't' in self.FILE_OPEN_MODE:
                 kw = {'encoding': self.FILE_ENCODING, 'errors': 'ignore'}
@@ -0,0 +1,91 @@
+# Copyright 2019 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+import codecs
+from concurrent.futures import ProcessPoolExecutor
+
+from ..exception import FileFormatError
+from . import csv, qif, ofx, native
+
+# In the order in which we try them when we can't tell what a file is.
+LOADER_CLASSES = (native.Loader, ofx.Loader, qif.Loader, csv.Loader)
+SNIFF_SIZE = 4 * 1024
+
+def _guess_loader_classes_from_header(header):
+    if header.startswith(codecs.BOM_UTF8):
+        header = header[len(codecs.BOM_UTF8):]
+    header = header.decode('latin-1').lstrip()
+    if '<moneyguru-file' in header:
+        guess = native.Loader
+    elif header.startswith('OFXHEADER') or '<?OFX' in header:
+        guess = ofx.Loader
+    elif header.startswith('!'):
+        guess = qif.Loader
+    else:
+        return LOADER_CLASSES
+    return (guess, ) + tuple(c for c in LOADER_CLASSES if c is not guess)
+
+def guess_loader_classes(filename):
+    """Returns loader classes to try on ``filename``, the most likely one first.
+
+    We only look at the beginning of the file. When it tells us what format the file is, we put the
+    loader for that format first. We still return all loaders afterwards, in case we're wrong.
+    """
+    try:
+        with open(filename, 'rb') as fp:
+            header = fp.read(SNIFF_SIZE)
+    except IOError:
+        return LOADER_CLASSES
+    return _guess_loader_classes_from_header(header)
+
+def read_file(filename):
+    """Reads ``filename`` and returns ``(loader_classes, content)``.
+
+    ``loader_classes`` is what :func:`guess_loader_classes` returns for the file and ``content``
+    is its bytes. Returns ``None`` if the file can't be read.
+    """
+    try:
+        with open(filename, 'rb') as fp:
+            content = fp.read()
+    except IOError:
+        return None
+    return _guess_loader_classes_from_header(content[:SNIFF_SIZE]), content
+
+def parse_file(filename, default_currency, default_date_format=None, read_result=None):
+    """Parses ``filename`` with the first loader that fits it and returns that loader.
+
+    If we already have the :func:`read_file` result for ``filename``, we parse from it instead of
+    reading the file again. Returns ``None`` if no loader fits.
+    """
+    if read_result is None:
+        loader_classes, content = guess_loader_classes(filename), None
+    else:
+        loader_classes, content = read_result
+    for loaderclass in loader_classes:
+        try:
+            loader = loaderclass(default_currency, default_date_format=default_date_format)
+            loader.parse(filename, content)
+            return loader
+        except FileFormatError:
+            pass
+    return None
+
+def parse_files(filenames, default_currency, default_date_format=None):
+    """Parses all ``filenames`` with :func:`parse_file`.
+
+    Returns a list of loaders (or ``None``), in the same order as ``filenames``. Loaders are only
+    parsed, not loaded.
+
+    Files are read and their format sniffed concurrently in worker processes. Loaders hold ccore
+    objects, which can't be pickled, and some of them already fill those while parsing, so the
+    workers only send back plain bytes and loaders are parsed from them in this process.
+    """
+    with ProcessPoolExecutor() as executor:
+        read_results = list(executor.map(read_file, filenames))
+    return [
+        parse_file(filename, default_currency, default_date_format, read_result)
+        for filename, read_result in zip(filenames, read_results)
+    ]
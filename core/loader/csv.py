@@ -4,10 +4,13 @@
 # which should be included with this package. The terms are also available at
 # http://www.gnu.org/licenses/gpl-3.0.html
 
+import codecs
 import csv
 import logging
+import sys
+from collections import deque
+from itertools import islice
 
-from core.util import stripfalse
 from core.trans import tr
 
 from ..const import AccountType
@@ -28,15 +31,35 @@ class CsvField:
 
 MERGABLE_FIELDS = {CsvField.Description, CsvField.Payee}
 
+SNIFF_SIZE = 64 * 1024 # Number of bytes at the beginning of the file used to guess its dialect
+PREVIEW_LINE_COUNT = 1000 # Number of lines kept in memory for the CSV options panel
+LOAD_CHUNK_LINE_COUNT = 1000 # Number of lines loaded at once when we stream the rest of the file
+READ_CHUNK_SIZE = 64 * 1024 # Number of bytes decoded at once when we read lines
+
 class Loader(base.Loader):
+    """Loads CSV files.
+
+    We never hold a whole CSV file in memory. ``lines`` is only a preview of the first
+    ``PREVIEW_LINE_COUNT`` lines of the file, which is what the CSV options panel shows. If the
+    file has more lines (``has_more_lines``), we stream through them twice at load time: once to
+    check their amounts and guess the date format from all dates, and once to load them.
+
+    Lines of the preview can be excluded from the load by removing them from ``lines``. Lines
+    after the preview can be excluded by putting their negative index, relative to the end of the
+    file, in ``excluded_last_lines``.
+    """
     FILE_OPEN_MODE = 'rb'
 
     def __init__(self, default_currency, default_date_format=None):
         base.Loader.__init__(self, default_currency, default_date_format)
         self.columns = []
         self.lines = []
+        self.has_more_lines = False
+        self.excluded_last_lines = set()
         self.dialect = None # last used dialect
-        self.readcontent = b''
+        self.filename = None
+        self._encoding = None
+        self._preview_row_count = 0
 
     # --- Private
     @staticmethod
@@ -58,10 +81,14 @@ class Loader(base.Loader):
                 del columns[index_to_remove]
 
     def _prepare(self, infile):
+        # We only look at the beginning of the file to guess its dialect.
+        sample = infile.read(SNIFF_SIZE)
+        lines = sample.replace(b'\0', b'').decode('latin-1').split('\n')
+        if len(sample) == SNIFF_SIZE and len(lines) > 1:
+            # The last line of our sample is most likely incomplete.
+            del lines[-1]
+        content = '\n'.join(lines)
         # Comment lines can confuse the sniffer. We remove them
-        readcontent = infile.read()
-        content = readcontent.replace(b'\0', b'').decode('latin-1')
-        lines = content.split('\n')
         stripped_lines = [line.strip() for line in lines]
         stripped_lines = [line for line in stripped_lines if line and not line.startswith('#')]
         try:
@@ -82,37 +109,113 @@ class Loader(base.Loader):
             class ManualDialect(csv.excel):
                 delimiter = delim
             self.dialect = ManualDialect
-        self.readcontent = readcontent
+
+    def _iter_lines(self, encoding):
+        # Yields all lines of the file, decoded with ``encoding``. Undecodable bytes are ignored
+        # and, like with ``bytes.decode()``, UTF-16 and UTF-32 without BOM use the native byte
+        # order.
+        decoder = codecs.getincrementaldecoder(encoding)(errors='ignore')
+        pending = ''
+        with open(self.filename, 'rb') as fp:
+            for chunk in iter(lambda: fp.read(READ_CHUNK_SIZE), b''):
+                try:
+                    text = decoder.decode(chunk)
+                except UnicodeError: # no BOM
+                    byteorder = '-le' if sys.byteorder == 'little' else '-be'
+                    encoding = codecs.lookup(encoding).name + byteorder
+                    decoder = codecs.getincrementaldecoder(encoding)(errors='ignore')
+                    text = decoder.decode(chunk)
+                lines = (pending + text).splitlines(True)
+                # The last line might be incomplete, or be a \r whose \n is in the next chunk.
+                pending = lines.pop() if lines and not lines[-1].endswith('\n') else ''
+                yield from lines
+        yield from (pending + decoder.decode(b'', final=True)).splitlines(True)
+
+    def _iter_rows(self, encoding):
+        # Yields all rows of the file, including empty ones.
+        lines = self._iter_lines(encoding)
+        try:
+            rawlines = (line.replace('\0', '').rstrip('\r\n') for line in lines)
+            try:
+                reader = csv.reader(rawlines, self.dialect)
+            except TypeError:
+                logging.warning(
+                    "Invalid Dialect (strangely...). Delimiter: %r", self.dialect.delimiter)
+                raise
+            yield from reader
+        finally:
+            lines.close()
 
     def _scan_lines(self, encoding=None):
         if not encoding:
             encoding = 'latin-1'
-        content = self.readcontent.decode(encoding, 'ignore').replace('\0', '')
-        rawlines = content.splitlines()
+        self._encoding = encoding
+        lines = []
+        rowcount = 0
+        rows = self._iter_rows(encoding)
         try:
-            reader = csv.reader(iter(rawlines), self.dialect)
-        except TypeError:
-            logging.warning("Invalid Dialect (strangely...). Delimiter: %r", self.dialect.delimiter)
-        lines = stripfalse(reader)
+            for row in rows:
+                rowcount += 1
+                if row:
+                    lines.append(row)
+                    if len(lines) == PREVIEW_LINE_COUNT:
+                        break
+            self.has_more_lines = next(rows, None) is not None
+        finally:
+            rows.close()
+        self._preview_row_count = rowcount
         # complete smaller lines and strip whitespaces
         maxlen = max(len(line) for line in lines)
         for line in (l for l in lines if len(l) < maxlen):
             line += [''] * (maxlen - len(line))
         self.lines = lines
 
-    def _parse_date_format(self, lines, ci):
-        date_index = ci[CsvField.Date]
-        lines_to_load = []
+    def _iter_remaining_chunks(self, colcount):
+        # Yields lists of the lines that come after our preview, padded to ``colcount`` columns,
+        # ``LOAD_CHUNK_LINE_COUNT`` lines at a time.
+        if not self.has_more_lines:
+            return
+        # We hold back enough lines to be able to drop excluded lines at the end of the file.
+        holdback = -min(self.excluded_last_lines, default=0)
+        rows = islice(self._iter_rows(self._encoding), self._preview_row_count, None)
+        pending = deque()
+        chunk = []
+        for row in rows:
+            if not row:
+                continue
+            if len(row) < colcount:
+                row += [''] * (colcount - len(row))
+            pending.append(row)
+            if len(pending) > holdback:
+                chunk.append(pending.popleft())
+                if len(chunk) == LOAD_CHUNK_LINE_COUNT:
+                    yield chunk
+                    chunk = []
+        chunk += [
+            row for index, row in enumerate(pending, start=-len(pending))
+            if index not in self.excluded_last_lines
+        ]
+        if chunk:
+            yield chunk
+
+    def _clean_dates(self, lines, date_index, warn=True):
+        result = []
         for line in lines:
-            line = line[:]
             cleaned_str_date = base.clean_date(line[date_index])
             if cleaned_str_date is None:
-                logging.warning('{0} is not a date. Ignoring line'.format(line[date_index]))
+                if warn:
+                    logging.warning('{0} is not a date. Ignoring line'.format(line[date_index]))
             else:
+                line = line[:]
                 line[date_index] = cleaned_str_date
-                lines_to_load.append(line)
-        del line
+                result.append(line)
+        return result
+
+    def _parse_date_format(self, lines, ci, other_str_dates):
+        lines_to_load = self._clean_dates(lines, ci[CsvField.Date])
+        date_index = ci[CsvField.Date]
         str_dates = [line[date_index] for line in lines_to_load]
+        str_dates += other_str_dates
         date_format = self.guess_date_format(str_dates)
         if date_format is None:
             raise FileLoadError(tr("The Date column has been set on a column that doesn't contain dates."))
@@ -130,35 +233,29 @@ class Loader(base.Loader):
                 except ValueError:
                     raise FileLoadError(tr("The Amount column has been set on a column that doesn't contain amounts."))
 
-    # --- Override
-    def _parse(self, infile):
-        self._prepare(infile)
-        self._scan_lines()
+    def _check_remaining_lines(self, colcount, columns, ci):
+        # Streams through the lines after our preview to check their amounts. Returns the distinct
+        # date strings they contain so that we can guess the date format from all dates.
+        date_index = ci[CsvField.Date]
+        str_dates = set()
+        for chunk in self._iter_remaining_chunks(colcount):
+            self._merge_columns(columns[:], chunk)
+            chunk = self._clean_dates(chunk, date_index, warn=False)
+            self._check_amount_values(chunk, ci)
+            str_dates.update(line[date_index] for line in chunk)
+        return sorted(str_dates)
 
-    def _load(self):
-        lines = self.lines[:]
-        colcount = len(lines[0]) if lines else 0
-        columns = self.columns[:colcount]
-        self._merge_columns(columns, lines)
-        ci = {}
-        for index, field in enumerate(columns):
-            if field is not None:
-                ci[field] = index
-        hasdate = CsvField.Date in ci
-        hasamount = (CsvField.Amount in ci) or (CsvField.Increase in ci and CsvField.Decrease in ci)
-        if not (hasdate and hasamount):
-            raise FileLoadError(tr("The Date and Amount columns must be set."))
-        target_account = self.accounts.create(
-            'CSV Import', self.default_currency, AccountType.Asset)
-        self.parsing_date_format, lines_to_load = self._parse_date_format(lines, ci)
-        self._check_amount_values(lines_to_load, ci)
-        for line in lines_to_load:
+    def _load_lines(self, lines, ci, target_account):
+        # All lines have been checked beforehand and our date format parses all their dates.
+        date_index = ci[CsvField.Date]
+        dates = base.parse_dates([line[date_index] for line in lines], self.parsing_date_format)
+        for line, date in zip(lines, dates):
             info = base.TransactionInfo()
             info.account = target_account.name
             for attr, index in ci.items():
                 value = line[index]
                 if attr == CsvField.Date:
-                    value = base.parse_date_str(value, self.parsing_date_format)
+                    value = date
                 elif attr == CsvField.Increase:
                     attr = CsvField.Amount
                 elif attr == CsvField.Decrease:
@@ -173,7 +270,42 @@ class Loader(base.Loader):
                 txn = info.load(self.accounts)
                 self.transactions.add(txn)
 
+    # --- Override
+    def _parse(self, infile):
+        self._prepare(infile)
+        self._scan_lines()
+
+    def _load(self):
+        lines = self.lines[:]
+        colcount = len(lines[0]) if lines else 0
+        columns = self.columns[:colcount]
+        merged_columns = columns[:]
+        self._merge_columns(merged_columns, lines)
+        ci = {}
+        for index, field in enumerate(merged_columns):
+            if field is not None:
+                ci[field] = index
+        hasdate = CsvField.Date in ci
+        hasamount = (CsvField.Amount in ci) or (CsvField.Increase in ci and CsvField.Decrease in ci)
+        if not (hasdate and hasamount):
+            raise FileLoadError(tr("The Date and Amount columns must be set."))
+        target_account = self.accounts.create(
+            'CSV Import', self.default_currency, AccountType.Asset)
+        other_str_dates = self._check_remaining_lines(colcount, columns, ci)
+        self.parsing_date_format, lines_to_load = self._parse_date_format(
+            lines, ci, other_str_dates)
+        self._check_amount_values(lines_to_load, ci)
+        self._load_lines(lines_to_load, ci, target_account)
+        for chunk in self._iter_remaining_chunks(colcount):
+            self._merge_columns(columns[:], chunk)
+            chunk = self._clean_dates(chunk, ci[CsvField.Date])
+            self._load_lines(chunk, ci, target_account)
+
     # --- Public
+    def parse(self, filename, content=None):
+        # We need to re-open the file to stream through its lines at load time.
+        self.filename = filename
+        super().parse(filename, content)
+
     def rescan(self, encoding=None):
         self._scan_lines(encoding=encoding)
-
@@ -0,0 +1,188 @@
+# Copyright 2019 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+# The autosave journal of a document lives in its own folder in our cache folder. It's made of
+# generations. Each generation has a snapshot file, containing the whole document, and a journal
+# file, to which we append an entry every time we autosave. Recovering a document means loading
+# the latest snapshot and replaying all journal entries made after it.
+#
+# Both files contain one ``<entry>`` element per line. Entries have the same elements as native
+# documents, except that accounts and transactions have an ``id`` attribute. An element with an
+# id we already know replaces what we had for that id. Entries also have ``delete-account`` and
+# ``delete-transaction`` elements as well as ``schedules`` and ``budgets`` elements that replace
+# all schedules and budgets.
+#
+# Every entry has a ``session`` attribute. Ids are only meaningful within a session and a new
+# session starts whenever the document is loaded, cleared or reopened.
+#
+# Transactions in entries also have a ``position`` attribute so that we can restore their order
+# among transactions of the same date.
+#
+# A document gets a new journal folder every time it's loaded or cleared. This way, reopening a
+# document after a crash doesn't overwrite the journal we could recover it from.
+
+import os
+import os.path as op
+import re
+import xml.etree.cElementTree as ET
+
+from ..exception import FileFormatError
+from . import base, native
+
+SNAPSHOT_NAME = 'snapshot{}.xml'
+JOURNAL_NAME = 'journal{}.log'
+RE_GENERATION = re.compile(r'^(snapshot|journal)(\d+)\.(xml|log)$')
+
+def journal_path(cache_path, name):
+    """Returns the path of the autosave journal folder ``name``."""
+    return op.join(cache_path, 'journal', name)
+
+def journal_mtime(path):
+    """Returns the time at which the journal in ``path`` was last written to."""
+    try:
+        return max(
+            (os.stat(op.join(path, name)).st_mtime for name in os.listdir(path)),
+            default=os.stat(path).st_mtime
+        )
+    except OSError:
+        return 0
+
+def journal_folders(cache_path):
+    """Returns the paths of all journal folders in ``cache_path``, most recent first."""
+    root = op.join(cache_path, 'journal')
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return []
+    paths = [op.join(root, name) for name in names]
+    paths = [path for path in paths if op.isdir(path)]
+    paths.sort(key=journal_mtime, reverse=True)
+    return paths
+
+def generations(path):
+    """Returns ``(snapshots, journals)``, sorted generation numbers of the files in ``path``."""
+    snapshots = []
+    journals = []
+    try:
+        names = os.listdir(path)
+    except OSError:
+        names = []
+    for name in names:
+        match = RE_GENERATION.match(name)
+        if match is None:
+            continue
+        if match.group(1) == 'snapshot':
+            snapshots.append(int(match.group(2)))
+        else:
+            journals.append(int(match.group(2)))
+    return sorted(snapshots), sorted(journals)
+
+class Loader(native.Loader):
+    """Loads the document that was autosaved in the journal folder given to ``parse()``.
+
+    ``parse()`` raises ``FileFormatError`` if there's no snapshot in that folder.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.filenames = []
+        self._accounts_by_id = {}
+        self._transactions_by_id = {}
+        self._session = None
+
+    def parse(self, filename):
+        snapshots, journals = generations(filename)
+        if not snapshots:
+            raise FileFormatError()
+        generation = snapshots[-1]
+        self.filenames = [op.join(filename, SNAPSHOT_NAME.format(generation))]
+        self.filenames += [
+            op.join(filename, JOURNAL_NAME.format(g)) for g in journals if g >= generation
+        ]
+
+    def _load(self):
+        for filename in self.filenames:
+            with open(filename, 'rb') as fp:
+                for line in fp:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = ET.fromstring(line)
+                    except SyntaxError:
+                        # A crash while we were appending to the journal leaves a truncated entry
+                        # behind. It's always the last one, so we simply stop there.
+                        return
+                    # The journal of a later generation can come from another session that
+                    # didn't get to write its snapshot. Its ids don't mean anything to us.
+                    session = entry.attrib.get('session')
+                    if self._session is None:
+                        self._session = session
+                    elif session != self._session:
+                        return
+                    self._load_entry(entry)
+
+    # --- Private
+    def _load_entry(self, entry):
+        if 'document_id' in entry.attrib:
+            self.document_id = entry.attrib['document_id']
+        for element in entry:
+            tag = element.tag
+            if tag == 'delete-transaction':
+                txn = self._transactions_by_id.pop(element.attrib.get('id'), None)
+                if txn is not None:
+                    self.transactions.remove(txn)
+            elif tag == 'delete-account':
+                account = self._accounts_by_id.pop(element.attrib.get('id'), None)
+                if account is not None:
+                    self.accounts.remove(account)
+            elif tag == 'schedules':
+                del self.schedules[:]
+                for subelement in element:
+                    self._read_recurrence(subelement)
+            elif tag == 'budgets':
+                del self.budgets[:]
+                self._budget_settings_read = False
+                for subelement in element:
+                    self._read_budget(subelement)
+            elif tag == 'transaction':
+                txn = self._read_transaction(element)
+                try:
+                    txn.position = int(element.attrib['position'])
+                    self.transactions.add(txn, True)
+                except (KeyError, ValueError):
+                    self.transactions.add(txn)
+            else:
+                self._load_element(element)
+
+    def _read_account(self, element):
+        attrib = element.attrib
+        id = attrib.get('id')
+        account = self._accounts_by_id.get(id)
+        if account is None:
+            account = super()._read_account(element)
+            if account is not None:
+                self._accounts_by_id[id] = account
+            return account
+        name = attrib.get('name')
+        if name and name != account.name:
+            self.accounts.rename_account(account, name)
+        account.change(
+            currency=self.get_currency(attrib.get('currency')),
+            type=base.get_account_type(attrib.get('type')),
+            groupname=attrib.get('group'), reference=attrib.get('reference'),
+            account_number=attrib.get('account_number', ''),
+            inactive=attrib.get('inactive') == 'y',
+            notes=self._handle_newlines(attrib.get('notes', '')))
+        return account
+
+    def _read_transaction(self, element):
+        txn = super()._read_transaction(element)
+        id = element.attrib.get('id')
+        if id is not None:
+            old = self._transactions_by_id.get(id)
+            if old is not None:
+                self.transactions.remove(old)
+            self._transactions_by_id[id] = txn
+        return txn
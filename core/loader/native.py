@@ -33,152 +33,204 @@ class Loader(base.Loader):
         self.oven = Oven(self.accounts, self.transactions, self.schedules, self.budgets)
         self.properties = {}
         self.document_id = None
+        self._budget_settings_read = False
+        self._today = datetime.date.today()
+        self._source = None
 
     def _parse(self, infile):
+        # We only check that we have a moneyGuru file here. Elements are loaded in _load().
         try:
-            root = ET.parse(infile).getroot()
-        except SyntaxError:
+            event, root = next(ET.iterparse(infile, events=('start', )))
+        except SyntaxError as e:
+            # The parse error is in a reference cycle with the parser's frames. Through its
+            # traceback, it would keep our caller's frames alive until the next GC pass.
+            e.__traceback__ = None
             raise FileFormatError()
         if root.tag != 'moneyguru-file':
             raise FileFormatError()
-        self.root = root
+        self.document_id = root.attrib.get('document_id')
+        # Files are closed once parsed, so we re-open them by name at load time. Other file
+        # objects are read again from the start.
+        self._source = getattr(infile, 'name', infile)
 
     def _load(self):
-        TODAY = datetime.date.today()
+        if isinstance(self._source, str):
+            with open(self._source, 'rb') as fp:
+                self._load_elements(fp)
+        else:
+            self._source.seek(0)
+            self._load_elements(self._source)
+
+    # --- Private
+    def _load_elements(self, infile):
+        # We stream through the file and load each top level element as soon as it's closed, then
+        # discard it. This way, we never hold the whole element tree in memory. moneyGuru always
+        # saves accounts before anything else, so accounts referenced by transactions, schedules
+        # and budgets are already there when we load them.
+        root = None
+        depth = 0
+        try:
+            for event, element in ET.iterparse(infile, events=('start', 'end')):
+                if event == 'start':
+                    if root is None:
+                        root = element
+                    depth += 1
+                    continue
+                depth -= 1
+                if depth == 1:
+                    self._load_element(element)
+                    root.clear()
+        except SyntaxError as e:
+            # See _parse()
+            e.__traceback__ = None
+            raise FileFormatError()
+
+    def _str2date(self, s, default=None):
+        try:
+            return base.parse_date_str(s, self.parsing_date_format)
+        except (ValueError, TypeError):
+            return default
+
+    def _handle_newlines(self, s):
+        # etree doesn't correctly save newlines. During save, we escape them. Now's the time to
+        # restore them.
+        # XXX After a while, when most users will have used a moneyGuru version that doesn't
+        # need newline escaping on save, we can remove this one as well.
+        if not s:
+            return s
+        return s.replace('\\n', '\n')
+
+    def _load_element(self, element):
+        tag = element.tag
+        if tag == 'properties':
+            self._read_properties(element)
+        elif tag == 'account':
+            self._read_account(element)
+        elif tag == 'transaction':
+            self.transactions.add(self._read_transaction(element))
+        elif tag == 'recurrence':
+            self._read_recurrence(element)
+        elif tag == 'budget':
+            self._read_budget(element)
+
+    def _read_properties(self, element):
+        for name, value in element.attrib.items():
+            # For now, all our prefs except default_currency are ints, so
+            # we can simply assume tryint, but we'll eventually need
+            # something more sophisticated.
+            if name != 'default_currency':
+                value = tryint(value, default=None)
+            if name and value is not None:
+                self.properties[name] = value
 
-        def str2date(s, default=None):
+    def _read_account(self, element):
+        attrib = element.attrib
+        name = attrib.get('name')
+        if not name:
+            return None
+        currency = self.get_currency(attrib.get('currency'))
+        type = base.get_account_type(attrib.get('type'))
+        account = self.accounts.create(name, currency, type)
+        group = attrib.get('group')
+        reference = attrib.get('reference')
+        account_number = attrib.get('account_number', '')
+        inactive = attrib.get('inactive') == 'y'
+        notes = self._handle_newlines(attrib.get('notes', ''))
+        account.change(
+            groupname=group, reference=reference,
+            account_number=account_number, inactive=inactive, notes=notes)
+        return account
+
+    def _read_transaction(self, element):
+        str2date = self._str2date
+        attrib = element.attrib
+        date = str2date(attrib.get('date'), self._today)
+        description = attrib.get('description')
+        payee = attrib.get('payee')
+        checkno = attrib.get('checkno')
+        txn = Transaction(1, date, description, payee, checkno, None, None)
+        txn.notes = self._handle_newlines(attrib.get('notes')) or ''
+        try:
+            txn.mtime = int(attrib.get('mtime', 0))
+        except ValueError:
+            txn.mtime = 0
+        reference = attrib.get('reference')
+        for split_element in element.iter('split'):
+            attrib = split_element.attrib
+            accountname = attrib.get('account')
+            str_amount = attrib.get('amount')
+            account, amount = base.process_split(
+                self.accounts, accountname, str_amount, strict_currency=True)
+            split = txn.new_split()
+            split.account = account
+            split.amount = amount
+            split.memo = attrib.get('memo') or ''
+            split.reference = attrib.get('reference') or reference
+            if attrib.get('reconciled') == 'y':
+                split.reconciliation_date = date
+            elif account is None or not (not amount or amount.currency_code == account.currency):
+                # fix #442: off-currency transactions shouldn't be reconciled
+                split.reconciliation_date = None
+            elif 'reconciliation_date' in attrib:
+                split.reconciliation_date = str2date(attrib['reconciliation_date'])
+        txn.balance()
+        while len(txn.splits) < 2:
+            txn.new_split()
+        return txn
+
+    def _read_recurrence(self, element):
+        str2date = self._str2date
+        attrib = element.attrib
+        ref = self._read_transaction(element.find('transaction'))
+        repeat_type = attrib.get('type')
+        repeat_every = int(attrib.get('every', '1'))
+        recurrence = Recurrence(ref, repeat_type, repeat_every)
+        recurrence.stop_date = str2date(attrib.get('stop_date'))
+        for exception_element in element.iter('exception'):
             try:
-                return base.parse_date_str(s, self.parsing_date_format)
-            except (ValueError, TypeError):
-                return default
-
-        def handle_newlines(s):
-            # etree doesn't correctly save newlines. During save, we escape them. Now's the time to
-            # restore them.
-            # XXX After a while, when most users will have used a moneyGuru version that doesn't
-            # need newline escaping on save, we can remove this one as well.
-            if not s:
-                return s
-            return s.replace('\\n', '\n')
-
-        def read_transaction_element(element):
-            attrib = element.attrib
-            date = str2date(attrib.get('date'), TODAY)
-            description = attrib.get('description')
-            payee = attrib.get('payee')
-            checkno = attrib.get('checkno')
-            txn = Transaction(1, date, description, payee, checkno, None, None)
-            txn.notes = handle_newlines(attrib.get('notes')) or ''
+                date = str2date(exception_element.attrib['date'])
+                txn_element = exception_element.find('transaction')
+                exception = self._read_transaction(txn_element) if txn_element is not None else None
+                if exception:
+                    spawn = Spawn(recurrence, exception, date, exception.date)
+                    recurrence.date2exception[date] = spawn
+                else:
+                    recurrence.delete_at(date)
+            except KeyError:
+                continue
+        for change_element in element.iter('change'):
             try:
-                txn.mtime = int(attrib.get('mtime', 0))
-            except ValueError:
-                txn.mtime = 0
-            reference = attrib.get('reference')
-            for split_element in element.iter('split'):
-                attrib = split_element.attrib
-                accountname = attrib.get('account')
-                str_amount = attrib.get('amount')
-                account, amount = base.process_split(
-                    self.accounts, accountname, str_amount, strict_currency=True)
-                split = txn.new_split()
-                split.account = account
-                split.amount = amount
-                split.memo = attrib.get('memo') or ''
-                split.reference = attrib.get('reference') or reference
-                if attrib.get('reconciled') == 'y':
-                    split.reconciliation_date = date
-                elif account is None or not (not amount or amount.currency_code == account.currency):
-                    # fix #442: off-currency transactions shouldn't be reconciled
-                    split.reconciliation_date = None
-                elif 'reconciliation_date' in attrib:
-                    split.reconciliation_date = str2date(attrib['reconciliation_date'])
-            txn.balance()
-            while len(txn.splits) < 2:
-                txn.new_split()
-            return txn
-
-        root = self.root
-        self.document_id = root.attrib.get('document_id')
-        props_element = root.find('properties')
-        if props_element is not None:
-            for name, value in props_element.attrib.items():
-                # For now, all our prefs except default_currency are ints, so
-                # we can simply assume tryint, but we'll eventually need
-                # something more sophisticated.
-                if name != 'default_currency':
-                    value = tryint(value, default=None)
-                if name and value is not None:
-                    self.properties[name] = value
-        for account_element in root.iter('account'):
-            attrib = account_element.attrib
-            name = attrib.get('name')
-            if not name:
+                date = str2date(change_element.attrib['date'])
+                txn_element = change_element.find('transaction')
+                change = self._read_transaction(txn_element) if txn_element is not None else None
+                spawn = Spawn(recurrence, change, date, change.date)
+                recurrence.date2globalchange[date] = spawn
+            except KeyError:
                 continue
-            currency = self.get_currency(attrib.get('currency'))
-            type = base.get_account_type(attrib.get('type'))
-            account = self.accounts.create(name, currency, type)
-            group = attrib.get('group')
-            reference = attrib.get('reference')
-            account_number = attrib.get('account_number', '')
-            inactive = attrib.get('inactive') == 'y'
-            notes = handle_newlines(attrib.get('notes', ''))
-            account.change(
-                groupname=group, reference=reference,
-                account_number=account_number, inactive=inactive, notes=notes)
-        elements = [e for e in root if e.tag == 'transaction'] # we only want transaction element *at the root*
-        for transaction_element in elements:
-            txn = read_transaction_element(transaction_element)
-            self.transactions.add(txn)
-        for recurrence_element in root.iter('recurrence'):
-            attrib = recurrence_element.attrib
-            ref = read_transaction_element(recurrence_element.find('transaction'))
-            repeat_type = attrib.get('type')
-            repeat_every = int(attrib.get('every', '1'))
-            recurrence = Recurrence(ref, repeat_type, repeat_every)
-            recurrence.stop_date = str2date(attrib.get('stop_date'))
-            for exception_element in recurrence_element.iter('exception'):
-                try:
-                    date = str2date(exception_element.attrib['date'])
-                    txn_element = exception_element.find('transaction')
-                    exception = read_transaction_element(txn_element) if txn_element is not None else None
-                    if exception:
-                        spawn = Spawn(recurrence, exception, date, exception.date)
-                        recurrence.date2exception[date] = spawn
-                    else:
-                        recurrence.delete_at(date)
-                except KeyError:
-                    continue
-            for change_element in recurrence_element.iter('change'):
-                try:
-                    date = str2date(change_element.attrib['date'])
-                    txn_element = change_element.find('transaction')
-                    change = read_transaction_element(txn_element) if txn_element is not None else None
-                    spawn = Spawn(recurrence, change, date, change.date)
-                    recurrence.date2globalchange[date] = spawn
-                except KeyError:
-                    continue
-            self.schedules.append(recurrence)
-        budgets = list(root.iter('budget'))
-        if budgets:
-            attrib = budgets[0].attrib
-            start_date = str2date(attrib.get('start_date'))
+        self.schedules.append(recurrence)
+
+    def _read_budget(self, element):
+        attrib = element.attrib
+        if not self._budget_settings_read:
+            # Budget settings are saved in each budget element, but we only read them from the
+            # first one.
+            self._budget_settings_read = True
+            start_date = self._str2date(attrib.get('start_date'))
             if start_date:
                 self.budgets.start_date = start_date
             self.budgets.repeat_type = attrib.get('type')
             repeat_every = tryint(attrib.get('every'), default=None)
             if repeat_every:
                 self.budgets.repeat_every = repeat_every
-        for budget_element in budgets:
-            attrib = budget_element.attrib
-            account_name = attrib.get('account')
-            amount = attrib.get('amount')
-            notes = attrib.get('notes')
-            if not (account_name and amount):
-                continue
-            account = self.accounts.find(account_name)
-            if account is None:
-                continue
-            amount = parse_amount(amount, account.currency)
-            budget = Budget(account, amount)
-            budget.notes = nonone(notes, '')
-            self.budgets.append(budget)
+        account_name = attrib.get('account')
+        amount = attrib.get('amount')
+        notes = attrib.get('notes')
+        if not (account_name and amount):
+            return
+        account = self.accounts.find(account_name)
+        if account is None:
+            return
+        amount = parse_amount(amount, account.currency)
+        budget = Budget(account, amount)
+        budget.notes = nonone(notes, '')
+        self.budgets.append(budget)
@@ -6,82 +6,149 @@
 #
 # Sections refer to the OFX 1.0.3 spec.
 
-from itertools import dropwhile
+import re
 
 from ..const import AccountType
 from ..exception import FileFormatError
-from .sgmllib import SGMLParser
 from . import base
 
-class OFXParser(SGMLParser):
-    def __init__(self, loader, accounts_only=False):
-        super().__init__()
+CHUNK_SIZE = 64 * 1024
+
+# OFX v1 is SGML and OFX v2 is XML. The only difference that matters to us is that in SGML,
+# elements containing data don't have an end tag. Their data simply ends at the next tag.
+RE_TOKEN = re.compile(
+    r'<!--.*?-->|<[?!][^>]*>|<(/?)([^\s/>]+)[^>]*?(/?)>|[^<]+',
+    re.DOTALL
+)
+RE_REFERENCE = re.compile(r'&(?:#([0-9]+)|([a-zA-Z][-.a-zA-Z0-9]*));?')
+ENTITIES = {'lt': '<', 'gt': '>', 'amp': '&', 'quot': '"', 'apos': '\''}
+
+def iter_tokens(infile):
+    """Yields regexp matches for each tag and data chunk in ``infile``.
+
+    We read ``infile`` in chunks and never hold more than one of them in memory. A token can't
+    span two chunks: we keep whatever follows the last ``<`` of a chunk for the next one.
+    """
+    pending = ''
+    while True:
+        chunk = infile.read(CHUNK_SIZE)
+        text = pending + chunk
+        end = text.rfind('<') if chunk else len(text)
+        if end <= 0 and chunk:
+            end = len(text) if end < 0 else 0
+        yield from RE_TOKEN.finditer(text, 0, end)
+        pending = text[end:]
+        if not chunk:
+            return
+
+def unescape(data):
+    def repl(match):
+        charref, entityref = match.groups()
+        if charref is not None:
+            codepoint = int(charref)
+            return chr(codepoint) if codepoint <= 127 else match.group(0)
+        return ENTITIES.get(entityref, match.group(0))
+
+    if '&' not in data:
+        return data
+    return RE_REFERENCE.sub(repl, data)
+
+class OFXParser:
+    """Streams through the OFX tags of a file and feeds what it finds to ``loader``.
+
+    Tags are dispatched to our ``start_<tag>`` and ``end_<tag>`` methods. The data following a
+    start tag is given to the ``data_handler`` that the start method sets, if any, when we reach
+    the next tag.
+    """
+    def __init__(self, loader):
         self.loader = loader
         self.data = ''
         self.data_handler = None
-        self.accounts_only = accounts_only
+        self.account_info = None
+        self.transaction_info = None
+        self._methods = {}
 
     # --- Helper methods
 
     def flush_data(self):
         if self.data_handler:
-            self.data_handler(self.data.strip())
+            self.data_handler(unescape(self.data.strip()))
             self.data_handler = None
         self.data = ''
 
-    # --- Global hooks
-
-    def handle_starttag(self, tag, method, attributes):
-        self.flush_data()
-        super().handle_starttag(tag, method, attributes)
-
-    def handle_endtag(self, tag, method):
+    def get_method(self, name):
+        try:
+            return self._methods[name]
+        except KeyError:
+            result = self._methods[name] = getattr(self, name, None)
+            return result
+
+    # --- Public
+
+    def parse(self, infile):
+        get_method = self.get_method
+        for match in iter_tokens(infile):
+            closing, tag, selfclosing = match.groups()
+            if tag is None:
+                text = match.group(0)
+                if self.data_handler and not text.startswith('<'):
+                    self.data += text
+                continue
+            if self.data_handler is not None:
+                self.flush_data()
+            tag = tag.lower()
+            if not closing:
+                method = get_method('start_' + tag)
+                if method is not None:
+                    method()
+            if closing or selfclosing:
+                method = get_method('end_' + tag)
+                if method is not None:
+                    method()
         self.flush_data()
-        super().handle_endtag(tag, method)
-
-    def unknown_starttag(self, tag, attributes):
-        self.flush_data()
-
-    def unknown_endtag(self, tag):
-        self.flush_data()
-
-    def handle_data(self, data):
-        self.data += data
 
     # --- Account tags
 
-    def start_stmtrs(self, attributes):
+    def start_stmtrs(self):
         self.loader.start_account()
         self.account_info = self.loader.account_info
     start_ccstmtrs = start_stmtrs
 
     def end_stmtrs(self):
         a = self.account_info
+        if a is None:
+            return
         if hasattr(a, 'ofx_bank_id') and hasattr(a, 'ofx_acct_id'):
             ofx_branch_id = getattr(a, 'ofx_branch_id', '')
             a.reference = '|'.join([a.ofx_bank_id, ofx_branch_id, a.ofx_acct_id])
         self.loader.flush_account()
+        self.account_info = None
+    end_ccstmtrs = end_stmtrs
 
-    def start_curdef(self, attributes):
-        self.data_handler = self.handle_curdef
+    def start_curdef(self):
+        if self.account_info is not None:
+            self.data_handler = self.handle_curdef
 
     def handle_curdef(self, data):
         self.account_info.currency = data
 
-    def start_bankid(self, attributes):
-        self.data_handler = self.handle_bankid
+    def start_bankid(self):
+        if self.account_info is not None:
+            self.data_handler = self.handle_bankid
 
     def handle_bankid(self, data):
         self.account_info.ofx_bank_id = data
 
-    def start_branchid(self, attributes):
-        self.data_handler = self.handle_branchid
+    def start_branchid(self):
+        if self.account_info is not None:
+            self.data_handler = self.handle_branchid
 
     def handle_branchid(self, data):
         self.account_info.ofx_branch_id = data
 
-    def start_acctid(self, attributes):
-        self.data_handler = self.handle_acctid
+    def start_acctid(self):
+        if self.account_info is not None:
+            self.data_handler = self.handle_acctid
 
     def handle_acctid(self, data):
         self.account_info.ofx_acct_id = data
@@ -89,48 +156,40 @@ class OFXParser(SGMLParser):
 
     # --- Entry tags
 
-    def start_stmttrn(self, attributes):
-        if self.accounts_only:
-            return
+    def start_stmttrn(self):
         self.loader.start_transaction()
         self.transaction_info = self.loader.transaction_info
 
     def end_stmttrn(self):
-        if self.accounts_only:
-            return
-        self.loader.flush_transaction()
+        self.transaction_info = None
 
-    def start_fitid(self, attributes):
-        self.data_handler = self.handle_fitid
+    def start_fitid(self):
+        if self.transaction_info is not None:
+            self.data_handler = self.handle_fitid
 
     def handle_fitid(self, data):
-        if self.accounts_only:
-            return
         self.transaction_info.reference = data
 
-    def start_name(self, attributes):
-        self.data_handler = self.handle_name
+    def start_name(self):
+        if self.transaction_info is not None:
+            self.data_handler = self.handle_name
 
     def handle_name(self, data):
-        if self.accounts_only:
-            return
         self.transaction_info.description = data
 
-    def start_dtposted(self, attributes):
-        self.data_handler = self.handle_dtposted
+    def start_dtposted(self):
+        if self.transaction_info is not None:
+            self.data_handler = self.handle_dtposted
 
     def handle_dtposted(self, data):
-        if self.accounts_only:
-            return
-        self.transaction_info.date = base.parse_date_str(
-            data[:8], Loader.NATIVE_DATE_FORMAT)
+        # Dates are parsed in bulk when we load the transactions of the statement.
+        self.transaction_info.date = data[:8]
 
-    def start_trnamt(self, attributes):
-        self.data_handler = self.handle_trnamt
+    def start_trnamt(self):
+        if self.transaction_info is not None:
+            self.data_handler = self.handle_trnamt
 
     def handle_trnamt(self, data):
-        if self.accounts_only:
-            return
         self.transaction_info.amount = data
 
 
@@ -143,6 +202,9 @@ class Loader(base.Loader):
         super().__init__(*args, **kwargs)
         self.account_info = AccountInfo()
         self.transaction_info = base.TransactionInfo()
+        # Transactions of the statement we're reading. We only load them once we've read the
+        # whole statement, when we know everything about its account.
+        self.statement_transactions = []
 
     def _parse(self, infile):
         # First line is OFXHEADER (section 2.2.1)
@@ -152,26 +214,21 @@ class Loader(base.Loader):
         line = line.strip()
         if line != 'OFXHEADER:100' and not line.startswith('<?OFX'):
             raise FileFormatError()
-        self.lines = list(infile)
+        # We load everything in a single pass while we stream through the file. The rest of the
+        # header, if any, is data outside of any tag and is ignored by the parser.
+        OFXParser(self).parse(infile)
+        self.flush_account()
 
     def _load(self):
-        is_header = lambda line: not line.startswith('<')
-        parser = OFXParser(self, accounts_only=True)
-        for line in dropwhile(is_header, self.lines):
-            parser.feed(line)
-        parser.close()
-        parser = OFXParser(self)
-        for line in dropwhile(is_header, self.lines):
-            parser.feed(line)
-        parser.close()
+        # Everything has already been loaded while streaming through the file in _parse().
+        pass
 
     def start_account(self):
         self.flush_account() # Implicit
 
     def flush_account(self):
-        self.flush_transaction()
-        if self.account_info.is_valid():
-            info = self.account_info
+        info = self.account_info
+        if info.is_valid():
             account_type = base.get_account_type(info.type)
             account_currency = self.get_currency(info.currency)
             account = self.accounts.find(info.name)
@@ -186,20 +243,21 @@ class Loader(base.Loader):
                 account.change(groupname=info.group)
             account.change(
                 reference=info.reference, account_number=info.account_number)
+        txninfos = self.statement_transactions
+        dates = base.parse_dates(
+            [txninfo.date or '' for txninfo in txninfos], self.NATIVE_DATE_FORMAT)
+        for txninfo, date in zip(txninfos, dates):
+            txninfo.date = date
+            if txninfo.account is None and info.name:
+                txninfo.account = info.name
+            if txninfo.is_valid():
+                self.transactions.add(txninfo.load(self.accounts))
+        self.statement_transactions = []
         self.account_info = AccountInfo()
 
     def start_transaction(self):
-        self.flush_transaction() # Implicit
-
-    def flush_transaction(self):
-        """If called between a start_account and flush_account call, ACCOUNT is automatically set"""
-        info = self.transaction_info
-        if info.account is None and self.account_info and self.account_info.name:
-            info.account = self.account_info.name
-        if info.is_valid():
-            transaction = info.load(self.accounts)
-            self.transactions.add(transaction)
         self.transaction_info = base.TransactionInfo()
+        self.statement_transactions.append(self.transaction_info)
 
 class AccountInfo:
     def __init__(self):
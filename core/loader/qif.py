@@ -6,9 +6,8 @@
 
 import logging
 import re
+from bisect import bisect_right
 from collections import namedtuple, defaultdict
-from itertools import groupby, combinations
-from operator import attrgetter
 
 from core.util import first, stripfalse
 
@@ -115,6 +114,7 @@ class Loader(base.Loader):
         self.parsing_date_format = self.guess_date_format(str_dates)
         if self.parsing_date_format is None:
             raise FileFormatError()
+        self.str2date = dict(zip(str_dates, base.parse_dates(str_dates, self.parsing_date_format)))
         self.blocks = blocks
         self.autoswitch_blocks = autoswitch_blocks
 
@@ -186,10 +186,11 @@ class Loader(base.Loader):
                             amount = re_not_amount.sub('', data)
                         seen_split_fields.add(header)
                     elif header == 'D':
-                        try:
-                            info.date = base.parse_date_str(data, self.parsing_date_format)
-                        except ValueError:
-                            pass
+                        date = self.str2date.get(data)
+                        if date is None:
+                            [date] = base.parse_dates([data], self.parsing_date_format)
+                        if date is not None:
+                            info.date = date
                     elif header == 'M':
                         info.description = data
                     elif header == 'P':
@@ -240,22 +241,32 @@ class Loader(base.Loader):
             transfer_splits = [s for s in txn.splits if s.account_name in self.seen_account_names]
             return len(transfer_splits) >= 2
 
-        txn2matches = defaultdict(list)
         # Only process txns which are transfer txns. Others are irrelevant to duplicate matching.
+        # We want the highest split count to end up as the "main" matched txn in txn2matches so
+        # that we're sure that we don't end up with the wrong split count. In some QIFs, a
+        # 3-splits txn can be matched to an incomplete 2-splits txn.
+        # See test_quicken_split_duplicate.
         transfer_txns = [txn for txn in self.transactions if is_transfer_transaction(txn)]
-        for _, txns in groupby(transfer_txns, key=attrgetter('date')):
-            # We want the highest split count to end up as the "main" matched txn in txn2matches so
-            # that we're sure that we don't end up with the wrong split count. In some QIFs, a
-            # 3-splits txn can be matched to an incomplete 2-splits txn.
-            # See test_quicken_split_duplicate.
-            txns = sorted(txns, key=lambda txn: len(txn.splits), reverse=True)
-            for txn1, txn2 in combinations(txns, 2):
-                splits1 = {(s.account_name, s.amount) for s in txn1.splits}
-                splits2 = {(s.account_name, s.amount) for s in txn2.splits}
-                # If any of the splits' account *and* amount are the same, we have a match
-                if splits1 & splits2:
-                    matches = txn2matches[txn1]
-                    matches.append(txn2)
+        transfer_txns.sort(key=lambda txn: (txn.date, -len(txn.splits)))
+        # If any of the splits' date, account *and* amount are the same, we have a match. We index
+        # the position of txns in transfer_txns by these keys so that we don't have to compare
+        # each txn with all other txns of the same date. A txn can only be matched with txns that
+        # come after it.
+        txn2keys = [
+            {(txn.date, s.account_name, s.amount) for s in txn.splits} for txn in transfer_txns
+        ]
+        key2indexes = defaultdict(list)
+        for index, keys in enumerate(txn2keys):
+            for key in keys:
+                key2indexes[key].append(index)
+        txn2matches = {}
+        for index, (txn, keys) in enumerate(zip(transfer_txns, txn2keys)):
+            match_indexes = set()
+            for key in keys:
+                indexes = key2indexes[key]
+                match_indexes.update(indexes[bisect_right(indexes, index):])
+            if match_indexes:
+                txn2matches[txn] = [transfer_txns[i] for i in sorted(match_indexes)]
         toremove = set()
         # Here, we sort by match length to make sure that description matching (the
         # ``match.sort()`` line a few lines below) has all the opportunities it needs to actually
@@ -0,0 +1,161 @@
+# Copyright 2019 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+# A snapshot is a binary copy of a native document that we keep in our cache folder. Loading it
+# is much faster than loading the XML document because it skips XML parsing as well as date and
+# amount parsing. Its content is the same as what the native loader would produce from the XML
+# document it was made from, so it can transparently be used instead of it, as long as it's fresh,
+# that is, as long as the content of the document still has the hash we made the snapshot from.
+#
+# Small documents load fast enough from XML, so we only make snapshots of documents of at least
+# SNAPSHOT_MIN_SIZE bytes.
+#
+# The snapshot is a marshal'ed dict. Transactions and splits are stored in columns, dates as
+# ordinals in arrays and amounts as raw values in arrays.
+
+import datetime
+import hashlib
+import marshal
+import os.path as op
+from array import array
+from functools import partial
+
+from ..exception import FileFormatError
+from ..model._ccore import Transaction, amount_from_raw
+from ..model.budget import Budget
+from ..model.recurrence import Recurrence, Spawn
+from ..const import AccountType
+from . import base, native
+
+SNAPSHOT_VERSION = 2
+SNAPSHOT_MIN_SIZE = 1024 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def snapshot_path(cache_path, filename):
+    """Returns the path of the snapshot for native document ``filename``."""
+    key = hashlib.sha1(op.abspath(filename).encode('utf-8')).hexdigest()
+    return op.join(cache_path, 'snapshots', key + '.snapshot')
+
+def source_signature(filename):
+    """Returns a hash of the content of ``filename``."""
+    digest = hashlib.sha1()
+    with open(filename, 'rb') as fp:
+        for chunk in iter(partial(fp.read, HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def ord2date(ordinal):
+    return datetime.date.fromordinal(ordinal) if ordinal else None
+
+class Loader(native.Loader):
+    """Loads a snapshot made from the native document ``source``.
+
+    ``parse()`` raises ``FileFormatError`` if the snapshot doesn't exist or isn't fresh.
+    """
+    FILE_OPEN_MODE = 'rb'
+
+    def __init__(self, default_currency, source, **kwargs):
+        super().__init__(default_currency, **kwargs)
+        self.source = source
+        self.data = None
+
+    def _parse(self, infile):
+        try:
+            data = marshal.load(infile)
+            fresh = data['version'] == SNAPSHOT_VERSION and \
+                data['source'] == source_signature(self.source)
+        except (EOFError, ValueError, TypeError, KeyError, OSError):
+            raise FileFormatError()
+        if not fresh:
+            raise FileFormatError()
+        self.data = data
+
+    def _load(self):
+        data = self.data
+        self.document_id = data['document_id']
+        self.properties.update(data['properties'])
+        accounts = self.accounts
+        cols = data['accounts']
+        for name, currency, type, group, reference, account_number, inactive, notes in zip(
+                cols['name'], cols['currency'], cols['type'], cols['group'], cols['reference'],
+                cols['account_number'], cols['inactive'], cols['notes']):
+            account = accounts.create(
+                name, self.get_currency(currency), base.get_account_type(type))
+            account.change(
+                groupname=group, reference=reference,
+                account_number=account_number, inactive=bool(inactive), notes=notes)
+        txns = self._read_transactions(data['transactions'], data['splits'])
+        for txn in txns[:data['transaction_count']]:
+            self.transactions.add(txn)
+        for repeat_type, repeat_every, stop_date, ref, exceptions, changes in data['schedules']:
+            recurrence = Recurrence(txns[ref], repeat_type, repeat_every)
+            recurrence.stop_date = ord2date(stop_date)
+            for date, index in exceptions:
+                date = ord2date(date)
+                if index >= 0:
+                    exception = txns[index]
+                    spawn = Spawn(recurrence, exception, date, exception.date)
+                    recurrence.date2exception[date] = spawn
+                else:
+                    recurrence.delete_at(date)
+            for date, index in changes:
+                date = ord2date(date)
+                change = txns[index]
+                spawn = Spawn(recurrence, change, date, change.date)
+                recurrence.date2globalchange[date] = spawn
+            self.schedules.append(recurrence)
+        budgets = data['budgets']
+        if budgets['items']:
+            start_date = ord2date(budgets['start_date'])
+            if start_date:
+                self.budgets.start_date = start_date
+            self.budgets.repeat_type = budgets['repeat_type']
+            if budgets['repeat_every']:
+                self.budgets.repeat_every = budgets['repeat_every']
+        for account_name, amount_val, amount_currency, notes in budgets['items']:
+            account = accounts.find(account_name)
+            if account is None:
+                continue
+            budget = Budget(account, amount_from_raw(amount_val, amount_currency))
+            budget.notes = notes
+            self.budgets.append(budget)
+
+    # --- Private
+    def _read_transactions(self, cols, split_cols):
+        accounts = self.accounts
+        split_iter = zip(
+            split_cols['account'], array('q', split_cols['amount']), split_cols['currency'],
+            split_cols['memo'], split_cols['reference'],
+            array('i', split_cols['reconciliation_date']))
+        result = []
+        for date, description, payee, checkno, notes, mtime, splitcount in zip(
+                array('i', cols['date']), cols['description'], cols['payee'], cols['checkno'],
+                cols['notes'], array('q', cols['mtime']), array('i', cols['splitcount'])):
+            date = ord2date(date)
+            txn = Transaction(1, date, description, payee, checkno, None, None)
+            txn.notes = notes
+            txn.mtime = mtime
+            for _ in range(splitcount):
+                accountname, amount_val, amount_currency, memo, reference, reconciliation_date = \
+                    next(split_iter)
+                amount = amount_from_raw(amount_val, amount_currency)
+                auto_create_type = AccountType.Income if amount >= 0 else AccountType.Expense
+                account = base.get_account(accounts, accountname, auto_create_type)
+                split = txn.new_split()
+                split.account = account
+                split.amount = amount
+                split.memo = memo
+                split.reference = reference
+                if account is None or not (not amount or amount.currency_code == account.currency):
+                    # fix #442: off-currency transactions shouldn't be reconciled
+                    split.reconciliation_date = None
+                else:
+                    split.reconciliation_date = ord2date(reconciliation_date)
+            txn.balance()
+            while len(txn.splits) < 2:
+                txn.new_split()
+            result.append(txn)
+        return result
@@ -6,10 +6,210 @@
 # which should be included with this package. The terms are also available at 
 # http://www.gnu.org/licenses/gpl-3.0.html
 
+from bisect import bisect_left, insort
+
 from core.util import dedupe
 
 from .sort import sort_string
 
+def _txn_recency(txn):
+    # Most recently modified first. Among txns modified at the same time, the last one first.
+    return (txn.mtime, txn.date, txn.position)
+
+class Recency:
+    """Keeps track of how recently each of our candidates was used.
+
+    A candidate is used by owners (transactions), each one with its own recency. The recency of a
+    candidate is the highest recency of its owners.
+    """
+    def __init__(self):
+        self._owners = {}
+        self._recency = {}
+
+    def __len__(self):
+        return len(self._recency)
+
+    # --- Protected
+    def _candidate_added(self, candidate):
+        pass
+
+    def _candidate_removed(self, candidate):
+        pass
+
+    # --- Public
+    def add(self, candidate, owner, recency):
+        owners = self._owners.get(candidate)
+        if owners is None:
+            owners = self._owners[candidate] = {}
+            self._recency[candidate] = recency
+            self._candidate_added(candidate)
+        elif recency > self._recency[candidate]:
+            self._recency[candidate] = recency
+        owners[owner] = recency
+
+    def remove(self, candidate, owner):
+        owners = self._owners[candidate]
+        recency = owners.pop(owner)
+        if not owners:
+            del self._owners[candidate]
+            del self._recency[candidate]
+            self._candidate_removed(candidate)
+        elif recency == self._recency[candidate]:
+            self._recency[candidate] = max(owners.values())
+
+    def ordered(self, candidates=None):
+        """Returns ``candidates`` (all of them by default), the most recently used first."""
+        if candidates is None:
+            candidates = self._recency
+        return sorted(candidates, key=self._recency.__getitem__, reverse=True)
+
+
+class Candidates(Recency):
+    """Completion candidate strings, indexed by their normalized form.
+
+    We keep our candidates sorted by :func:`.sort_string`, so completing a partial value is a
+    bisection followed by a scan of the matching candidates only.
+    """
+    def __init__(self):
+        Recency.__init__(self)
+        self._normalized = {}
+        self._sorted = []
+
+    @classmethod
+    def from_list(cls, candidates):
+        """Returns ``Candidates`` with ``candidates``, the most likely first."""
+        result = cls()
+        candidates = dedupe(c.strip() for c in candidates)
+        for index, candidate in enumerate(candidates):
+            if candidate:
+                result.add(candidate, None, -index)
+        return result
+
+    # --- Protected
+    def _candidate_added(self, candidate):
+        normalized = self._normalized[candidate] = sort_string(candidate)
+        insort(self._sorted, (normalized, candidate))
+
+    def _candidate_removed(self, candidate):
+        item = (self._normalized.pop(candidate), candidate)
+        del self._sorted[bisect_left(self._sorted, item)]
+
+    # --- Public
+    def all(self):
+        """Returns all candidates, the most likely first."""
+        return self.ordered()
+
+    def completions(self, partial):
+        """Returns candidates starting with ``partial``, the most likely first."""
+        partial = sort_string(partial)
+        sorted_ = self._sorted
+        index = bisect_left(sorted_, (partial, ''))
+        result = []
+        while index < len(sorted_) and sorted_[index][0].startswith(partial):
+            result.append(sorted_[index][1])
+            index += 1
+        return self.ordered(result)
+
+
+class CompletionIndex:
+    """Completion candidates for the descriptions, payees and accounts of ``transactions``.
+
+    Like :class:`.SearchIndex`, we're kept up to date through :meth:`add_action`. Transactions
+    touched by an action are re-indexed the next time we're asked for candidates, and a count
+    mismatch makes us re-index everything.
+
+    Accounts are indexed as objects, not as names, because they can be renamed without their
+    transactions being touched.
+    """
+    def __init__(self, transactions):
+        self._transactions = transactions
+        self.reset()
+
+    # --- Private
+    def _index(self, txn):
+        recency = _txn_recency(txn)
+        description = txn.description.strip()
+        payee = txn.payee.strip()
+        accounts = dedupe(s.account for s in txn.splits if s.account is not None)
+        self._txn2keys[txn] = (description, payee, accounts)
+        if description:
+            self._descriptions.add(description, txn, recency)
+        if payee:
+            self._payees.add(payee, txn, recency)
+        # The accounts of a txn come in the order of its splits.
+        for index, account in enumerate(accounts):
+            self._accounts.add(account, txn, recency + (-index, ))
+
+    def _unindex(self, txn):
+        keys = self._txn2keys.pop(txn, None)
+        if keys is None:
+            return
+        description, payee, accounts = keys
+        if description:
+            self._descriptions.remove(description, txn)
+        if payee:
+            self._payees.remove(payee, txn)
+        for account in accounts:
+            self._accounts.remove(account, txn)
+
+    def _rebuild(self):
+        self.reset()
+        for txn in self._transactions:
+            self._index(txn)
+        self._rebuild_needed = False
+
+    def _refresh(self):
+        if self._rebuild_needed:
+            self._rebuild()
+            return
+        if self._dirty:
+            for txn in self._dirty:
+                self._unindex(txn)
+            for txn in self._dirty:
+                if txn in self._transactions:
+                    self._index(txn)
+            self._dirty = set()
+        if len(self._txn2keys) != len(self._transactions):
+            self._rebuild()
+
+    # --- Public
+    def add_action(self, action):
+        """Records that transactions in ``action`` have been touched.
+
+        Call this whenever ``action`` is recorded, undone or redone.
+        """
+        self._dirty |= action.added_transactions
+        self._dirty |= action.changed_transactions
+        self._dirty |= action.deleted_transactions
+
+    def accounts(self):
+        """Returns active accounts used by transactions, the most recently used first."""
+        self._refresh()
+        return [a for a in self._accounts.ordered() if not a.inactive]
+
+    def descriptions(self):
+        """Returns :class:`Candidates` for transaction descriptions."""
+        self._refresh()
+        return self._descriptions
+
+    def payees(self):
+        """Returns :class:`Candidates` for transaction payees."""
+        self._refresh()
+        return self._payees
+
+    def reset(self):
+        """Forgets everything. The next call re-indexes all transactions.
+
+        Call this when the document is loaded or cleared.
+        """
+        self._txn2keys = {}
+        self._descriptions = Candidates()
+        self._payees = Candidates()
+        self._accounts = Recency()
+        self._dirty = set()
+        self._rebuild_needed = True
+
+
 class CompletionList:
     def __init__(self, partial, candidates):
         """Build a completion list.
@@ -119,6 +119,7 @@ class RatesDB:
         self._fetched_ranges = {} # a currency --> (start, end) map
 
     def _save_fetched_rates(self):
+        tosave = []
         while True:
             try:
                 rates, currency, fetch_start, fetch_end = self._fetched_values.get_nowait()
@@ -127,11 +128,11 @@ class RatesDB:
                     if not rate:
                         logging.debug("Empty rate for %s. Skipping", rate_date)
                         continue
-                    logging.debug("Saving rate %2.2f for %s", rate, rate_date)
-                    self.set_CAD_value(rate_date, currency, rate)
-                logging.debug("Finished saving rates for currency %s", currency)
+                    tosave.append((rate_date, currency, rate))
             except Empty:
                 break
+        if tosave:
+            self.set_CAD_values(tosave)
 
     def clear_cache(self):
         self._cache = {}
@@ -170,6 +171,15 @@ class RatesDB:
         self.clear_cache()
         _ccore.currency_set_CAD_value(date, currency_code, value)
 
+    def set_CAD_values(self, rates):
+        """Sets multiple daily values in CAD at once.
+
+        ``rates`` is a list of ``(date, currency_code, value)``. They're all written in a single
+        transaction.
+        """
+        self.clear_cache()
+        _ccore.currency_set_CAD_values(rates)
+
     def register_rate_provider(self, rate_provider):
         """Adds `rate_provider` to the list of providers supported by this DB.
 
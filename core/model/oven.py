@@ -55,7 +55,7 @@ class Oven:
         if until_date > self._cooked_until:
             self.cook(self._cooked_until, until_date)
 
-    def cook(self, from_date=None, until_date=None):
+    def cook(self, from_date=None, until_date=None, affected_accounts=None):
         """Cooks raw data into :attr:`transactions`.
 
         :param from_date: when set, saves calculation time by re-using existing cooked transactions.
@@ -64,6 +64,11 @@ class Oven:
                            cooking. If we don't, we might end up in an infinite loop. If not set,
                            will be the date of the transaction with the highest date.
         :type until_date: ``datetime.date``
+        :param affected_accounts: when set, saves calculation time by only re-cooking entries of
+                                  these accounts. Other accounts keep their entries (and running
+                                  balances) as they are. Accounts affected by spawns are always
+                                  re-cooked because spawns are re-created on each cook.
+        :type affected_accounts: set of :class:`.Account`
         """
         # Determine from/until dates
         if from_date is None:
@@ -77,18 +82,9 @@ class Oven:
                     rdate = split.reconciliation_date
                     if rdate is not None and rdate >= from_date:
                         from_date = min(from_date, txn.date)
-        self._transactions.sort() # needed in case until_date is None
         if until_date is None:
             until_date = self._transactions.last().date if self._transactions else from_date
-        # Clear old cooked data
-        for account in self._accounts:
-            entries = self._accounts.entries_for_account(account)
-            entries.clear(from_date)
-        if from_date == date.min:
-            self.transactions = []
-        else:
-            self.transactions = [t for t in self.transactions if t.date < from_date]
-        # Cook
+        # Spawn
         if self._scheduled is not None:
             spawns = flatten(recurrence.get_spawns(until_date) for recurrence in self._scheduled)
             spawns += self._budget_spawns(until_date, spawns)
@@ -104,7 +100,33 @@ class Oven:
         # XXX now that budget's base date is the start date, isn't this untrue?
         tocook = [t for t in txns if from_date <= t.date]
         tocook.sort(key=attrgetter('date'))
-        oven_cook_txns(self._accounts, tocook)
+        # Determine which accounts to re-cook
+        if affected_accounts is None:
+            dirty = None
+            toclear = self._accounts
+        else:
+            # Entries can't outlive the spawns they wrap, so accounts affected by old spawns and
+            # new spawns are always dirty.
+            dirty = set(affected_accounts)
+            for txn in reversed(self.transactions):
+                if txn.date < from_date:
+                    break
+                if txn.is_spawn:
+                    dirty |= txn.affected_accounts()
+            for spawn in spawns:
+                if spawn.date >= from_date:
+                    dirty |= spawn.affected_accounts()
+            toclear = [a for a in self._accounts if a in dirty]
+        # Clear old cooked data
+        for account in toclear:
+            entries = self._accounts.entries_for_account(account)
+            entries.clear(from_date)
+        if from_date == date.min:
+            self.transactions = []
+        else:
+            self.transactions = [t for t in self.transactions if t.date < from_date]
+        # Cook
+        oven_cook_txns(self._accounts, tocook, dirty)
         self.transactions += tocook
         self._cooked_until = until_date
 
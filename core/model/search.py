@@ -0,0 +1,206 @@
+# Copyright 2019 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+from collections import defaultdict
+
+from .transaction import txn_matches, txns_matching
+
+TEXT_FIELDS = ('description', 'payee', 'memo')
+
+def trigrams(s):
+    return {s[i:i+3] for i in range(len(s) - 2)}
+
+def amount_key(amount):
+    # Same value as the one txn_matches() compares.
+    return abs(float(amount)) if amount else 0
+
+def _discard(postings, key, txn):
+    txns = postings[key]
+    txns.discard(txn)
+    if not txns:
+        del postings[key]
+
+class SearchIndex:
+    """Inverted index of ``transactions`` that answers :func:`.txn_matches` queries.
+
+    Texts are lowercased and split into tokens. For each text field, we map tokens to the
+    transactions using them. A query string without whitespace is in a text if and only if it's
+    in one of its tokens, so we only have to look for it in our vocabulary, which we index by
+    trigrams. Checknos, amounts and accounts are mapped to transactions directly.
+
+    We're kept up to date through :meth:`add_action`, which marks the transactions of an action
+    as dirty. Dirty transactions are re-indexed the next time we answer a query. Transactions that
+    are added without an action, such as materialized spawns, make our count wrong. When that
+    happens, we re-index everything.
+
+    Transactions that aren't in ``transactions``, spawns for example, aren't indexed. We fall back
+    to :func:`.txn_matches` for them.
+    """
+    def __init__(self, transactions):
+        self._transactions = transactions
+        self.reset()
+
+    # --- Private
+    def _index(self, txn):
+        splits = txn.splits
+        keys = (
+            set(txn.description.lower().split()),
+            set(txn.payee.lower().split()),
+            {token for split in splits for token in split.memo.lower().split()},
+            txn.checkno.lower(),
+            {amount_key(split.amount) for split in splits},
+            {split.account for split in splits if split.account is not None},
+        )
+        self._txn2keys[txn] = keys
+        vocabulary = self._vocabulary
+        for postings, tokens in zip(self._text_postings, keys):
+            for token in tokens:
+                if token not in vocabulary:
+                    vocabulary.add(token)
+                    for trigram in trigrams(token):
+                        self._trigram2tokens[trigram].add(token)
+                postings[token].add(txn)
+        self._checkno2txns[keys[3]].add(txn)
+        for amount in keys[4]:
+            self._amount2txns[amount].add(txn)
+        for account in keys[5]:
+            self._account2txns[account].add(txn)
+
+    def _unindex(self, txn):
+        keys = self._txn2keys.pop(txn, None)
+        if keys is None:
+            return
+        for postings, tokens in zip(self._text_postings, keys):
+            for token in tokens:
+                _discard(postings, token, txn)
+        checkno, amounts, accounts = keys[3:]
+        _discard(self._checkno2txns, checkno, txn)
+        for amount in amounts:
+            _discard(self._amount2txns, amount, txn)
+        for account in accounts:
+            _discard(self._account2txns, account, txn)
+
+    def _rebuild(self):
+        self.reset()
+        for txn in self._transactions:
+            self._index(txn)
+        self._rebuild_needed = False
+
+    def _refresh(self):
+        if self._rebuild_needed:
+            self._rebuild()
+            return
+        if self._dirty:
+            # We unindex everything before indexing anything. This way, a txn that was deleted
+            # can't take something away from a txn that was added.
+            for txn in self._dirty:
+                self._unindex(txn)
+            for txn in self._dirty:
+                if txn in self._transactions:
+                    self._index(txn)
+            self._dirty = set()
+        if len(self._txn2keys) != len(self._transactions):
+            self._rebuild()
+
+    def _tokens_containing(self, s):
+        if len(s) < 3:
+            return [token for token in self._vocabulary if s in token]
+        candidates = None
+        for trigram in trigrams(s):
+            tokens = self._trigram2tokens.get(trigram)
+            if not tokens:
+                return []
+            if candidates is None:
+                candidates = set(tokens)
+            else:
+                candidates &= tokens
+        return [token for token in candidates if s in token]
+
+    def _text_matches(self, field, query_string):
+        # Returns the indexed txns having ``query_string`` in their ``field``.
+        pieces = query_string.split()
+        postings = self._postings[field]
+        result = None
+        for piece in pieces:
+            txns = set()
+            for token in self._tokens_containing(piece):
+                txns |= postings.get(token, set())
+            result = txns if result is None else result & txns
+            if not result:
+                return result
+        if result is None:
+            result = set(self._txn2keys)
+        if len(pieces) > 1 or query_string != query_string.strip():
+            # Pieces being in tokens doesn't mean that the whole query string, whitespace
+            # included, is in the text.
+            result = set(txns_matching(result, {field: query_string}))
+        return result
+
+    def _matches(self, query):
+        result = set()
+        for field in TEXT_FIELDS:
+            query_string = query.get(field)
+            if query_string is not None:
+                result |= self._text_matches(field, query_string)
+        query_checkno = query.get('checkno')
+        if query_checkno is not None:
+            result |= self._checkno2txns.get(query_checkno, set())
+        query_amount = query.get('amount')
+        if query_amount is not None:
+            result |= self._amount2txns.get(amount_key(query_amount), set())
+        query_account = query.get('account')
+        if query_account is not None:
+            for account, txns in self._account2txns.items():
+                if account.name.lower() in query_account:
+                    result |= txns
+        query_group = query.get('group')
+        if query_group is not None:
+            for account, txns in self._account2txns.items():
+                if account.groupname and account.groupname.lower() in query_group:
+                    result |= txns
+        return result
+
+    # --- Public
+    def add_action(self, action):
+        """Records that transactions in ``action`` have been touched.
+
+        Call this whenever ``action`` is recorded, undone or redone.
+        """
+        self._dirty |= action.added_transactions
+        self._dirty |= action.changed_transactions
+        self._dirty |= action.deleted_transactions
+
+    def matcher(self, query):
+        """Returns a function telling whether a transaction matches ``query``.
+
+        The function returns the same thing as :func:`.txn_matches` would.
+        """
+        self._refresh()
+        matches = self._matches(query)
+        indexed = self._txn2keys
+
+        def txn_is_matching(txn):
+            if txn in indexed:
+                return txn in matches
+            return txn_matches(txn, query)
+
+        return txn_is_matching
+
+    def reset(self):
+        """Forgets everything. The next query re-indexes all transactions.
+
+        Call this when the document is loaded or cleared.
+        """
+        self._txn2keys = {}
+        self._postings = {field: defaultdict(set) for field in TEXT_FIELDS}
+        self._text_postings = [self._postings[field] for field in TEXT_FIELDS]
+        self._vocabulary = set()
+        self._trigram2tokens = defaultdict(set)
+        self._checkno2txns = defaultdict(set)
+        self._amount2txns = defaultdict(set)
+        self._account2txns = defaultdict(set)
+        self._dirty = set()
+        self._rebuild_needed = True
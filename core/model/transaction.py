@@ -4,7 +4,7 @@
 # which should be included with this package. The terms are also available at
 # http://www.gnu.org/licenses/gpl-3.0.html
 
-from ._ccore import Transaction as _Transaction
+from ._ccore import Transaction as _Transaction, txns_matching
 
 def txn_matches(txn, query):
     """Return whether ``txn`` is matching ``query``.
@@ -24,43 +24,11 @@ def txn_matches(txn, query):
     :class:`.Amount`.
 
     Returns true if any criteria matches, false otherwise.
+
+    To filter many transactions or entries at once, use :func:`txns_matching`, which takes the
+    same query.
     """
-    query_description = query.get('description')
-    if query_description is not None:
-        if query_description in txn.description.lower():
-            return True
-    query_payee = query.get('payee')
-    if query_payee is not None:
-        if query_payee in txn.payee.lower():
-            return True
-    query_checkno = query.get('checkno')
-    if query_checkno is not None:
-        if query_checkno == txn.checkno.lower():
-            return True
-    query_memo = query.get('memo')
-    if query_memo is not None:
-        for split in txn.splits:
-            if query_memo in split.memo.lower():
-                return True
-    query_amount = query.get('amount')
-    if query_amount is not None:
-        query_value = float(query_amount) if query_amount else 0
-        for split in txn.splits:
-            split_value = float(split.amount) if split.amount else 0
-            if query_value == abs(split_value):
-                return True
-    query_account = query.get('account')
-    if query_account is not None:
-        for split in txn.splits:
-            if split.account and split.account.name.lower() in query_account:
-                return True
-    query_group = query.get('group')
-    if query_group is not None:
-        for split in txn.splits:
-            if split.account and split.account.groupname and \
-                    split.account.groupname.lower() in query_group:
-                return True
-    return False
+    return bool(txns_matching((txn, ), query))
 
 def splitted_splits(splits):
     """Returns `splits` separated in two groups ("froms" and "tos").
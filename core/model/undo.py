@@ -96,9 +96,12 @@ class Undoer:
     How it works is that it holds a list of :class:`.Action` and a pointer to our current action
     (most of the time, it's the last action). When we undo or redo an action, we use the information
     we has stored in our action and make proper modifications, then move our action index.
+
+    If ``on_action`` is given, it's called with every action we record, undo or redo.
     """
-    def __init__(self, accounts, transactions, scheduled, budgets):
+    def __init__(self, accounts, transactions, scheduled, budgets, on_action=None):
         self._actions = []
+        self._on_action = on_action
         self._accounts = accounts
         self._transactions = transactions
         self._scheduled = scheduled
@@ -188,6 +191,8 @@ class Undoer:
             self._actions = self._actions[:self._index + 1]
         self._actions.append(action)
         self._index = -1
+        if self._on_action is not None:
+            self._on_action(action)
 
     def undo(self):
         """Undo the next action to be undone.
@@ -209,8 +214,9 @@ class Undoer:
             action.added_accounts, action.added_schedules, action.added_budgets
         )
         self._do_changes(action)
-        self._transactions.clear_cache()
         self._index -= 1
+        if self._on_action is not None:
+            self._on_action(action)
 
     def redo(self):
         """Redo the next action to be redone.
@@ -231,8 +237,9 @@ class Undoer:
             action.deleted_budgets
         )
         self._do_changes(action)
-        self._transactions.clear_cache()
         self._index += 1
+        if self._on_action is not None:
+            self._on_action(action)
 
     # --- Properties
     @property
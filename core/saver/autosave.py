@@ -0,0 +1,91 @@
+# Copyright 2019 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+import logging
+import threading
+from types import SimpleNamespace
+
+from ..model.budget import BudgetList
+
+def copy_for_save(document_id, properties, accounts, transactions, schedules, budgets):
+    """Returns a copy of the arguments that can be given to the native saver after the filename.
+
+    The copy doesn't share anything mutable with the document, so it can be saved in another
+    thread while the document keeps being modified.
+    """
+    accounts = [
+        SimpleNamespace(
+            name=a.name, currency=a.currency, type=a.type, groupname=a.groupname,
+            reference=a.reference, account_number=a.account_number, inactive=a.inactive,
+            notes=a.notes)
+        for a in accounts
+    ]
+    transactions = [txn.replicate() for txn in transactions]
+
+    def copy_spawns(date2spawn):
+        return {d: (s.replicate() if s is not None else None) for d, s in date2spawn.items()}
+
+    schedules = [
+        SimpleNamespace(
+            is_alive=True, repeat_type=s.repeat_type, repeat_every=s.repeat_every,
+            stop_date=s.stop_date, ref=s.ref.replicate(),
+            date2globalchange=copy_spawns(s.date2globalchange),
+            date2exception=copy_spawns(s.date2exception))
+        for s in schedules if s.is_alive
+    ]
+    budgets_copy = BudgetList(
+        SimpleNamespace(
+            account=SimpleNamespace(name=b.account.name), amount=b.amount, notes=b.notes)
+        for b in budgets
+    )
+    budgets_copy.start_date = budgets.start_date
+    budgets_copy.repeat_type = budgets.repeat_type
+    budgets_copy.repeat_every = budgets.repeat_every
+    return document_id, dict(properties), accounts, transactions, schedules, budgets_copy
+
+class AutoSaver:
+    """Runs ``func`` in a worker thread.
+
+    Only one call runs at once. Calls submitted while another one is running are coalesced: only
+    the last one is performed once the running one is done.
+
+    Arguments given to :meth:`submit` must not be modified by anyone else after the call.
+    """
+    def __init__(self, func):
+        self._func = func
+        self._lock = threading.Lock()
+        self._pending = None
+        self._thread = None
+
+    def _run(self):
+        while True:
+            with self._lock:
+                args = self._pending
+                self._pending = None
+                if args is None:
+                    self._thread = None
+                    return
+            try:
+                self._func(*args)
+            except Exception:
+                logging.warning("Autosave failed", exc_info=True)
+
+    def submit(self, *args):
+        """Schedules a call to ``func`` with ``args`` as arguments."""
+        with self._lock:
+            self._pending = args
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def wait(self):
+        """Waits until all submitted calls are done."""
+        while True:
+            with self._lock:
+                thread = self._thread
+            if thread is None:
+                return
+            thread.join()
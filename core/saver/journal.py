@@ -0,0 +1,225 @@
+# Copyright 2019 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+# See core.loader.journal for a description of the journal format.
+
+import os
+import os.path as op
+import shutil
+import uuid
+
+from core.util import ensure_folder
+
+from ..loader.journal import SNAPSHOT_NAME, JOURNAL_NAME, generations, journal_folders
+from .autosave import AutoSaver, copy_for_save
+from .native import XMLWriter
+
+JOURNAL_COMPACT_EVERY = 100 # Number of journal entries after which we write a new snapshot.
+
+def write_snapshot(
+        path, generation, session, document_id, properties, accounts, transactions, schedules,
+        budgets, account_ids, transaction_ids):
+    """Writes snapshot ``generation`` in ``path`` and removes the files it makes obsolete.
+
+    ``account_ids`` and ``transaction_ids`` are the ids of ``accounts`` and ``transactions``, in
+    the same order.
+    """
+    ensure_folder(path)
+    filename = op.join(path, SNAPSHOT_NAME.format(generation))
+    tmpfilename = filename + '.tmp'
+    with open(tmpfilename, 'wt', encoding='utf-8') as fp:
+        writer = XMLWriter(fp.write)
+        writer.start_element('entry', [('session', session), ('document_id', document_id)])
+        writer.write_properties(properties)
+        for account, id in zip(accounts, account_ids):
+            writer.write_account(account, id)
+        for transaction, id in zip(transactions, transaction_ids):
+            writer.write_transaction(transaction, id)
+        write_schedules(writer, schedules)
+        write_budgets(writer, budgets)
+        writer.end_element('entry')
+        writer.write('\n')
+    os.replace(tmpfilename, filename)
+    snapshots, journals = generations(path)
+    for g in snapshots:
+        if g < generation:
+            os.remove(op.join(path, SNAPSHOT_NAME.format(g)))
+    for g in journals:
+        if g < generation:
+            os.remove(op.join(path, JOURNAL_NAME.format(g)))
+
+def prune_journals(cache_path, keep):
+    """Removes all journal folders in ``cache_path`` but the ``keep`` most recent ones."""
+    for path in journal_folders(cache_path)[keep:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+def write_schedules(writer, schedules):
+    writer.start_element('schedules', [])
+    for recurrence in schedules:
+        if recurrence.is_alive:
+            writer.write_recurrence(recurrence)
+    writer.end_element('schedules')
+
+def write_budgets(writer, budgets):
+    writer.start_element('budgets', [])
+    for budget in budgets:
+        writer.write_budget(budget, budgets)
+    writer.end_element('budgets')
+
+class Journal:
+    """Append-only journal of the changes made to a document.
+
+    Changes are fed from the :class:`.Action` instances that the :class:`.Undoer` records, undoes
+    and redoes, through :meth:`add_action`. They are only written, as a single journal entry, on
+    :meth:`flush`. Every ``compact_every`` entries, we take a copy of the whole document and write
+    it as a new snapshot in a worker thread. Then, we start a new journal.
+
+    Snapshots can be coalesced by the worker, or not make it to the disk at all if we crash. This
+    is why everything we touched is always written to the current journal before we compact it:
+    if its snapshot is missing, we can still recover from the previous snapshot and its journals.
+
+    Actions are often recorded before their changes are applied, so we never look at the state of
+    the objects they contain before :meth:`flush`. What an entry contains for a touched account or
+    transaction depends on whether it's still in the document at that time.
+
+    Transactions are compared against the whole transaction list on each flush. Some of them are
+    added or removed outside of any action (materialized spawns, for example) and changing one of
+    them can move its siblings of the same date, so we also write those that are new or that moved
+    and delete those that are gone. Transactions are always written as the list's own instance,
+    which isn't necessarily the one the action holds.
+
+    Accounts and transactions are identified by ids that stay the same across snapshots.
+    """
+    def __init__(self, compact_every=JOURNAL_COMPACT_EVERY):
+        self.compact_every = compact_every
+        self._worker = AutoSaver(write_snapshot)
+        self.reset()
+
+    # --- Private
+    def _clear_touched(self):
+        self._touched_accounts = set()
+        self._touched_transactions = set()
+        self._schedules_touched = False
+        self._budgets_touched = False
+
+    def _compact(self, path, document_id, properties, accounts, transactions, schedules, budgets):
+        if path != self.path:
+            self.path = path
+            snapshots, journals = generations(path)
+            self._generation = max(snapshots + journals, default=0)
+            self._session = uuid.uuid4().hex
+        self._generation += 1
+        # We forget about the ids of objects that aren't in the document anymore. If they come
+        # back, they get a new id.
+        self._account_ids = {a: self._get_id(self._account_ids, a) for a in accounts}
+        self._transaction_ids = {t: self._get_id(self._transaction_ids, t) for t in transactions}
+        self._positions = {id: t.position for t, id in self._transaction_ids.items()}
+        args = copy_for_save(document_id, properties, accounts, transactions, schedules, budgets)
+        self._worker.submit(
+            path, self._generation, self._session, *args,
+            list(self._account_ids.values()), list(self._transaction_ids.values())
+        )
+        self._entry_count = 0
+        self._clear_touched()
+
+    def _get_id(self, ids, obj):
+        result = ids.get(obj)
+        if result is None:
+            self._last_id += 1
+            result = ids[obj] = self._last_id
+        return result
+
+    def _write_entry(self, properties, accounts, transactions, schedules, budgets):
+        chunks = []
+        writer = XMLWriter(chunks.append)
+        writer.start_element('entry', [('session', self._session)])
+        writer.write_properties(properties)
+        deleted_accounts = []
+        for account in self._touched_accounts:
+            if accounts.find(account.name) == account:
+                writer.write_account(account, self._get_id(self._account_ids, account))
+            elif account in self._account_ids:
+                deleted_accounts.append(self._account_ids.pop(account))
+        touched = {transactions.find(txn) for txn in self._touched_transactions}
+        seen = set()
+        for txn in transactions:
+            id = self._transaction_ids.get(txn)
+            if id is None or txn in touched or self._positions[id] != txn.position:
+                id = self._get_id(self._transaction_ids, txn)
+                self._positions[id] = txn.position
+                writer.write_transaction(txn, id)
+            seen.add(id)
+        for txn, id in list(self._transaction_ids.items()):
+            if id not in seen:
+                del self._transaction_ids[txn]
+                del self._positions[id]
+                writer.start_element('delete-transaction', [('id', str(id))], empty=True)
+        for id in deleted_accounts:
+            writer.start_element('delete-account', [('id', str(id))], empty=True)
+        if self._schedules_touched:
+            write_schedules(writer, schedules)
+        if self._budgets_touched:
+            write_budgets(writer, budgets)
+        writer.end_element('entry')
+        writer.write('\n')
+        ensure_folder(self.path)
+        with open(op.join(self.path, JOURNAL_NAME.format(self._generation)), 'at',
+                  encoding='utf-8') as fp:
+            fp.write(''.join(chunks))
+        self._entry_count += 1
+        self._clear_touched()
+
+    # --- Public
+    def add_action(self, action):
+        """Records that objects in ``action`` have been touched.
+
+        Call this whenever ``action`` is recorded, undone or redone.
+        """
+        self._touched_accounts |= action.added_accounts
+        self._touched_accounts |= action.changed_accounts
+        self._touched_accounts |= action.deleted_accounts
+        self._touched_transactions |= action.added_transactions
+        self._touched_transactions |= action.changed_transactions
+        self._touched_transactions |= action.deleted_transactions
+        if action.added_schedules or action.changed_schedules or action.deleted_schedules:
+            self._schedules_touched = True
+        if action.added_budgets or action.changed_budgets or action.deleted_budgets:
+            self._budgets_touched = True
+
+    def flush(self, path, document_id, properties, accounts, transactions, schedules, budgets):
+        """Writes touched objects as a new entry in the journal in folder ``path``.
+
+        If we don't have a snapshot in ``path`` yet, we write a new snapshot instead. If it's time
+        for compaction, we write a new snapshot after the entry.
+        """
+        if path != self.path:
+            self._compact(path, document_id, properties, accounts, transactions, schedules, budgets)
+            return
+        self._write_entry(properties, accounts, transactions, schedules, budgets)
+        # If we missed an account that was added outside of an action, we can't trust our journal
+        # anymore and we compact it right away.
+        if self._entry_count >= self.compact_every or \
+                len(self._account_ids) != len(accounts):
+            self._compact(path, document_id, properties, accounts, transactions, schedules, budgets)
+
+    def reset(self):
+        """Forgets everything we know about the document.
+
+        Call this when the document is loaded or cleared. The next flush writes a new snapshot.
+        """
+        self.path = None
+        self._session = None
+        self._generation = 0
+        self._entry_count = 0
+        self._last_id = 0
+        self._account_ids = {}
+        self._transaction_ids = {}
+        self._positions = {}
+        self._clear_touched()
+
+    def wait(self):
+        """Waits until snapshots that are being written in the background are done."""
+        self._worker.wait()
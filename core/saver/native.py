@@ -4,107 +4,187 @@
 # which should be included with this package. The terms are also available at
 # http://www.gnu.org/licenses/gpl-3.0.html
 
+import os
 import os.path as op
-import xml.etree.cElementTree as ET
+import stat
+import tempfile
 
 from ..model._ccore import amount_format
 from core.util import remove_invalid_xml, ensure_folder
 
-def save(filename, document_id, properties, accounts, transactions, schedules, budgets):
-    def date2str(date):
-        return date.strftime('%Y-%m-%d')
-
-    def handle_newlines(s):
-        # etree doesn't correctly save newlines. In fields that allow it, we have to escape them so
-        # that we can restore them during load.
-        # XXX It seems like newer version of etree do escape newlines. When we use Python 3.2, we
-        # can probably remove this.
-        if not s:
-            return s
-        return s.replace('\n', '\\n')
-
-    def setattrib(attribs, attribname, value):
-        if value:
-            attribs[attribname] = value
-
-    def write_transaction_element(parent_element, transaction):
-        transaction_element = ET.SubElement(parent_element, 'transaction')
-        attrib = transaction_element.attrib
-        attrib['date'] = date2str(transaction.date)
-        setattrib(attrib, 'description', transaction.description)
-        setattrib(attrib, 'payee', transaction.payee)
-        setattrib(attrib, 'checkno', transaction.checkno)
-        setattrib(attrib, 'notes', handle_newlines(transaction.notes))
-        attrib['mtime'] = str(int(transaction.mtime))
-        for split in transaction.splits:
-            split_element = ET.SubElement(transaction_element, 'split')
-            attrib = split_element.attrib
-            attrib['account'] = split.account_name
-            attrib['amount'] = amount_format(split.amount)
-            setattrib(attrib, 'memo', split.memo)
-            setattrib(attrib, 'reference', split.reference)
-            if split.reconciliation_date is not None:
-                attrib['reconciliation_date'] = date2str(split.reconciliation_date)
-
-    root = ET.Element('moneyguru-file')
-    root.attrib['document_id'] = document_id
-    props_element = ET.SubElement(root, 'properties')
-    for name, value in properties.items():
-        value = str(value)
-        props_element.attrib[name] = value
-    for account in accounts:
-        account_element = ET.SubElement(root, 'account')
-        attrib = account_element.attrib
-        attrib['name'] = account.name
-        attrib['currency'] = account.currency
-        attrib['type'] = account.type
+# Same escaping as what ElementTree does for attribute values.
+ATTRIB_ESCAPES = str.maketrans({
+    '&': '&amp;',
+    '<': '&lt;',
+    '>': '&gt;',
+    '"': '&quot;',
+    '\r': '&#13;',
+    '\n': '&#10;',
+    '\t': '&#09;',
+})
+
+def date2str(date):
+    return date.strftime('%Y-%m-%d')
+
+def handle_newlines(s):
+    # etree doesn't correctly save newlines. In fields that allow it, we have to escape them so
+    # that we can restore them during load.
+    # XXX It seems like newer version of etree do escape newlines. When we use Python 3.2, we
+    # can probably remove this.
+    if not s:
+        return s
+    return s.replace('\n', '\\n')
+
+def setattrib(attribs, attribname, value):
+    if value:
+        attribs.append((attribname, value))
+
+class XMLWriter:
+    """Writes native document elements, as text, through ``write``.
+
+    We write the XML as we go instead of building an element tree first. The output is the same
+    as what ElementTree would produce for the same elements and attributes.
+
+    Elements that can be identified with an ``id`` (accounts and transactions) only get an ``id``
+    attribute when one is given. Native documents don't have them.
+    """
+    def __init__(self, write):
+        self.write = write
+
+    def start_element(self, tag, attribs, empty=False):
+        write = self.write
+        write('<' + tag)
+        for name, value in attribs:
+            write(' %s="%s"' % (name, remove_invalid_xml(value).translate(ATTRIB_ESCAPES)))
+        write(' />' if empty else '>')
+
+    def end_element(self, tag):
+        self.write('</' + tag + '>')
+
+    def write_properties(self, properties):
+        attribs = [(name, str(value)) for name, value in properties.items()]
+        self.start_element('properties', attribs, empty=True)
+
+    def write_account(self, account, id=None):
+        attribs = [('id', str(id))] if id is not None else []
+        attribs += [
+            ('name', account.name),
+            ('currency', account.currency),
+            ('type', account.type),
+        ]
         if account.groupname:
-            attrib['group'] = account.groupname
+            attribs.append(('group', account.groupname))
         if account.reference is not None:
-            attrib['reference'] = account.reference
+            attribs.append(('reference', account.reference))
         if account.account_number:
-            attrib['account_number'] = account.account_number
+            attribs.append(('account_number', account.account_number))
         if account.inactive:
-            attrib['inactive'] = 'y'
+            attribs.append(('inactive', 'y'))
         if account.notes:
-            attrib['notes'] = handle_newlines(account.notes)
-    for transaction in transactions:
-        write_transaction_element(root, transaction)
-    # the functionality of the line below is untested because it's an optimisation
-    scheduled = [s for s in schedules if s.is_alive]
-    for recurrence in scheduled:
-        recurrence_element = ET.SubElement(root, 'recurrence')
-        attrib = recurrence_element.attrib
-        attrib['type'] = recurrence.repeat_type
-        attrib['every'] = str(recurrence.repeat_every)
+            attribs.append(('notes', handle_newlines(account.notes)))
+        self.start_element('account', attribs, empty=True)
+
+    def write_transaction(self, transaction, id=None):
+        if id is not None:
+            attribs = [('id', str(id)), ('position', str(transaction.position))]
+        else:
+            attribs = []
+        attribs.append(('date', date2str(transaction.date)))
+        setattrib(attribs, 'description', transaction.description)
+        setattrib(attribs, 'payee', transaction.payee)
+        setattrib(attribs, 'checkno', transaction.checkno)
+        setattrib(attribs, 'notes', handle_newlines(transaction.notes))
+        attribs.append(('mtime', str(int(transaction.mtime))))
+        splits = transaction.splits
+        self.start_element('transaction', attribs, empty=not splits)
+        for split in splits:
+            attribs = [
+                ('account', split.account_name),
+                ('amount', amount_format(split.amount)),
+            ]
+            setattrib(attribs, 'memo', split.memo)
+            setattrib(attribs, 'reference', split.reference)
+            if split.reconciliation_date is not None:
+                attribs.append(('reconciliation_date', date2str(split.reconciliation_date)))
+            self.start_element('split', attribs, empty=True)
+        if splits:
+            self.end_element('transaction')
+
+    def write_recurrence(self, recurrence):
+        attribs = [
+            ('type', recurrence.repeat_type),
+            ('every', str(recurrence.repeat_every)),
+        ]
         if recurrence.stop_date is not None:
-            attrib['stop_date'] = date2str(recurrence.stop_date)
+            attribs.append(('stop_date', date2str(recurrence.stop_date)))
+        self.start_element('recurrence', attribs)
         for date, change in recurrence.date2globalchange.items():
-            change_element = ET.SubElement(recurrence_element, 'change')
-            change_element.attrib['date'] = date2str(date)
+            self.start_element('change', [('date', date2str(date))], empty=change is None)
             if change is not None:
-                write_transaction_element(change_element, change)
+                self.write_transaction(change)
+                self.end_element('change')
         for date, exception in recurrence.date2exception.items():
-            exception_element = ET.SubElement(recurrence_element, 'exception')
-            exception_element.attrib['date'] = date2str(date)
+            self.start_element('exception', [('date', date2str(date))], empty=exception is None)
             if exception is not None:
-                write_transaction_element(exception_element, exception)
-        write_transaction_element(recurrence_element, recurrence.ref)
-    for budget in budgets:
-        budget_element = ET.SubElement(root, 'budget')
-        attrib = budget_element.attrib
-        attrib['account'] = budget.account.name
-        attrib['type'] = budgets.repeat_type
-        attrib['every'] = str(budgets.repeat_every)
-        attrib['amount'] = amount_format(budget.amount)
-        attrib['notes'] = budget.notes
-        attrib['start_date'] = date2str(budgets.start_date)
-    for elem in root.iter():
-        attrib = elem.attrib
-        for key, value in attrib.items():
-            attrib[key] = remove_invalid_xml(value)
-    tree = ET.ElementTree(root)
+                self.write_transaction(exception)
+                self.end_element('exception')
+        self.write_transaction(recurrence.ref)
+        self.end_element('recurrence')
+
+    def write_budget(self, budget, budgets):
+        attribs = [
+            ('account', budget.account.name),
+            ('type', budgets.repeat_type),
+            ('every', str(budgets.repeat_every)),
+            ('amount', amount_format(budget.amount)),
+            ('notes', budget.notes),
+            ('start_date', date2str(budgets.start_date)),
+        ]
+        self.start_element('budget', attribs, empty=True)
+
+def save(filename, document_id, properties, accounts, transactions, schedules, budgets):
+    def write_document(writer):
+        writer.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        writer.start_element('moneyguru-file', [('document_id', document_id)])
+        writer.write_properties(properties)
+        for account in accounts:
+            writer.write_account(account)
+        for transaction in transactions:
+            writer.write_transaction(transaction)
+        # the functionality of the line below is untested because it's an optimisation
+        scheduled = [s for s in schedules if s.is_alive]
+        for recurrence in scheduled:
+            writer.write_recurrence(recurrence)
+        for budget in budgets:
+            writer.write_budget(budget, budgets)
+        writer.end_element('moneyguru-file')
+
+    # We write to a temporary file first so that a failed save never leaves a truncated document
+    # behind. If the document is a symlink, it's its target that we replace.
+    filename = op.realpath(filename)
     ensure_folder(op.dirname(filename))
-    fp = open(filename, 'wt', encoding='utf-8')
-    fp.write('<?xml version="1.0" encoding="utf-8"?>\n')
-    tree.write(fp, encoding='unicode')
+    fd, tmpfilename = tempfile.mkstemp(
+        dir=op.dirname(filename), prefix=op.basename(filename) + '.', suffix='.tmp')
+    try:
+        with open(fd, 'wt', encoding='utf-8') as fp:
+            write_document(XMLWriter(fp.write))
+        # Our temporary file is only readable by us. It gets the permissions and owner of the
+        # document it replaces, or the permissions that a new file would have.
+        try:
+            st = os.stat(filename)
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmpfilename, 0o666 & ~umask)
+        else:
+            os.chmod(tmpfilename, stat.S_IMODE(st.st_mode))
+            if hasattr(os, 'chown'):
+                try:
+                    os.chown(tmpfilename, st.st_uid, st.st_gid)
+                except OSError:
+                    pass # Only privileged users can give files away.
+        os.replace(tmpfilename, filename)
+    except Exception:
+        if op.exists(tmpfilename):
+            os.remove(tmpfilename)
+        raise
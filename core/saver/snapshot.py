@@ -0,0 +1,133 @@
+# Copyright 2019 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+# See core.loader.snapshot for what snapshots are about.
+
+import marshal
+import os
+import os.path as op
+from array import array
+
+from ..loader.snapshot import SNAPSHOT_VERSION
+from ..model._ccore import amount_raw
+from core.util import remove_invalid_xml, ensure_folder, tryint
+
+def save(
+        filename, signature, document_id, properties, accounts, transactions, schedules, budgets):
+    """Saves a snapshot of a native document into ``filename``.
+
+    ``signature`` is the :func:`.source_signature` of the native document. The document data must
+    be the same as what was saved in it. The values we store go through the same transformations
+    as they do when saved to and loaded from XML so that loading the snapshot is equivalent to
+    loading the native document.
+
+    The document data can come from :func:`.copy_for_save`.
+    """
+    def clean(s):
+        return remove_invalid_xml(s) if s else s
+
+    def clean_notes(s):
+        # See handle_newlines() in the native loader and saver.
+        return clean(s).replace('\\n', '\n') if s else s
+
+    txn_cols = {k: [] for k in ('description', 'payee', 'checkno', 'notes')}
+    txn_dates = array('i')
+    txn_mtimes = array('q')
+    txn_splitcounts = array('i')
+    split_cols = {k: [] for k in ('account', 'currency', 'memo', 'reference')}
+    split_amounts = array('q')
+    split_reconciliation_dates = array('i')
+
+    def add_transaction(txn):
+        txn_dates.append(txn.date.toordinal())
+        txn_cols['description'].append(clean(txn.description) or None)
+        txn_cols['payee'].append(clean(txn.payee) or None)
+        txn_cols['checkno'].append(clean(txn.checkno) or None)
+        txn_cols['notes'].append(clean_notes(txn.notes) or '')
+        txn_mtimes.append(int(txn.mtime))
+        txn_splitcounts.append(len(txn.splits))
+        for split in txn.splits:
+            split_cols['account'].append(clean(split.account_name) or None)
+            val, currency = amount_raw(split.amount)
+            split_amounts.append(val)
+            split_cols['currency'].append(currency)
+            split_cols['memo'].append(clean(split.memo) or '')
+            split_cols['reference'].append(clean(split.reference) or None)
+            rdate = split.reconciliation_date
+            split_reconciliation_dates.append(rdate.toordinal() if rdate is not None else 0)
+        return len(txn_dates) - 1
+
+    props = {}
+    for name, value in properties.items():
+        value = str(value)
+        if name != 'default_currency':
+            value = tryint(value, default=None)
+        if name and value is not None:
+            props[name] = value
+    account_cols = {k: [] for k in (
+        'name', 'currency', 'type', 'group', 'reference', 'account_number', 'inactive', 'notes')}
+    for account in accounts:
+        name = clean(account.name)
+        if not name:
+            continue
+        account_cols['name'].append(name)
+        account_cols['currency'].append(account.currency)
+        account_cols['type'].append(account.type)
+        account_cols['group'].append(clean(account.groupname) or None)
+        account_cols['reference'].append(clean(account.reference))
+        account_cols['account_number'].append(clean(account.account_number) or '')
+        account_cols['inactive'].append(bool(account.inactive))
+        account_cols['notes'].append(clean_notes(account.notes) or '')
+    for txn in transactions:
+        add_transaction(txn)
+    transaction_count = len(txn_dates)
+    schedule_rows = []
+    for recurrence in schedules:
+        if not recurrence.is_alive:
+            continue
+        exceptions = []
+        for date, exception in recurrence.date2exception.items():
+            index = add_transaction(exception) if exception is not None else -1
+            exceptions.append((date.toordinal(), index))
+        changes = []
+        for date, change in recurrence.date2globalchange.items():
+            if change is not None:
+                changes.append((date.toordinal(), add_transaction(change)))
+        stop_date = recurrence.stop_date.toordinal() if recurrence.stop_date is not None else 0
+        ref = add_transaction(recurrence.ref)
+        schedule_rows.append((
+            recurrence.repeat_type, recurrence.repeat_every, stop_date, ref,
+            exceptions, changes))
+    budget_rows = []
+    for budget in budgets:
+        val, currency = amount_raw(budget.amount)
+        budget_rows.append((clean(budget.account.name), val, currency, clean(budget.notes) or ''))
+    data = {
+        'version': SNAPSHOT_VERSION,
+        'source': signature,
+        'document_id': document_id,
+        'properties': props,
+        'accounts': account_cols,
+        'transaction_count': transaction_count,
+        'transactions': dict(
+            txn_cols, date=txn_dates.tobytes(), mtime=txn_mtimes.tobytes(),
+            splitcount=txn_splitcounts.tobytes()),
+        'splits': dict(
+            split_cols, amount=split_amounts.tobytes(),
+            reconciliation_date=split_reconciliation_dates.tobytes()),
+        'schedules': schedule_rows,
+        'budgets': {
+            'start_date': budgets.start_date.toordinal() if budgets.start_date else 0,
+            'repeat_type': budgets.repeat_type,
+            'repeat_every': budgets.repeat_every,
+            'items': budget_rows,
+        },
+    }
+    ensure_folder(op.dirname(filename))
+    tmpfilename = filename + '.tmp'
+    with open(tmpfilename, 'wb') as fp:
+        marshal.dump(data, fp)
+    os.replace(tmpfilename, filename)
@@ -561,6 +561,17 @@ def test_persistence_of_completion(app, tmpdir, monkeypatch):
     app.show_account()
     assert_completion_order_changed(app)
 
+@with_app(app_four_entries_with_description_and_category_collision)
+def test_completion_follows_delete_and_undo(app):
+    # Deleted transactions stop being completion candidates and come back, at the same place in
+    # the order, when the deletion is undone.
+    eq_(complete_etable(app, 'desc', 'description'), '2')
+    app.etable.select([3])
+    app.etable.delete()
+    eq_(complete_etable(app, 'desc', 'description'), '1')
+    app.mw.undo()
+    eq_(complete_etable(app, 'desc', 'description'), '2')
+
 # --- Account created through transaction table
 def app_account_created_through_transaction_table(monkeypatch):
     app = TestApp()
@@ -110,6 +110,20 @@ class TestSomeAssetsAndLiabilities:
         eq_(app.nwview.pie.pie1, expected)
         app.nwview.pie.view.check_gui_calls(['refresh'])
 
+    @with_app(do_setup)
+    def test_compute_in_parallel(self, app):
+        # Account values can be computed in worker threads. Results are the same.
+        app.app.report_worker_count = 4
+        app.bsheet.selected = app.bsheet.assets[0]
+        app.bsheet.toggle_excluded()
+        expected = [
+            ('a2 44.4%', 4, 0),
+            ('a4 33.3%', 3, 1),
+            ('a3 22.2%', 2, 2),
+        ]
+        eq_(app.nwview.pie.pie1, expected)
+        eq_(app.bsheet.assets.end, '9.00')
+
     @with_app(do_setup)
     def test_liabilities_pie(self, app):
         # the liability pie also works
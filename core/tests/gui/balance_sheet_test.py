@@ -14,6 +14,7 @@ from ..base import DocumentGUI, ApplicationGUI, TestApp, with_app, testdata
 from ...app import Application
 from ...document import Document
 from ...const import AccountType
+from ...gui.balance_sheet import BalanceSheet
 from ...model.date import MonthRange
 from ...model.currency import Currencies
 
@@ -530,6 +531,28 @@ def test_exclude_total_node(app):
     app.bsheet.toggle_excluded()
     assert not app.bsheet.assets[2].is_excluded
 
+@with_app(app_accounts_and_entries)
+def test_only_changed_accounts_are_recomputed(app, monkeypatch):
+    # Account nodes are re-used when their account's entries didn't change. Totals still follow.
+    computed = []
+    compute_account_node = BalanceSheet._compute_account_node
+
+    def fake_compute_account_node(self, node):
+        computed.append(node.account.name)
+        compute_account_node(self, node)
+
+    monkeypatch.setattr(BalanceSheet, '_compute_account_node', fake_compute_account_node)
+    app.bsheet.selected = app.bsheet.assets[1] # Account 2
+    app.show_account()
+    app.add_entry('14/01/2008', 'Entry 5', transfer='income', increase='5.00')
+    app.show_nwview()
+    assert 'Account 1' not in computed
+    assert 'Account 2' in computed
+    eq_(app.bsheet.assets[0].end, '250.00')
+    eq_(app.bsheet.assets[1].end, '85.00')
+    eq_(app.bsheet.assets.end, '335.00')
+    eq_(app.bsheet.net_worth.end, '335.00')
+
 @with_app(app_accounts_and_entries)
 def test_exclude_type(app):
     # Excluding a type toggles exclusion for all accounts of that type
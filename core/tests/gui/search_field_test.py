@@ -88,6 +88,16 @@ def test_query_checkno_partial(app):
     app.sfield.text = '4'
     eq_(app.ttable.row_count, 0)
 
+@with_app(app_two_transactions)
+def test_query_checkno_after_partial(app):
+    # Appending characters to a query doesn't always narrow it. Check numbers have to match
+    # exactly, so we don't only look in the results of the previous query.
+    app.sfield.text = '42'
+    eq_(app.ttable.row_count, 0)
+    app.sfield.text = '42a'
+    eq_(app.ttable.row_count, 1)
+    eq_(app.ttable[0].description, 'a Deposit')
+
 @with_app(app_two_transactions)
 def test_query_from(app):
     # The 'from' account can be queried.
@@ -148,6 +158,31 @@ def test_targeted_checkno_search(app):
     eq_(app.ttable.row_count, 1)
     eq_(app.ttable[0].description, 'foo1')
 
+@with_app(app_ambiguity_in_txn_values)
+def test_targeted_search_with_surrounding_whitespace(app):
+    # Whitespace around a targeted query string is part of what we look for.
+    app.sfield.text = 'description: foo1'
+    eq_(app.ttable.row_count, 0)
+    app.sfield.text = 'description:foo1'
+    eq_(app.ttable.row_count, 1)
+
+@with_app(app_ambiguity_in_txn_values)
+def test_narrow_targeted_search(app):
+    # Narrowing a query, then widening it back, gives the right results in both transaction and
+    # entry tables.
+    app.sfield.text = 'description:foo'
+    eq_(app.ttable.row_count, 2)
+    app.sfield.text = 'description:foo2'
+    eq_(app.ttable.row_count, 1)
+    eq_(app.ttable[0].description, 'foo2')
+    app.sfield.text = 'description:foo'
+    eq_(app.ttable.row_count, 2)
+    app.show_account('foo5')
+    eq_(app.etable_count(), 2)
+    app.sfield.text = 'description:foo1'
+    eq_(app.etable_count(), 1)
+    eq_(app.etable[0].description, 'foo1')
+
 # --- Three txns with zero amount
 def app_three_txns_with_zero_amount():
     app = TestApp()
@@ -224,6 +259,36 @@ def test_modify_transaction_out_of_filter(app):
     eq_(app.ttable.row_count, 1)
     eq_(app.ttable.selected_indexes, [0])
 
+@with_app(app_three_txns_filtered)
+def test_modify_transaction_into_filter_then_undo(app):
+    # The search index follows changes made to transactions, including undo and redo.
+    app.sfield.text = 'foo'
+    app.ttable.select([0])
+    row = app.ttable.selected_row
+    row.description = 'foo baz'
+    app.ttable.save_edits()
+    app.sfield.text = 'o ba'
+    eq_(app.ttable.row_count, 1)
+    eq_(app.ttable[0].description, 'foo baz')
+    app.mw.undo()
+    app.sfield.text = 'ba'
+    eq_(app.ttable.row_count, 2)
+    app.mw.redo()
+    app.sfield.text = 'ba'
+    eq_(app.ttable.row_count, 3)
+
+@with_app(app_two_transactions)
+def test_query_renamed_account(app):
+    # Renamed accounts are found under their new name.
+    app.show_nwview()
+    app.bsheet.selected = app.bsheet.assets[0]
+    app.bsheet.selected.name = 'Renamed'
+    app.bsheet.save_edits()
+    app.sfield.text = 'account:renamed'
+    eq_(app.ttable.row_count, 2)
+    app.sfield.text = 'account:desjardins'
+    eq_(app.ttable.row_count, 0)
+
 # --- Grouped and ungrouped txns
 def app_grouped_and_ungrouped_txns():
     app = TestApp()
@@ -51,6 +51,40 @@ def test_import_invalid_qif(app):
     with raises(FileFormatError):
         app.mw.parse_file_for_import(filename)
 
+@with_app(TestApp)
+def test_import_several_files(app):
+    # parse_files_for_import() shows all accounts of all files in a single import window.
+    iwin = app.mw.parse_files_for_import([
+        testdata.filepath('qif', 'checkbook.qif'), testdata.filepath('ofx', 'desjardins.ofx')
+    ])
+    pane_names = [pane.name for pane in iwin.panes]
+    assert 'Account 1' in pane_names
+    assert '815-30219-11111-EOP' in pane_names
+    while iwin.panes:
+        iwin.import_selected_pane()
+    account_names = app.account_names()
+    assert 'Account 1' in account_names
+    assert '815-30219-11111-EOP' in account_names
+
+@with_app(TestApp)
+def test_import_several_files_with_unimportable_ones(app):
+    # Files that can't be part of a batch import are skipped and the user is told about them.
+    filenames = [
+        testdata.filepath('qif', 'checkbook.qif'), testdata.filepath('csv', 'fortis.csv'),
+        testdata.filepath('zerofile'),
+    ]
+    iwin = app.mw.parse_files_for_import(filenames)
+    assert iwin.panes
+    [msg] = app.mw.view.messages
+    assert 'fortis.csv' in msg
+    assert 'zerofile' in msg
+
+@with_app(TestApp)
+def test_import_several_files_with_nothing_to_import(app):
+    filenames = [testdata.filepath('csv', 'fortis.csv'), testdata.filepath('zerofile')]
+    with raises(FileFormatError):
+        app.mw.parse_files_for_import(filenames)
+
 @with_app(TestApp)
 def test_import_no_balance_account(app):
     # When importing a moneyguru file with transactions and accounts, but no balance account, we
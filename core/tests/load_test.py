@@ -4,12 +4,14 @@
 # which should be included with this package. The terms are also available at
 # http://www.gnu.org/licenses/gpl-3.0.html
 
+import os
 from datetime import date
 
 from .testutil import eq_
 
 from ..document import ScheduleScope
 from ..const import AccountType
+from ..loader import snapshot
 from ..model.date import MonthRange
 from .base import compare_apps, TestApp, with_app, testdata
 
@@ -482,6 +484,107 @@ def test_save_load(tmpdir, monkeypatch):
     app = app_account_and_group()
     check(app)
 
+def test_save_load_snapshot(tmpdir, monkeypatch):
+    # When we have a cache path, loading a document creates a snapshot of it and the next load of
+    # that same document comes from that snapshot. The result is the same.
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_MIN_SIZE', 0)
+
+    def check(app):
+        filepath = str(tmpdir.join('foo.xml'))
+        appargs = {'cache_path': str(tmpdir.join('cache'))}
+        app.doc.save_to_xml(filepath)
+        app.mw.close()
+        for i in range(2):
+            newapp = TestApp(appargs=appargs)
+            newapp.mw.load_from_xml(filepath)
+            newapp.doc.wait_for_snapshot()
+            assert newapp.doc._load_snapshot(filepath) is not None
+            newapp.drsel.set_date_range(app.doc.date_range)
+            newapp.doc._cook()
+            compare_apps(app.doc, newapp.doc)
+
+    app = app_transaction_with_memos()
+    check(app)
+
+    app = app_budget_with_all_fields_set()
+    check(app)
+
+    app = app_account_with_apanel_attrs()
+    check(app)
+
+    app = app_schedule_with_global_change(monkeypatch)
+    check(app)
+
+    app = app_schedule_with_local_deletion(monkeypatch)
+    check(app)
+
+def test_stale_snapshot_isnt_used(tmpdir, monkeypatch):
+    # When a document changes after its snapshot was made, we don't use the snapshot.
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_MIN_SIZE', 0)
+    filepath = str(tmpdir.join('foo.xml'))
+    appargs = {'cache_path': str(tmpdir.join('cache'))}
+    app = TestApp(appargs=appargs)
+    app.add_account('foo')
+    app.doc.save_to_xml(filepath)
+    app.mw.close()
+    assert app.doc._load_snapshot(filepath) is not None
+    other = TestApp()
+    other.add_account('foobar')
+    other.doc.save_to_xml(filepath)
+    assert app.doc._load_snapshot(filepath) is None
+    newapp = TestApp(appargs=appargs)
+    newapp.mw.load_from_xml(filepath)
+    newapp.show_nwview()
+    eq_(newapp.bsheet.assets[0].name, 'foobar')
+
+def test_snapshot_of_same_size_and_mtime_isnt_used(tmpdir, monkeypatch):
+    # A document that keeps its size and modification time when it changes still makes its
+    # snapshot stale.
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_MIN_SIZE', 0)
+    filepath = str(tmpdir.join('foo.xml'))
+    appargs = {'cache_path': str(tmpdir.join('cache'))}
+    app = TestApp(appargs=appargs)
+    app.add_account('foo')
+    app.doc.save_to_xml(filepath)
+    app.mw.close()
+    st = os.stat(filepath)
+    with open(filepath, 'rt', encoding='utf-8') as fp:
+        contents = fp.read()
+    with open(filepath, 'wt', encoding='utf-8') as fp:
+        fp.write(contents.replace('name="foo"', 'name="bar"'))
+    os.utime(filepath, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert app.doc._load_snapshot(filepath) is None
+
+def test_save_keeps_symlink_and_mode(tmpdir):
+    # Saving over a symlink replaces its target, which keeps its permissions. No temporary file is
+    # left behind.
+    target = tmpdir.join('real').join('foo.xml')
+    link = str(tmpdir.join('foo.xml'))
+    app = TestApp()
+    app.add_account('foo')
+    app.doc.save_to_xml(str(target))
+    os.chmod(str(target), 0o640)
+    os.symlink(str(target), link)
+    app.add_account('bar')
+    app.doc.save_to_xml(link)
+    assert os.path.islink(link)
+    eq_(os.stat(str(target)).st_mode & 0o777, 0o640)
+    eq_(os.listdir(str(tmpdir.join('real'))), ['foo.xml'])
+    newapp = TestApp()
+    newapp.mw.load_from_xml(link)
+    newapp.show_nwview()
+    eq_(newapp.bsheet.assets.children_count, 4)
+
+def test_no_snapshot_of_small_documents(tmpdir):
+    # Small documents load fast enough without snapshots.
+    filepath = str(tmpdir.join('foo.xml'))
+    appargs = {'cache_path': str(tmpdir.join('cache'))}
+    app = TestApp(appargs=appargs)
+    app.add_account('foo')
+    app.doc.save_to_xml(filepath)
+    app.mw.close()
+    assert app.doc._load_snapshot(filepath) is None
+
 def test_save_load_qif(tmpdir):
     def check(app):
         filepath = str(tmpdir.join('foo.qif'))
@@ -0,0 +1,24 @@
+# Copyright 2019 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+from datetime import date
+
+from ..testutil import eq_
+
+from ...loader import base
+
+def test_guess_date_format_checks_all_dates():
+    # Even if the first dates could be parsed with the first format, that format isn't picked if
+    # another date can't be parsed with it.
+    str_dates = ['01/02/2019'] * 100 + ['03/04/2019', '25/04/2019']
+    eq_(base.guess_date_format(str_dates, base.DATE_FORMATS), '%d/%m/%Y')
+    eq_(base.guess_date_format(['foo', '01/02/2019'], base.DATE_FORMATS), None)
+    eq_(base.guess_date_format([], base.DATE_FORMATS), None)
+
+def test_parse_dates():
+    # Strings that can't be parsed give None and years before 1900 are fixed.
+    result = base.parse_dates(['2019-01-02', 'foo', '2019-01-02', '0019-01-03'], '%Y-%m-%d')
+    eq_(result, [date(2019, 1, 2), None, date(2019, 1, 2), date(2019, 1, 3)])
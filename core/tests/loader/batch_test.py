@@ -0,0 +1,46 @@
+# Copyright 2019 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+from ..testutil import eq_
+from ..base import testdata
+
+from ...loader import batch, csv, native, ofx, qif
+
+def test_guess_loader_classes():
+    # The loader for the format we sniff from the header comes first, followed by all others.
+    def first(*path):
+        return batch.guess_loader_classes(testdata.filepath(*path))[0]
+
+    eq_(first('moneyguru', 'simple.moneyguru'), native.Loader)
+    eq_(first('ofx', 'desjardins.ofx'), ofx.Loader)
+    eq_(first('qif', 'checkbook.qif'), qif.Loader)
+    eq_(batch.guess_loader_classes(testdata.filepath('csv', 'fortis.csv')), batch.LOADER_CLASSES)
+    eq_(len(batch.guess_loader_classes(testdata.filepath('qif', 'checkbook.qif'))), 4)
+
+def test_parse_files(tmpdir):
+    # Loaders are returned in the same order as the files, with None for files we can't read.
+    filenames = [
+        testdata.filepath('ofx', 'desjardins.ofx'), testdata.filepath('zerofile'),
+        testdata.filepath('csv', 'fortis.csv'), testdata.filepath('qif', 'checkbook.qif'),
+        testdata.filepath('moneyguru', 'simple.moneyguru'), str(tmpdir.join('doesnotexist')),
+    ]
+    loaders = batch.parse_files(filenames, 'USD')
+    eq_(
+        [type(loader) for loader in loaders],
+        [ofx.Loader, type(None), csv.Loader, qif.Loader, native.Loader, type(None)]
+    )
+    # Loaders parsed from the bytes that the workers read load like any other.
+    native_loader = loaders[4]
+    native_loader.load()
+    assert len(native_loader.accounts) > 0
+    csv_loader = loaders[2]
+    csv_loader.columns = [
+        csv.CsvField.Reference, csv.CsvField.Date, None, csv.CsvField.Amount,
+        csv.CsvField.Currency, csv.CsvField.Description
+    ]
+    csv_loader.lines = csv_loader.lines[1:]
+    csv_loader.load()
+    eq_(len(csv_loader.transactions), 18)
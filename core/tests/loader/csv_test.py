@@ -6,8 +6,12 @@
 
 from datetime import date
 
+from pytest import raises
+
 from ..testutil import eq_
 
+from ...exception import FileLoadError
+from ...loader import csv as csvloader
 from ...loader.csv import Loader, CsvField
 from ..base import testdata, Amount
 
@@ -38,6 +42,63 @@ def test_fortis():
     eq_(txn.splits[1].amount, Amount(100, 'EUR'))
     eq_(txn.splits[0].reference, '2008-0069')
 
+def test_fortis_streamed_after_preview(monkeypatch):
+    # Only the first lines of the file are kept in memory, for preview. Lines after that are read
+    # at load time. Lines at the end of the file can still be excluded.
+    monkeypatch.setattr(csvloader, 'PREVIEW_LINE_COUNT', 5)
+    monkeypatch.setattr(csvloader, 'LOAD_CHUNK_LINE_COUNT', 4)
+    loader = Loader('USD')
+    loader.parse(testdata.filepath('csv/fortis.csv'))
+    eq_(len(loader.lines), 5)
+    assert loader.has_more_lines
+    loader.columns = [CsvField.Reference, CsvField.Date, None, CsvField.Amount, CsvField.Currency,
+        CsvField.Description]
+    loader.lines = loader.lines[1:]
+    loader.excluded_last_lines = {-1}
+    loader.load()
+    transactions = loader.transactions
+    eq_(len(transactions), 17)
+    # The last line of the file has been excluded
+    eq_(transactions.first().date, date(2008, 12, 5))
+    references = {txn.splits[0].reference for txn in transactions}
+    assert '2008-0070' in references
+    assert '2008-0069' not in references
+
+def test_streamed_lines_are_checked(monkeypatch, tmpdir):
+    # Lines after the preview take part in date format guessing and their amounts are checked
+    # before we load anything.
+    monkeypatch.setattr(csvloader, 'PREVIEW_LINE_COUNT', 2)
+    monkeypatch.setattr(csvloader, 'LOAD_CHUNK_LINE_COUNT', 2)
+    filepath = str(tmpdir.join('foo.csv'))
+    with open(filepath, 'wt') as fp:
+        fp.write('01/02/2008,foo,1\n02/02/2008,bar,2\n13/02/2008,baz,3\n')
+    loader = Loader('USD')
+    loader.parse(filepath)
+    loader.columns = [CsvField.Date, CsvField.Description, CsvField.Amount]
+    loader.load()
+    eq_(loader.parsing_date_format, '%d/%m/%Y')
+    eq_(len(loader.transactions), 3)
+    eq_(loader.transactions.first().date, date(2008, 2, 1))
+    with open(filepath, 'at') as fp:
+        fp.write('14/02/2008,qux,notanamount\n')
+    loader = Loader('USD')
+    loader.parse(filepath)
+    loader.columns = [CsvField.Date, CsvField.Description, CsvField.Amount]
+    with raises(FileLoadError):
+        loader.load()
+
+def test_utf16_read_in_chunks(monkeypatch, tmpdir):
+    # Files are decoded chunk by chunk. Chunks can end in the middle of a character or between the
+    # \r and \n of a line separator, and UTF-16 without BOM is read as little-endian.
+    monkeypatch.setattr(csvloader, 'READ_CHUNK_SIZE', 3)
+    filepath = str(tmpdir.join('foo.csv'))
+    with open(filepath, 'wb') as fp:
+        fp.write('01/02/2008,foo,1\r\n02/02/2008,bàr,2\r\n'.encode('utf-16-le'))
+    loader = Loader('USD')
+    loader.parse(filepath)
+    loader.rescan('utf-16')
+    eq_(loader.lines, [['01/02/2008', 'foo', '1'], ['02/02/2008', 'bàr', '2']])
+
 def test_fortis_with_r_linesep():
     # Same as fortis.csv, but instead of being \r\n lineseps, it's \r only
     loader = Loader('USD')
@@ -6,17 +6,20 @@
 
 import sys
 import os
+import os.path as op
 from datetime import date
 
 from pytest import raises
 from .testutil import eq_
 
-from .base import ApplicationGUI, TestApp, with_app, testdata
+from .base import ApplicationGUI, TestApp, with_app, testdata, compare_apps
 from ..app import Application
 from ..document import Document, AUTOSAVE_BUFFER_COUNT
+from ..saver.journal import JOURNAL_COMPACT_EVERY
 from ..exception import FileFormatError
 from ..gui.entry_table import EntryTable
 from ..loader import base, native
+from ..loader.journal import journal_path
 from ..const import AccountType
 from ..model.date import MonthRange, QuarterRange, YearRange
 
@@ -178,16 +181,151 @@ def test_autosave(app, tmpdir):
     app.app.autosave_interval = 2
     app.doc.step = 0
     app.add_entry() # no autosave
+    app.doc.wait_for_autosave()
     eq_(len(os.listdir(cache_path)), 0)
     app.add_entry() # autosave!
-    eq_(len(os.listdir(cache_path)), 1)
+    app.doc.wait_for_autosave()
+    [document_id] = os.listdir(op.join(cache_path, 'journal'))
+    path = journal_path(cache_path, document_id)
+    # Our first autosave is a full snapshot
+    eq_(os.listdir(path), ['snapshot1.xml'])
     assert app.doc.is_dirty
+    app.add_entry() # no autosave
+    app.add_entry() # autosave!
+    # Subsequent autosaves are appended to the journal
+    eq_(sorted(os.listdir(path)), ['journal1.log', 'snapshot1.xml'])
     app.app.autosave_interval = 1
-    # test that the autosave file rotation works
-    for i in range(AUTOSAVE_BUFFER_COUNT):
+    # test that the journal is compacted
+    for i in range(JOURNAL_COMPACT_EVERY):
         app.add_entry() # triggers autosave
-    # The extra autosave file has been deleted
-    eq_(len(os.listdir(cache_path)), AUTOSAVE_BUFFER_COUNT)
+    app.doc.wait_for_autosave()
+    # The journal and the snapshot it was based on have been deleted
+    assert 'snapshot1.xml' not in os.listdir(path)
+    assert 'journal1.log' not in os.listdir(path)
+
+@with_app(app_one_empty_account_range_on_october_2007)
+def test_autosave_is_a_copy(app, tmpdir):
+    # Snapshots are written in the background with a copy of the document taken at the time of the
+    # autosave. Later changes don't end up in the snapshot.
+    cache_path = str(tmpdir)
+    app.app.cache_path = cache_path
+    app.app.autosave_interval = 1
+    app.add_entry(description='foo') # autosave!
+    app.app.autosave_interval = 0
+    app.add_entry(description='bar')
+    app.doc.wait_for_autosave()
+    [document_id] = os.listdir(op.join(cache_path, 'journal'))
+    newapp = TestApp()
+    newapp.doc.load_from_journal(journal_path(cache_path, document_id))
+    eq_([txn.description for txn in newapp.doc.transactions], ['foo'])
+
+@with_app(app_one_empty_account_range_on_october_2007)
+def test_recover_from_journal(app, tmpdir):
+    # Recovering a document from its journal replays the changes made after the last snapshot.
+    cache_path = str(tmpdir)
+    app.app.cache_path = cache_path
+    app.app.autosave_interval = 1
+    app.add_entry(description='foo') # snapshot
+    app.add_entry(description='bar', transfer='other')
+    app.add_entry(description='baz')
+    app.etable.select([0])
+    app.etable[0].description = 'changed'
+    app.etable.save_edits()
+    app.etable.select([2])
+    app.mw.delete_item()
+    app.mw.undo()
+    app.mw.undo()
+    app.mw.redo()
+    app.doc.wait_for_autosave()
+    [document_id] = os.listdir(op.join(cache_path, 'journal'))
+    newapp = TestApp()
+    newapp.doc.load_from_journal(journal_path(cache_path, document_id))
+    compare_apps(app.doc, newapp.doc)
+    assert newapp.doc.is_dirty()
+
+@with_app(app_one_empty_account_range_on_october_2007)
+def test_recover_keeps_position(app, tmpdir):
+    # Transactions changed after the last snapshot keep their position among transactions of the
+    # same date.
+    cache_path = str(tmpdir)
+    app.app.cache_path = cache_path
+    app.app.autosave_interval = 1
+    app.add_entry('1/10/2007', description='first')
+    app.add_entry('1/10/2007', description='second') # journal entry
+    app.etable.select([0])
+    app.etable[0].description = 'changed'
+    app.etable.save_edits()
+    app.doc.wait_for_autosave()
+    [document_id] = os.listdir(op.join(cache_path, 'journal'))
+    newapp = TestApp()
+    newapp.doc.load_from_journal(journal_path(cache_path, document_id))
+    eq_([txn.description for txn in newapp.doc.transactions], ['changed', 'second'])
+
+@with_app(app_one_empty_account_range_on_october_2007)
+def test_recover_with_missing_snapshot(app, tmpdir, monkeypatch):
+    # Changes made before a compaction are written to the journal first. If the new snapshot never
+    # makes it to the disk, we recover from the previous one and its journals.
+    cache_path = str(tmpdir)
+    app.app.cache_path = cache_path
+    app.app.autosave_interval = 1
+    app.add_entry(description='foo') # snapshot
+    app.doc.wait_for_autosave()
+    app.doc._journal.compact_every = 2
+    monkeypatch.setattr(app.doc._journal._worker, 'submit', lambda *args: None)
+    app.add_entry(description='bar')
+    app.add_entry(description='baz') # compaction, but no snapshot
+    app.add_entry(description='qux')
+    [document_id] = os.listdir(op.join(cache_path, 'journal'))
+    newapp = TestApp()
+    newapp.doc.load_from_journal(journal_path(cache_path, document_id))
+    compare_apps(app.doc, newapp.doc)
+
+@with_app(app_one_empty_account_range_on_october_2007)
+def test_recover_from_main_window(app, tmpdir):
+    # The journals of documents that weren't saved or closed can be recovered from another
+    # document.
+    cache_path = str(tmpdir)
+    app.app.cache_path = cache_path
+    app.app.autosave_interval = 1
+    app.add_entry(description='foo')
+    app.doc.wait_for_autosave()
+    eq_(app.doc.recoverable_journals(), [])
+    newapp = TestApp()
+    newapp.app.cache_path = cache_path
+    [path] = newapp.doc.recoverable_journals()
+    newapp.mw.load_from_journal(path)
+    compare_apps(app.doc, newapp.doc)
+    assert newapp.doc.is_dirty()
+    # Once the recovered document is saved, its journal goes away
+    newapp.doc.save_to_xml(str(tmpdir.join('foo.moneyguru')))
+    assert not op.exists(path)
+
+@with_app(app_one_empty_account_range_on_october_2007)
+def test_journal_removed_on_save_and_close(app, tmpdir):
+    # We don't need the journal of a saved or closed document.
+    cache_path = str(tmpdir.join('cache'))
+    app.app.cache_path = cache_path
+    app.app.autosave_interval = 1
+    app.add_entry() # autosave!
+    app.doc.save_to_xml(str(tmpdir.join('foo.moneyguru')))
+    eq_(os.listdir(op.join(cache_path, 'journal')), [])
+    app.add_entry() # autosave!
+    app.doc.wait_for_autosave()
+    eq_(len(os.listdir(op.join(cache_path, 'journal'))), 1)
+    app.mw.close()
+    eq_(os.listdir(op.join(cache_path, 'journal')), [])
+
+@with_app(app_one_empty_account_range_on_october_2007)
+def test_journals_are_pruned(app, tmpdir):
+    # We only keep the most recent journals in our cache.
+    cache_path = str(tmpdir)
+    for i in range(AUTOSAVE_BUFFER_COUNT + 2):
+        os.makedirs(journal_path(cache_path, 'old{}'.format(i)))
+    app.app.cache_path = cache_path
+    app.app.autosave_interval = 1
+    app.add_entry() # autosave!
+    app.doc.wait_for_autosave()
+    eq_(len(os.listdir(op.join(cache_path, 'journal'))), AUTOSAVE_BUFFER_COUNT)
 
 @with_app(app_one_empty_account_range_on_october_2007)
 def test_balance_recursion_limit(app):
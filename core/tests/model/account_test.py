@@ -67,6 +67,44 @@ class TestOneAccount:
         # Each entry is converted using the entry's day rate.
         eq_(entries.cash_flow(range, 'CAD'), Amount(201.40, 'CAD'))
 
+class TestTwoAccounts:
+    def setup_method(self, method):
+        self.accounts = AccountList('USD')
+        self.checking = self.accounts.create('Checking', 'USD', AccountType.Asset)
+        self.savings = self.accounts.create('Savings', 'USD', AccountType.Asset)
+        self.txns = [
+            Transaction(date(2008, 1, 1), account=self.checking, amount=Amount(100, 'USD')),
+            Transaction(date(2008, 1, 2), account=self.savings, amount=Amount(50, 'USD')),
+            Transaction(date(2008, 1, 3), account=self.checking, amount=Amount(10, 'USD')),
+        ]
+        self.transactions = TransactionList()
+        for txn in self.txns:
+            self.transactions.add(txn)
+        self.oven = Oven(self.accounts, self.transactions, [], [])
+        self.oven.cook(date.min, date.max)
+
+    def test_cook_only_affected_accounts(self):
+        # When affected accounts are specified, only those accounts are re-cooked.
+        self.txns[0].change(amount=Amount(200, 'USD'))
+        self.oven.cook(date(2008, 1, 1), date.max, affected_accounts={self.checking})
+        checking_entries = self.accounts.entries_for_account(self.checking)
+        eq_(checking_entries.balance(date(2008, 1, 3), 'USD'), Amount(210, 'USD'))
+        savings_entries = self.accounts.entries_for_account(self.savings)
+        eq_(len(savings_entries), 1)
+        eq_(savings_entries.balance(date(2008, 1, 3), 'USD'), Amount(50, 'USD'))
+        eq_(len(self.oven.transactions), 3)
+
+    def test_cook_unaffected_accounts_keep_their_entries(self):
+        # Entries of accounts that aren't in the affected set aren't touched, even when they
+        # would need a re-cook. The caller is responsible for specifying the correct accounts.
+        self.txns[1].change(amount=Amount(60, 'USD'))
+        self.oven.cook(date(2008, 1, 1), date.max, affected_accounts={self.checking})
+        savings_entries = self.accounts.entries_for_account(self.savings)
+        eq_(savings_entries.balance(date(2008, 1, 3), 'USD'), Amount(50, 'USD'))
+        self.oven.cook(date(2008, 1, 1), date.max, affected_accounts={self.savings})
+        eq_(savings_entries.balance(date(2008, 1, 3), 'USD'), Amount(60, 'USD'))
+        eq_(len(savings_entries), 1)
+
 def test_accountlist_contains():
     # AccountList membership is based on account name, not Account instances.
     # Account name tests are exact though, so it's not the exact same thing
@@ -45,6 +45,21 @@ def test_physical_rates_db_remember_rates(tmpdir):
     db = RatesDB(dbpath)
     assert_almost_equal(db.get_rate(date(2008, 4, 20), 'CAD', 'USD'), 0.996115, places=6)
 
+def test_set_CAD_values_in_bulk(tmpdir):
+    # set_CAD_values() saves all rates at once, for multiple currencies.
+    dbpath = str(tmpdir.join('foo.db'))
+    db = RatesDB(dbpath)
+    db.set_CAD_values([
+        (date(2008, 4, 20), 'USD', 1/0.996115),
+        (date(2008, 4, 21), 'USD', 1/0.997115),
+        (date(2008, 4, 20), 'EUR', 1/0.633141),
+    ])
+    db = RatesDB(dbpath)
+    assert_almost_equal(db.get_rate(date(2008, 4, 20), 'CAD', 'USD'), 0.996115, places=6)
+    assert_almost_equal(db.get_rate(date(2008, 4, 21), 'CAD', 'USD'), 0.997115, places=6)
+    assert_almost_equal(db.get_rate(date(2008, 4, 20), 'CAD', 'EUR'), 0.633141, places=6)
+    eq_(db.date_range('USD'), (date(2008, 4, 20), date(2008, 4, 21)))
+
 def xtest_corrupt_db(tmpdir):
     # todo: cover this
     dbpath = str(tmpdir.join('foo.db'))
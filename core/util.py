@@ -8,6 +8,7 @@ import sys
 import os
 import os.path as op
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 
 def nonone(value, replace_value):
@@ -85,6 +86,18 @@ def extract(predicate, iterable):
             shaft.append(item)
     return wheat, shaft
 
+def parallel_map(func, iterable, worker_count):
+    """Returns a list of ``func`` applied to every item of ``iterable``.
+
+    If ``worker_count`` is more than 1, items are processed concurrently by that many threads.
+    Otherwise, they're processed in the calling thread.
+    """
+    if worker_count > 1:
+        with ThreadPoolExecutor(worker_count) as executor:
+            return list(executor.map(func, iterable))
+    else:
+        return [func(item) for item in iterable]
+
 def allsame(iterable):
     """Returns whether all elements of 'iterable' are the same.
     """
@@ -4,6 +4,8 @@
 # which should be included with this package. The terms are also available at
 # http://www.gnu.org/licenses/gpl-3.0.html
 
+from datetime import datetime
+
 from PyQt5.QtCore import Qt, QRect, QSize
 from PyQt5.QtPrintSupport import QPrintDialog
 from PyQt5.QtGui import QIcon, QPixmap, QKeySequence
@@ -20,6 +22,7 @@ from core.gui.custom_date_range_panel import CustomDateRangePanel as CustomDateR
 from core.gui.csv_options import CSVOptions as CSVOptionsModel
 from core.gui.import_window import ImportWindow as ImportWindowModel
 from core.exception import FileFormatError
+from core.loader.journal import journal_mtime
 from core.document import Document as DocumentModel, ScheduleScope
 
 from ..controller.schedule_scope_dialog import ScheduleScopeDialog
@@ -172,6 +175,7 @@ class MainWindow(QMainWindow):
         self.menubar.setGeometry(QRect(0, 0, 700, 20))
         self.menuFile = QMenu(tr("File"))
         self.menuOpenRecent = QMenu(tr("Open Recent"))
+        self.menuRecoverAutosave = QMenu(tr("Recover Autosave"))
         self.menuView = QMenu(tr("View"))
         self.menuDateRange = QMenu(tr("Date Range"))
         self.menuEdit = QMenu(tr("Edit"))
@@ -259,6 +263,7 @@ class MainWindow(QMainWindow):
         self.menuFile.addAction(self.actionNewTab)
         self.menuFile.addAction(self.actionOpenDocument)
         self.menuFile.addAction(self.menuOpenRecent.menuAction())
+        self.menuFile.addAction(self.menuRecoverAutosave.menuAction())
         self.menuFile.addAction(self.actionImport)
         self.menuFile.addSeparator()
         self.menuFile.addAction(self.actionCloseTab)
@@ -321,6 +326,7 @@ class MainWindow(QMainWindow):
         self.piechartVisibilityButton.clicked.connect(self.actionTogglePieChart.trigger)
         self.columnsVisibilityButton.clicked.connect(self.columnsVisibilityButtonClicked)
         self.recentDocuments.mustOpenItem.connect(self.open)
+        self.menuRecoverAutosave.aboutToShow.connect(self.menuRecoverAutosaveAboutToShow)
         self.tabBar.currentChanged.connect(self.currentTabChanged)
         self.tabBar.tabCloseRequested.connect(self.tabCloseRequested)
         self.tabBar.tabMoved.connect(self.tabMoved)
@@ -515,6 +521,18 @@ class MainWindow(QMainWindow):
         self.documentPathChanged()
         self.recentDocuments.insertItem(docpath)
 
+    def recover(self, path):
+        if not self.confirmDestructiveAction():
+            return
+        self.model.close()
+        try:
+            self.model.load_from_journal(path)
+            # A recovered document has never been saved anywhere.
+            self.documentPath = None
+        except FileFormatError as e:
+            QMessageBox.warning(self.app.mainWindow, tr("Cannot load file"), str(e))
+        self.documentPathChanged()
+
     def openDocument(self):
         title = tr("Select a document to load")
         filters = tr("moneyGuru Documents (*.moneyguru)")
@@ -639,7 +657,7 @@ class MainWindow(QMainWindow):
     def importDocument(self):
         title = tr("Select a document to import")
         filters = tr("Supported files (*.moneyguru *.ofx *.qfx *.qif *.csv *.txt)")
-        docpath, filetype = QFileDialog.getOpenFileName(self.app.mainWindow, title, '', filters)
+        docpaths, filetype = QFileDialog.getOpenFileNames(self.app.mainWindow, title, '', filters)
         # There's a strange glitch under GNOME where, right after the dialog is gone, the main
         # window isn't the active window, but it will become active if we give it enough time. If we
         # start showing the import window before that happens, we'll end up with an import window
@@ -649,9 +667,9 @@ class MainWindow(QMainWindow):
             if self.app.mainWindow.isActiveWindow():
                 break
             QApplication.processEvents()
-        if docpath:
+        if docpaths:
             try:
-                self.model.parse_file_for_import(docpath)
+                self.model.parse_files_for_import(docpaths)
             except FileFormatError as e:
                 QMessageBox.warning(self.app.mainWindow, tr("Cannot import file"), str(e))
 
@@ -667,6 +685,19 @@ class MainWindow(QMainWindow):
             title = "moneyGuru"
         self.setWindowTitle(title)
 
+    def menuRecoverAutosaveAboutToShow(self):
+        self.menuRecoverAutosave.clear()
+        paths = self.doc.recoverable_journals()
+        for path in paths:
+            mtime = datetime.fromtimestamp(journal_mtime(path))
+            action = QAction(mtime.strftime('%Y-%m-%d %H:%M:%S'), self)
+            action.triggered.connect(lambda checked=False, path=path: self.recover(path))
+            self.menuRecoverAutosave.addAction(action)
+        if not paths:
+            action = QAction(tr("No autosave to recover"), self)
+            action.setEnabled(False)
+            self.menuRecoverAutosave.addAction(action)
+
     def tabCloseRequested(self, index):
         self.model.close_pane(index)
 
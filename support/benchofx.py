@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# Copyright 2019 Virgil Dupras
+#
+# This software is licensed under the "GPLv3" License as described in the "LICENSE" file,
+# which should be included with this package. The terms are also available at
+# http://www.gnu.org/licenses/gpl-3.0.html
+
+# OFX loading benchmark
+#
+# Not a unit test. Writes a synthetic OFX file with a lot of STMTTRN elements spread over a few
+# statements and reports how long it takes to load it. Run it from the root of the project once
+# ccore is built.
+#
+# Usage: python3 support/benchofx.py [txn_count] [sgml|xml]
+
+import os
+import os.path as op
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, op.dirname(op.dirname(op.abspath(__file__))))
+
+from core.loader import ofx # noqa
+
+ACCOUNT_COUNT = 3
+
+SGML_HEADER = """OFXHEADER:100
+DATA:OFXSGML
+VERSION:102
+SECURITY:NONE
+ENCODING:USASCII
+CHARSET:1252
+COMPRESSION:NONE
+OLDFILEUID:NONE
+NEWFILEUID:NONE
+
+"""
+
+XML_HEADER = """<?OFX OFXHEADER="200" VERSION="211" SECURITY="NONE" OLDFILEUID="NONE" NEWFILEUID="NONE"?>
+"""
+
+def write_statement(fp, account_index, txncount, xml):
+    def leaf(tag, value):
+        return '<{0}>{1}</{0}>'.format(tag, value) if xml else '<{0}>{1}'.format(tag, value)
+
+    fp.write('<STMTTRNRS><STMTRS>' + leaf('CURDEF', 'USD'))
+    fp.write('<BANKACCTFROM>' + leaf('BANKID', '1234') + leaf('ACCTID', 'ACCT%d' % account_index))
+    fp.write('</BANKACCTFROM>\n<BANKTRANLIST>\n')
+    for i in range(txncount):
+        fp.write('<STMTTRN>')
+        fp.write(leaf('TRNTYPE', 'DEBIT'))
+        fp.write(leaf('DTPOSTED', '2019%02d%02d120000' % (i % 12 + 1, i % 28 + 1)))
+        fp.write(leaf('TRNAMT', '-%d.%02d' % (i % 1000, i % 100)))
+        fp.write(leaf('FITID', '%d-%d' % (account_index, i)))
+        fp.write(leaf('NAME', 'Payee &amp; Co %d' % (i % 500)))
+        fp.write(leaf('MEMO', 'memo %d' % i))
+        fp.write('</STMTTRN>\n')
+    fp.write('</BANKTRANLIST></STMTRS></STMTTRNRS>\n')
+
+def write_ofx(filename, txncount, xml):
+    with open(filename, 'wt', encoding='cp1252') as fp:
+        fp.write(XML_HEADER if xml else SGML_HEADER)
+        fp.write('<OFX><BANKMSGSRSV1>\n')
+        for i in range(ACCOUNT_COUNT):
+            write_statement(fp, i, txncount // ACCOUNT_COUNT, xml)
+        fp.write('</BANKMSGSRSV1></OFX>\n')
+
+def main():
+    txncount = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    xml = len(sys.argv) > 2 and sys.argv[2] == 'xml'
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = op.join(tmpdir, 'bench.ofx')
+        write_ofx(filename, txncount, xml)
+        size = os.stat(filename).st_size
+        start = time.perf_counter()
+        loader = ofx.Loader('USD')
+        loader.parse(filename)
+        loader.load()
+        elapsed = time.perf_counter() - start
+    print("%d txns (%s, %d KB)" % (len(loader.transactions), 'xml' if xml else 'sgml', size // 1024))
+    print("load time: %.3f s" % elapsed)
+
+if __name__ == '__main__':
+    main()